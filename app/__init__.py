@@ -1,19 +1,47 @@
 #__init__.py
 
-from flask_sqlalchemy import SQLAlchemy
+import os
+import time
+
+# Counted from here: the import of Flask, SQLAlchemy and the models is most of a cold start
+_import_started = time.perf_counter()
+
 from flask import Flask
 
+# Models and controllers share the one SQLAlchemy instance that carries
+# the migrations, so both see the same metadata and connection pool
+from database import db, init_db, init_migrations
 
 
-db = SQLAlchemy()
+def create_app(config_name=None):
+    """Application factory for run.py, wsgi.py and the flask command
 
-def create_app():
+    config_name picks a class from config.py (default: FLASK_CONFIG, else
+    development). Nothing here touches the schema: run `flask db upgrade`.
+    """
+    started = time.perf_counter()
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///ods.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SECRET_KEY'] = 'we try again tomorrow'
 
-    db.init_app(app)
+    from config import config
+    app.config.from_object(config[config_name or os.environ.get('FLASK_CONFIG', 'development')])
+
+    from flask_cors import CORS
+    CORS(app)
+    init_db(app)
+
+    from app.utils.sqlite import init_sqlite
+    init_sqlite(app)
+    from app.utils.replicas import init_replicas
+    init_replicas(app)
+
+    from app.utils.cache import init_cache
+    init_cache(app)
+
+    from app.utils.instrumentation import init_instrumentation
+    init_instrumentation(app)
+    # Prometheus scrape target at /metrics
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
     
     #BLUEPRINTS
     # from app.routes.auth import auth_bp  # Ignored for Month 1 deliverables
@@ -26,6 +54,9 @@ def create_app():
     from app.routes.projects import projects_bp
     from app.routes.participants import participants_bp
     from app.routes.outcomes import outcomes_bp
+    from app.routes.imports import imports_bp
+    from app.routes.jobs import jobs_bp
+    from app.routes.stats import stats_bp
 
     # app.register_blueprint(auth_bp)  # Ignored for Month 1 deliverables
     # app.register_blueprint(api_bp)  # Ignored for Month 1 deliverables
@@ -37,8 +68,55 @@ def create_app():
     app.register_blueprint(projects_bp, url_prefix='/api/projects')
     app.register_blueprint(participants_bp, url_prefix='/api/participants')
     app.register_blueprint(outcomes_bp, url_prefix='/api/outcomes')
+    app.register_blueprint(imports_bp, url_prefix='/api/imports')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+    app.register_blueprint(stats_bp, url_prefix='/api/stats')
+
+    # Basic health check endpoint
+    @app.route('/health')
+    def health_check():
+        return {'status': 'healthy', 'service': 'AP Capstone API'}, 200
 
-    with app.app_context():
-        db.create_all()
+    # Error handlers
+    @app.errorhandler(404)
+    def not_found(error):
+        return {'error': 'Resource not found'}, 404
 
+    @app.errorhandler(500)
+    def internal_error(error):
+        return {'error': 'Internal server error'}, 500
+
+    # The flask command sets FLASK_RUN_FROM_CLI before loading the app; servers
+    # never import Alembic or the maintenance commands
+    if os.environ.get('FLASK_RUN_FROM_CLI'):
+        init_migrations(app)
+        register_commands(app)
+
+    # Reported by /metrics and `flask bench startup`
+    app.extensions['startup_seconds'] = {
+        'import': _imported - _import_started,
+        'create_app': time.perf_counter() - started,
+    }
     return app
+
+
+def register_commands(app):
+    """The maintenance commands of the flask command line"""
+    from app.utils.explain import explain_command
+    from app.utils.artifacts import artifacts_command
+    from app.utils.jobs import jobs_command
+    from app.utils.stats import stats_command
+    from app.utils.benchmark import bench_command
+    # flask explain [URL...] prints the query plans behind the list routes
+    app.cli.add_command(explain_command)
+    # flask artifacts gc|migrate maintains the content-addressed artifact store
+    app.cli.add_command(artifacts_command)
+    # flask jobs worker runs queued background work in a process pool
+    app.cli.add_command(jobs_command)
+    # flask stats rebuild recomputes the /api/stats counters from the tables
+    app.cli.add_command(stats_command)
+    # flask bench seed|run|startup: synthetic data, latency and cold-start benchmarks
+    app.cli.add_command(bench_command)
+
+
+_imported = time.perf_counter()
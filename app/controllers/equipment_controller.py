@@ -2,13 +2,30 @@ from flask import jsonify
 from app.models.equipment import Equipment
 from app.models.facility import Facility
 from database import db
+from app.utils.bulk import bulk_create, bulk_update, bulk_delete
+from app.utils.fields import parse_fields, apply_fields, pick
+from app.utils.pagination import paginate, page_size
+from app.utils.search import fulltext_filter, fulltext_search
 
 class EquipmentController:
     
-    def get_all_equipment(self, filters=None):
+    # Non-nullable columns clients may order list pages by
+    sortable_fields = ('name',)
+    
+    # Fields clients must send on create, and may send on create or update
+    required_fields = ('facility_id', 'name', 'usage_domain')
+    updatable_fields = ('facility_id', 'name', 'capabilities', 'description', 'inventory_code',
+                        'usage_domain', 'support_phase')
+    
+    # Foreign keys validated on write, as field -> referenced model
+    foreign_keys = {'facility_id': Facility}
+    
+    def get_all_equipment(self, filters=None, page=None, fields=None):
         """List all equipment with optional filtering"""
         try:
-            query = Equipment.query
+            fields = parse_fields(fields, Equipment)
+            query = apply_fields(Equipment.query, Equipment, fields)
+            serialize = lambda eq: pick(eq, fields)
             
             if filters:
                 if 'usage_domain' in filters:
@@ -18,40 +35,55 @@ class EquipmentController:
                 if 'facility_id' in filters:
                     query = query.filter(Equipment.facility_id == filters['facility_id'])
                 if 'capability' in filters:
-                    query = query.filter(Equipment.capabilities.ilike(f"%{filters['capability']}%"))
+                    query = fulltext_filter(query, Equipment, {'capabilities': filters['capability']})
+            
+            if page is not None:
+                return jsonify(paginate(query, Equipment, page, self.sortable_fields, serialize)), 200
             
             equipment = query.all()
-            return jsonify([eq.to_dict() for eq in equipment]), 200
+            return jsonify([serialize(eq) for eq in equipment]), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve equipment: {str(e)}'}), 500
     
     def search_equipment(self, search_params):
-        """Search equipment by capability and usage domain"""
+        """Search equipment by capability and usage domain, ranked by relevance"""
         try:
             query = Equipment.query
             
+            # ?q= searches every indexed column, the others are column-scoped
+            terms = {}
             for key, value in search_params.items():
-                if key == 'name':
-                    query = query.filter(Equipment.name.ilike(f"%{value}%"))
+                if key == 'q':
+                    terms[None] = value
+                elif key == 'name':
+                    terms['name'] = value
                 elif key == 'capability':
-                    query = query.filter(Equipment.capabilities.ilike(f"%{value}%"))
+                    terms['capabilities'] = value
                 elif key == 'usage_domain':
                     query = query.filter(Equipment.usage_domain == value)
                 elif key == 'inventory_code':
                     query = query.filter(Equipment.inventory_code == value)
             
-            equipment = query.all()
-            return jsonify([eq.to_dict() for eq in equipment]), 200
+            query = fulltext_search(query, Equipment, terms)
+            results = query.limit(page_size(search_params.get('limit'))).all()
+            return jsonify([dict(eq.to_dict(), score=score) for eq, score in results]), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Search failed: {str(e)}'}), 500
     
-    def get_equipment_by_id(self, equipment_id):
+    def get_equipment_by_id(self, equipment_id, fields=None):
         """Get equipment details by ID"""
         try:
-            equipment = Equipment.query.get(equipment_id)
+            fields = parse_fields(fields, Equipment)
+            equipment = apply_fields(Equipment.query, Equipment, fields).get(equipment_id)
             if not equipment:
                 return jsonify({'error': 'Equipment not found'}), 404
-            return jsonify(equipment.to_dict()), 200
+            return jsonify(pick(equipment, fields)), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve equipment: {str(e)}'}), 500
     
@@ -59,8 +91,7 @@ class EquipmentController:
         """Create new equipment"""
         try:
             # Validate required fields
-            required_fields = ['facility_id', 'name', 'usage_domain']
-            for field in required_fields:
+            for field in self.required_fields:
                 if field not in data or not data[field]:
                     return jsonify({'error': f'Missing required field: {field}'}), 400
             
@@ -100,9 +131,7 @@ class EquipmentController:
                 if not facility:
                     return jsonify({'error': 'Invalid facility_id'}), 400
             
-            updatable_fields = ['facility_id', 'name', 'capabilities', 'description', 
-                              'inventory_code', 'usage_domain', 'support_phase']
-            for field in updatable_fields:
+            for field in self.updatable_fields:
                 if field in data:
                     setattr(equipment, field, data[field])
             
@@ -127,3 +156,44 @@ class EquipmentController:
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f'Failed to delete equipment: {str(e)}'}), 500
+    
+    def bulk_create_equipment(self, data, atomic=False):
+        """Create many equipment items in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_create(Equipment, data, self.required_fields, self.updatable_fields,
+                                          foreign_keys=self.foreign_keys, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to create equipment: {str(e)}'}), 400
+    
+    def bulk_update_equipment(self, data, atomic=False):
+        """Update many equipment items in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_update(Equipment, data, self.updatable_fields,
+                                          foreign_keys=self.foreign_keys, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to update equipment: {str(e)}'}), 400
+    
+    def bulk_delete_equipment(self, data, atomic=False):
+        """Delete many equipment items in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_delete(Equipment, data, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to delete equipment: {str(e)}'}), 500
@@ -3,55 +3,102 @@ from app.models.facility import Facility
 from app.models.service import Service
 from app.models.equipment import Equipment
 from app.models.project import Project
+from sqlalchemy.orm import selectinload
 from database import db
+from app.utils.dependencies import dependency_report, describe
+from app.utils.bulk import bulk_create, bulk_update, bulk_delete, delete_checked
+from app.utils.pagination import paginate, page_size
+from app.utils.search import fulltext_filter, fulltext_search
+from app.utils.fields import parse_fields, apply_fields
+from app.utils.includes import parse_includes, apply_includes, dump, embed
 
 class FacilityController:
     
-    def get_all_facilities(self, filters=None):
+    # Non-nullable columns clients may order list pages by
+    sortable_fields = ('name',)
+    
+    # Relationships clients may embed with ?include=, as (loader option, serializer)
+    includable = {
+        'services': (selectinload(Facility.services), lambda facility: dump(facility.services)),
+        'equipment': (selectinload(Facility.equipment), lambda facility: dump(facility.equipment)),
+        'projects': (selectinload(Facility.projects), lambda facility: dump(facility.projects)),
+    }
+    
+    # Fields clients must send on create, and may send on create or update
+    required_fields = ('name', 'location', 'facility_type')
+    updatable_fields = ('name', 'location', 'description', 'partner_org',
+                        'facility_type', 'capabilities')
+    
+    # Rows that block a delete, as (foreign key column, key, label)
+    dependents = (
+        (Service.facility_id, 'services', 'services'),
+        (Equipment.facility_id, 'equipment', 'equipment items'),
+        (Project.facility_id, 'projects', 'projects'),
+    )
+    
+    def get_all_facilities(self, filters=None, page=None, include=None, fields=None):
         """List all facilities with optional filtering"""
         try:
-            query = Facility.query
+            includes = parse_includes(include, self.includable)
+            fields = parse_fields(fields, Facility)
+            query = apply_fields(apply_includes(Facility.query, includes, self.includable), Facility, fields)
+            serialize = lambda facility: embed(facility, includes, self.includable, fields)
             
             if filters:
                 if 'type' in filters:
                     query = query.filter(Facility.facility_type == filters['type'])
                 if 'partner' in filters:
-                    query = query.filter(Facility.partner_organization.ilike(f"%{filters['partner']}%"))
+                    query = query.filter(Facility.partner_org.ilike(f"%{filters['partner']}%"))
                 if 'location' in filters:
                     query = query.filter(Facility.location.ilike(f"%{filters['location']}%"))
                 if 'capability' in filters:
-                    query = query.filter(Facility.capabilities.ilike(f"%{filters['capability']}%"))
+                    query = fulltext_filter(query, Facility, {'capabilities': filters['capability']})
+            
+            if page is not None:
+                return jsonify(paginate(query, Facility, page, self.sortable_fields, serialize)), 200
             
             facilities = query.all()
-            return jsonify([facility.to_dict() for facility in facilities]), 200
+            return jsonify([serialize(facility) for facility in facilities]), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve facilities: {str(e)}'}), 500
     
     def search_facilities(self, search_params):
-        """Advanced facility search"""
+        """Advanced facility search, ranked by full-text relevance"""
         try:
-            query = Facility.query
-            
+            # ?q= searches every indexed column, the others are column-scoped
+            terms = {}
             for key, value in search_params.items():
-                if key == 'name':
-                    query = query.filter(Facility.name.ilike(f"%{value}%"))
+                if key == 'q':
+                    terms[None] = value
+                elif key == 'name':
+                    terms['name'] = value
                 elif key == 'description':
-                    query = query.filter(Facility.description.ilike(f"%{value}%"))
+                    terms['description'] = value
                 elif key == 'capability':
-                    query = query.filter(Facility.capabilities.ilike(f"%{value}%"))
+                    terms['capabilities'] = value
             
-            facilities = query.all()
-            return jsonify([facility.to_dict() for facility in facilities]), 200
+            query = fulltext_search(Facility.query, Facility, terms)
+            results = query.limit(page_size(search_params.get('limit'))).all()
+            return jsonify([dict(facility.to_dict(), score=score) for facility, score in results]), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Search failed: {str(e)}'}), 500
     
-    def get_facility_by_id(self, facility_id):
+    def get_facility_by_id(self, facility_id, include=None, fields=None):
         """Get facility details by ID"""
         try:
-            facility = Facility.query.get(facility_id)
+            includes = parse_includes(include, self.includable)
+            fields = parse_fields(fields, Facility)
+            query = apply_fields(apply_includes(Facility.query, includes, self.includable), Facility, fields)
+            facility = query.get(facility_id)
             if not facility:
                 return jsonify({'error': 'Facility not found'}), 404
-            return jsonify(facility.to_dict()), 200
+            return jsonify(embed(facility, includes, self.includable, fields)), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve facility: {str(e)}'}), 500
     
@@ -59,8 +106,7 @@ class FacilityController:
         """Create new facility"""
         try:
             # Validate required fields
-            required_fields = ['name', 'location', 'facility_type']
-            for field in required_fields:
+            for field in self.required_fields:
                 if field not in data or not data[field]:
                     return jsonify({'error': f'Missing required field: {field}'}), 400
             
@@ -68,7 +114,7 @@ class FacilityController:
                 name=data['name'],
                 location=data['location'],
                 description=data.get('description'),
-                partner_organization=data.get('partner_organization'),
+                partner_org=data.get('partner_org'),
                 facility_type=data['facility_type'],
                 capabilities=data.get('capabilities')
             )
@@ -88,9 +134,7 @@ class FacilityController:
             if not facility:
                 return jsonify({'error': 'Facility not found'}), 404
             
-            updatable_fields = ['name', 'location', 'description', 'partner_organization', 
-                              'facility_type', 'capabilities']
-            for field in updatable_fields:
+            for field in self.updatable_fields:
                 if field in data:
                     setattr(facility, field, data[field])
             
@@ -103,35 +147,75 @@ class FacilityController:
     def delete_facility(self, facility_id):
         """Delete facility (with dependency checks)"""
         try:
-            facility = Facility.query.get(facility_id)
+            # Existence and every dependent count in one locked query; the DELETE re-checks them
+            facility, counts = delete_checked(Facility, facility_id, self.dependents)
             if not facility:
                 return jsonify({'error': 'Facility not found'}), 404
-            
-            # Check dependencies
-            service_count = Service.query.filter_by(facility_id=facility_id).count()
-            equipment_count = Equipment.query.filter_by(facility_id=facility_id).count()
-            project_count = Project.query.filter_by(facility_id=facility_id).count()
-            
-            dependencies = []
-            if service_count > 0:
-                dependencies.append(f'{service_count} services')
-            if equipment_count > 0:
-                dependencies.append(f'{equipment_count} equipment items')
-            if project_count > 0:
-                dependencies.append(f'{project_count} projects')
-            
-            if dependencies:
+            blocked = describe(counts, self.dependents)
+            if blocked:
                 return jsonify({
-                    'error': f'Cannot delete facility. It has {", ".join(dependencies)} linked to it.'
+                    'error': f'Cannot delete facility. It has {blocked} linked to it.'
                 }), 400
             
-            db.session.delete(facility)
             db.session.commit()
             return '', 204
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f'Failed to delete facility: {str(e)}'}), 500
     
+    def get_facility_dependencies(self, facility_id):
+        """What would block deleting the facility, without deleting it"""
+        try:
+            report = dependency_report(Facility, facility_id, self.dependents)
+            if report is None:
+                return jsonify({'error': 'Facility not found'}), 404
+            return jsonify(report), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to check facility dependencies: {str(e)}'}), 500
+    
+    def bulk_create_facilities(self, data, atomic=False):
+        """Create many facilities in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_create(Facility, data, self.required_fields, self.updatable_fields,
+                                          atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to create facilities: {str(e)}'}), 400
+    
+    def bulk_update_facilities(self, data, atomic=False):
+        """Update many facilities in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_update(Facility, data, self.updatable_fields, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to update facilities: {str(e)}'}), 400
+    
+    def bulk_delete_facilities(self, data, atomic=False):
+        """Delete many facilities in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_delete(Facility, data, self.dependents, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to delete facilities: {str(e)}'}), 500
+    
     def get_services_by_facility(self, facility_id):
         """Get all services offered by a facility"""
         try:
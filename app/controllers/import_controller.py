@@ -0,0 +1,67 @@
+import os
+import uuid
+from flask import current_app, jsonify
+from app.models.import_job import ImportJob
+from database import db
+from app.utils.importer import IMPORTABLE, default_match_on, import_format
+from app.utils.jobs import enqueue
+from app.utils.metrics import count_upload_bytes
+
+class ImportController:
+    
+    def create_import(self, entity, file, match_on=None):
+        """Store an uploaded CSV/XLSX file and queue it for import"""
+        try:
+            if entity not in IMPORTABLE:
+                return jsonify({'error': f'Unknown import type: {entity}'}), 404
+            if file is None or file.filename == '':
+                return jsonify({'error': 'Missing file'}), 400
+            fmt = import_format(file.filename)
+            
+            model, controller_class = IMPORTABLE[entity]
+            match_on = match_on or default_match_on(controller_class)
+            if match_on != 'id' and match_on not in controller_class.updatable_fields:
+                return jsonify({'error': f'Cannot match {entity} on {match_on}'}), 400
+            
+            # Stream the upload to disk; the import reads it back in chunks
+            folder = current_app.config.get('IMPORT_FOLDER', os.path.join('uploads', 'imports'))
+            os.makedirs(folder, exist_ok=True)
+            file_path = os.path.join(folder, f'{uuid.uuid4().hex}.{fmt}')
+            file.save(file_path)
+            count_upload_bytes('import', os.path.getsize(file_path))
+            
+            job = ImportJob(entity=entity, filename=file.filename, file_path=file_path, match_on=match_on)
+            db.session.add(job)
+            db.session.flush()
+            # Queued in the same transaction, so a committed import always gets run.
+            # Not retried: a rerun after a partial import could create rows twice
+            enqueue('imports.run', {'job_id': job.id}, max_attempts=1)
+            db.session.commit()
+            
+            return jsonify(job.to_dict()), 202, {'Location': f'/api/imports/{job.id}'}
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to start import: {str(e)}'}), 500
+    
+    def get_import(self, job_id):
+        """Import status: progress, counts and row errors"""
+        try:
+            job = db.session.get(ImportJob, job_id)
+            if not job:
+                return jsonify({'error': 'Import not found'}), 404
+            return jsonify(job.to_dict()), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to retrieve import: {str(e)}'}), 500
+    
+    def get_imports(self, status=None):
+        """Most recent imports, newest first (without their row errors)"""
+        try:
+            query = ImportJob.query
+            if status:
+                query = query.filter(ImportJob.status == status)
+            jobs = query.order_by(ImportJob.id.desc()).limit(100).all()
+            return jsonify([dict(job.to_dict(), errors=None) for job in jobs]), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to retrieve imports: {str(e)}'}), 500
@@ -0,0 +1,63 @@
+from datetime import datetime
+from flask import jsonify
+from app.models.job import Job
+from database import db
+from app.utils.jobs import JOB_STATUSES
+
+class JobController:
+    
+    def get_jobs(self, status=None, kind=None):
+        """Most recent background jobs, newest first"""
+        try:
+            query = Job.query
+            if status:
+                if status not in JOB_STATUSES:
+                    return jsonify({'error': f'status must be one of: {", ".join(JOB_STATUSES)}'}), 400
+                query = query.filter(Job.status == status)
+            if kind:
+                query = query.filter(Job.kind == kind)
+            jobs = query.order_by(Job.id.desc()).limit(100).all()
+            return jsonify([job.to_dict() for job in jobs]), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to retrieve jobs: {str(e)}'}), 500
+    
+    def get_job(self, job_id):
+        """Job status, attempts and last error"""
+        try:
+            job = db.session.get(Job, job_id)
+            if not job:
+                return jsonify({'error': 'Job not found'}), 404
+            return jsonify(job.to_dict()), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to retrieve job: {str(e)}'}), 500
+    
+    def get_job_counts(self):
+        """Jobs per status, and how late the oldest due job is"""
+        try:
+            counts = dict(db.session.query(Job.status, db.func.count()).group_by(Job.status).all())
+            oldest = db.session.query(db.func.min(Job.run_at)).filter(
+                Job.status == 'queued', Job.run_at <= datetime.utcnow()).scalar()
+            lag = (datetime.utcnow() - oldest).total_seconds() if oldest else 0
+            return jsonify({'counts': {status: counts.get(status, 0) for status in JOB_STATUSES},
+                            'queue_lag_seconds': round(lag, 3)}), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to retrieve job counts: {str(e)}'}), 500
+    
+    def retry_job(self, job_id):
+        """Queue a failed job again with a fresh set of attempts"""
+        try:
+            job = db.session.get(Job, job_id)
+            if not job:
+                return jsonify({'error': 'Job not found'}), 404
+            if job.status != 'failed':
+                return jsonify({'error': 'Only failed jobs can be retried'}), 400
+            job.status = 'queued'
+            job.attempts = 0
+            job.run_at = datetime.utcnow()
+            job.finished_at = None
+            db.session.info['jobs_enqueued'] = True
+            db.session.commit()
+            return jsonify(job.to_dict()), 202
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to retry job: {str(e)}'}), 500
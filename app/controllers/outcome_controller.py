@@ -1,36 +1,100 @@
 from flask import jsonify
+from sqlalchemy import select
+from werkzeug.utils import secure_filename
 from app.models.outcome import Outcome
 from app.models.project import Project
 from database import db
+from app.utils.bulk import bulk_create, bulk_update, bulk_delete
+from app.utils.fields import parse_fields, apply_fields, pick
+from app.utils.pagination import paginate
+from app.utils.export import stream_export
+from app.utils.uploads import (UploadConflict, append_chunk, claim_upload, discard_upload,
+                               finish_upload, new_upload, purge_stale_uploads)
+from app.utils.artifacts import attach, blob_path, count_refs, detach, queue_garbage_collection, store_stream
+from app.utils.downloads import send_artifact
+from app.utils.previews import ensure_preview, queue_previews
+from app.models.artifact_upload import ArtifactUpload
 import os
+import re
 
 class OutcomeController:
     
-    def get_all_outcomes(self, filters=None):
+    # Non-nullable columns clients may order list pages by
+    sortable_fields = ('title',)
+    
+    # Fields clients must send on create, and may send on create or update
+    required_fields = ('project_id', 'title', 'outcome_type')
+    updatable_fields = ('project_id', 'title', 'description', 'artifact_link', 'outcome_type',
+                        'quality_certification', 'commercialization_status')
+    
+    # Foreign keys validated on write, as field -> referenced model
+    foreign_keys = {'project_id': Project}
+    
+    # Values for optional fields a create leaves out
+    defaults = {'commercialization_status': 'In Development'}
+    
+    def _build_query(self, filters=None):
+        """Base outcomes query with the list filters applied"""
+        query = Outcome.query
+        
+        if filters:
+            if 'project_id' in filters:
+                query = query.filter(Outcome.project_id == filters['project_id'])
+            if 'outcome_type' in filters:
+                query = query.filter(Outcome.outcome_type == filters['outcome_type'])
+            if 'commercialization_status' in filters:
+                query = query.filter(Outcome.commercialization_status == filters['commercialization_status'])
+        return query
+    
+    def _stored_artifact(self, data):
+        """(Artifact, filename) for a file sent with the request or a finished upload_id, else None"""
+        if data.get('upload_id'):
+            return claim_upload(data['upload_id'])
+        if data.get('artifact_file'):
+            file = data['artifact_file']
+            return store_stream(file.stream), file.filename
+        return None
+    
+    def _queue_previews(self, outcome):
+        """Render gallery previews of a newly stored artifact off the request path"""
+        queue_previews(blob_path(outcome.artifact_sha256), outcome.artifact_sha256, outcome.artifact_name)
+    
+    def get_all_outcomes(self, filters=None, page=None, fields=None):
         """List all outcomes with optional filtering (admin use)"""
         try:
-            query = Outcome.query
+            fields = parse_fields(fields, Outcome)
+            query = apply_fields(self._build_query(filters), Outcome, fields)
+            serialize = lambda outcome: pick(outcome, fields)
             
-            if filters:
-                if 'project_id' in filters:
-                    query = query.filter(Outcome.project_id == filters['project_id'])
-                if 'outcome_type' in filters:
-                    query = query.filter(Outcome.outcome_type == filters['outcome_type'])
-                if 'commercialization_status' in filters:
-                    query = query.filter(Outcome.commercialization_status == filters['commercialization_status'])
+            if page is not None:
+                return jsonify(paginate(query, Outcome, page, self.sortable_fields, serialize)), 200
             
             outcomes = query.all()
-            return jsonify([outcome.to_dict() for outcome in outcomes]), 200
+            return jsonify([serialize(outcome) for outcome in outcomes]), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve outcomes: {str(e)}'}), 500
     
-    def get_outcome_by_id(self, outcome_id):
+    def export_outcomes(self, filters=None, fmt='ndjson'):
+        """Stream outcomes as NDJSON or CSV"""
+        try:
+            return stream_export(self._build_query(filters), Outcome, fmt, 'outcomes')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': f'Failed to export outcomes: {str(e)}'}), 500
+    
+    def get_outcome_by_id(self, outcome_id, fields=None):
         """Get outcome details by ID"""
         try:
-            outcome = Outcome.query.get(outcome_id)
+            fields = parse_fields(fields, Outcome)
+            outcome = apply_fields(Outcome.query, Outcome, fields).get(outcome_id)
             if not outcome:
                 return jsonify({'error': 'Outcome not found'}), 404
-            return jsonify(outcome.to_dict()), 200
+            return jsonify(pick(outcome, fields)), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve outcome: {str(e)}'}), 500
     
@@ -38,8 +102,7 @@ class OutcomeController:
         """Create new outcome with optional file upload"""
         try:
             # Validate required fields
-            required_fields = ['project_id', 'title', 'outcome_type']
-            for field in required_fields:
+            for field in self.required_fields:
                 if field not in data or not data[field]:
                     return jsonify({'error': f'Missing required field: {field}'}), 400
             
@@ -48,20 +111,25 @@ class OutcomeController:
             if not project:
                 return jsonify({'error': 'Invalid project_id'}), 400
             
-            # Handle artifact link (either uploaded file path or external URL)
-            artifact_link = data.get('artifact_file') or data.get('artifact_link')
+            # Handle artifact (either a stored file or an external URL)
+            stored = self._stored_artifact(data)
             
             outcome = Outcome(
                 project_id=data['project_id'],
                 title=data['title'],
                 description=data.get('description'),
-                artifact_link=artifact_link,
+                artifact_link=data.get('artifact_link'),
                 outcome_type=data['outcome_type'],
                 quality_certification=data.get('quality_certification'),
                 commercialization_status=data.get('commercialization_status', 'In Development')
             )
             
+            if stored:
+                attach(outcome, *stored)
+                self._queue_previews(outcome)
+            
             db.session.add(outcome)
+            count_refs([outcome.artifact_sha256])
             db.session.commit()
             
             return jsonify(outcome.to_dict()), 201
@@ -82,23 +150,24 @@ class OutcomeController:
                 if not project:
                     return jsonify({'error': 'Invalid project_id'}), 400
             
-            # Handle new artifact upload
-            if data.get('artifact_file'):
-                # Remove old file if it exists and is a local file
-                if outcome.artifact_link and outcome.artifact_link.startswith('uploads/'):
-                    try:
-                        os.remove(outcome.artifact_link)
-                    except OSError:
-                        pass  # File may not exist or be deletable
-                
-                data['artifact_link'] = data.pop('artifact_file')
-            
-            updatable_fields = ['project_id', 'title', 'description', 'artifact_link',
-                              'outcome_type', 'quality_certification', 'commercialization_status']
-            for field in updatable_fields:
+            # Handle new artifact upload, or a link that replaces the stored file
+            stored = self._stored_artifact(data)
+            relinked = 'artifact_link' in data and data['artifact_link'] != outcome.artifact_link
+            
+            for field in self.updatable_fields:
                 if field in data:
                     setattr(outcome, field, data[field])
             
+            released = None
+            if stored:
+                released = attach(outcome, *stored)
+                self._queue_previews(outcome)
+            elif relinked:
+                released = detach(outcome)
+            
+            count_refs([released, outcome.artifact_sha256])
+            # The old file goes, in the background, once no other outcome shares it
+            queue_garbage_collection([released])
             db.session.commit()
             return jsonify(outcome.to_dict()), 200
         except Exception as e:
@@ -112,30 +181,194 @@ class OutcomeController:
             if not outcome:
                 return jsonify({'error': 'Outcome not found'}), 404
             
-            # Remove associated file if it's a local upload
-            if outcome.artifact_link and outcome.artifact_link.startswith('uploads/'):
-                try:
-                    os.remove(outcome.artifact_link)
-                except OSError:
-                    pass  # File may not exist
-            
+            released = outcome.artifact_sha256
             db.session.delete(outcome)
+            count_refs([released])
+            # The stored file is removed by a background job once no other outcome shares it
+            queue_garbage_collection([released])
             db.session.commit()
             return '', 204
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f'Failed to delete outcome: {str(e)}'}), 500
     
+    def bulk_create_outcomes(self, data, atomic=False):
+        """Create many outcomes in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_create(Outcome, data, self.required_fields, self.updatable_fields,
+                                          foreign_keys=self.foreign_keys, defaults=self.defaults, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to create outcomes: {str(e)}'}), 400
+    
+    def bulk_update_outcomes(self, data, atomic=False):
+        """Update many outcomes in one transaction, with a result per item"""
+        try:
+            body, status, updated = bulk_update(Outcome, data, self.updatable_fields,
+                                                foreign_keys=self.foreign_keys, atomic=atomic)
+            
+            # Rows whose artifact_link was pointed elsewhere let go of their stored file
+            released = [detach(outcome) for outcome in updated
+                        if outcome.artifact_sha256 and outcome.artifact_link != blob_path(outcome.artifact_sha256)]
+            count_refs(released)
+            queue_garbage_collection(released)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to update outcomes: {str(e)}'}), 400
+    
+    def bulk_delete_outcomes(self, data, atomic=False):
+        """Delete many outcomes in one transaction, with a result per item"""
+        try:
+            body, status, deleted = bulk_delete(Outcome, data, atomic=atomic)
+            released = [outcome.artifact_sha256 for outcome in deleted]
+            count_refs(released)
+            # Stored files are removed in the background once nothing else shares them
+            queue_garbage_collection(released)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to delete outcomes: {str(e)}'}), 500
+    
+    def create_upload(self, data):
+        """Start a resumable artifact upload"""
+        try:
+            purge_stale_uploads()
+            upload = new_upload(data.get('filename'), data.get('size'), data.get('checksum'))
+            db.session.commit()
+            return jsonify(upload.to_dict()), 201, {
+                'Location': f'/api/outcomes/uploads/{upload.id}',
+                'Upload-Offset': '0'
+            }
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to start upload: {str(e)}'}), 500
+    
+    def get_upload(self, upload_id):
+        """Upload status, including the offset to resume from"""
+        try:
+            upload = db.session.get(ArtifactUpload, upload_id)
+            if not upload:
+                return jsonify({'error': 'Upload not found'}), 404
+            return jsonify(upload.to_dict()), 200, {'Upload-Offset': str(upload.received)}
+        except Exception as e:
+            return jsonify({'error': f'Failed to retrieve upload: {str(e)}'}), 500
+    
+    def upload_chunk(self, upload_id, offset, stream):
+        """Append one chunk (the raw request body) at the given offset"""
+        try:
+            upload = db.session.get(ArtifactUpload, upload_id)
+            if not upload:
+                return jsonify({'error': 'Upload not found'}), 404
+            received = append_chunk(upload, offset, stream)
+            db.session.commit()
+            return jsonify(upload.to_dict()), 200, {'Upload-Offset': str(received)}
+        except UploadConflict as e:
+            db.session.commit()
+            return jsonify({'error': str(e), 'offset': e.offset}), 409, {'Upload-Offset': str(e.offset)}
+        except ValueError as e:
+            db.session.commit()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to store chunk: {str(e)}'}), 500
+    
+    def finalize_upload(self, upload_id, data):
+        """Verify size and checksum; an outcome can then claim the upload with upload_id"""
+        try:
+            upload = db.session.get(ArtifactUpload, upload_id)
+            if not upload:
+                return jsonify({'error': 'Upload not found'}), 404
+            finish_upload(upload, data.get('checksum'))
+            db.session.commit()
+            return jsonify(upload.to_dict()), 200
+        except UploadConflict as e:
+            db.session.commit()
+            return jsonify({'error': str(e), 'offset': e.offset}), 409, {'Upload-Offset': str(e.offset)}
+        except ValueError as e:
+            db.session.commit()
+            return jsonify({'error': str(e)}), 422
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to finalize upload: {str(e)}'}), 500
+    
+    def delete_upload(self, upload_id):
+        """Abandon an upload that no outcome has claimed yet"""
+        try:
+            upload = db.session.get(ArtifactUpload, upload_id)
+            if not upload:
+                return jsonify({'error': 'Upload not found'}), 404
+            discard_upload(upload)
+            db.session.commit()
+            return '', 204
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to delete upload: {str(e)}'}), 500
+    
     def get_artifact_path(self, outcome_id):
-        """Get file path for artifact download/view"""
+        """Get file path, download name and content digest for artifact download/view"""
         try:
-            outcome = Outcome.query.get(outcome_id)
+            outcome = db.session.execute(
+                select(Outcome.artifact_link, Outcome.artifact_sha256, Outcome.artifact_name)
+                .where(Outcome.id == outcome_id)
+            ).first()
             if not outcome:
-                return None
+                return None, None, None
+            
+            # Absolute, since send_file resolves relative paths against the app package
+            # Stored files are found by digest alone
+            if outcome.artifact_sha256:
+                return (os.path.abspath(blob_path(outcome.artifact_sha256)), outcome.artifact_name,
+                        outcome.artifact_sha256)
             
-            # Return path only if it's a local file
+            # Files saved before the artifact store (see `flask artifacts migrate`)
             if outcome.artifact_link and outcome.artifact_link.startswith('uploads/'):
-                return outcome.artifact_link
-            return None
+                return os.path.abspath(outcome.artifact_link), os.path.basename(outcome.artifact_link), None
+            return None, None, None
+        except Exception:
+            return None, None, None
+    
+    def get_preview(self, outcome_id, size='small'):
+        """Serve a JPEG preview of an image or PDF artifact"""
+        try:
+            file_path, filename, digest = self.get_artifact_path(outcome_id)
+            if not digest or not os.path.exists(file_path):
+                return jsonify({'error': 'File not found'}), 404
+            # Normally rendered in the background after upload; done here if that has not finished
+            preview = ensure_preview(file_path, digest, filename, size)
+            return send_artifact(os.path.abspath(preview), f'{os.path.splitext(filename)[0]}-{size}.jpg',
+                                 f'{digest}-{size}')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
-            return None
\ No newline at end of file
+            return jsonify({'error': f'Failed to render preview: {str(e)}'}), 500
+    
+    def get_stored_artifact(self, digest, name=None):
+        """File path and download name for a digest some outcome still uses"""
+        try:
+            if not re.fullmatch(r'[0-9a-f]{64}', digest):
+                return None, None
+            # One index probe: any outcome referencing the digest, and the name it was uploaded as
+            stored_name = db.session.scalar(
+                select(Outcome.artifact_name).where(Outcome.artifact_sha256 == digest).limit(1))
+            if stored_name is None:
+                return None, None
+            return os.path.abspath(blob_path(digest)), secure_filename(name or '') or stored_name
+        except Exception:
+            return None, None
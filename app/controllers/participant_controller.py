@@ -2,39 +2,103 @@ from flask import jsonify
 from app.models.participant import Participant
 from app.models.project import Project
 from app.models.project_participant import ProjectParticipant
+from sqlalchemy.orm import selectinload
 from database import db
+from app.utils.dependencies import dependency_report, describe
+from app.utils.bulk import bulk_create, bulk_update, bulk_delete, delete_checked
+from app.utils.pagination import paginate
+from app.utils.export import stream_export
+from app.utils.fields import parse_fields, apply_fields
+from app.utils.includes import parse_includes, apply_includes, embed
 
 class ParticipantController:
     
-    def get_all_participants(self, filters=None):
+    # Non-nullable columns clients may order list pages by
+    sortable_fields = ('full_name', 'email')
+    
+    # Relationships clients may embed with ?include=, as (loader option, serializer)
+    includable = {
+        'projects': (
+            selectinload(Participant.projects).joinedload(ProjectParticipant.project),
+            lambda participant: [
+                dict(link.project.to_dict(), role_on_project=link.role_on_project, skill_role=link.skill_role)
+                for link in participant.projects
+            ]
+        ),
+    }
+    
+    # Fields clients must send on create, and may send on create or update
+    required_fields = ('full_name', 'email', 'affiliation', 'institution')
+    updatable_fields = ('full_name', 'email', 'affiliation', 'specialization',
+                        'cross_skill_trained', 'institution')
+    
+    # Unique fields, as field -> error when the value is taken
+    unique_fields = {'email': 'Email already registered'}
+    
+    # Values for optional fields a create leaves out
+    defaults = {'cross_skill_trained': False}
+    
+    # Rows that block a delete, as (foreign key column, key, label)
+    dependents = (
+        (ProjectParticipant.participant_id, 'projects', 'projects'),
+    )
+    
+    def _build_query(self, filters=None):
+        """Base participants query with the list filters applied"""
+        query = Participant.query
+        
+        if filters:
+            if 'affiliation' in filters:
+                query = query.filter(Participant.affiliation == filters['affiliation'])
+            if 'cross_skill_trained' in filters:
+                # Convert string to boolean
+                cross_skill_trained = filters['cross_skill_trained'].lower() == 'true'
+                query = query.filter(Participant.cross_skill_trained == cross_skill_trained)
+            if 'institution' in filters:
+                query = query.filter(Participant.institution == filters['institution'])
+            if 'specialization' in filters:
+                query = query.filter(Participant.specialization == filters['specialization'])
+        return query
+    
+    def get_all_participants(self, filters=None, page=None, include=None, fields=None):
         """List all participants with optional filtering"""
         try:
-            query = Participant.query
+            includes = parse_includes(include, self.includable)
+            fields = parse_fields(fields, Participant)
+            query = apply_fields(apply_includes(self._build_query(filters), includes, self.includable), Participant, fields)
+            serialize = lambda participant: embed(participant, includes, self.includable, fields)
             
-            if filters:
-                if 'affiliation' in filters:
-                    query = query.filter(Participant.affiliation == filters['affiliation'])
-                if 'cross_skill_trained' in filters:
-                    # Convert string to boolean
-                    cross_skill_trained = filters['cross_skill_trained'].lower() == 'true'
-                    query = query.filter(Participant.cross_skill_trained == cross_skill_trained)
-                if 'institution' in filters:
-                    query = query.filter(Participant.institution == filters['institution'])
-                if 'specialization' in filters:
-                    query = query.filter(Participant.specialization == filters['specialization'])
+            if page is not None:
+                return jsonify(paginate(query, Participant, page, self.sortable_fields, serialize)), 200
             
             participants = query.all()
-            return jsonify([participant.to_dict() for participant in participants]), 200
+            return jsonify([serialize(participant) for participant in participants]), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve participants: {str(e)}'}), 500
     
-    def get_participant_by_id(self, participant_id):
+    def export_participants(self, filters=None, fmt='ndjson'):
+        """Stream participants as NDJSON or CSV"""
+        try:
+            return stream_export(self._build_query(filters), Participant, fmt, 'participants')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': f'Failed to export participants: {str(e)}'}), 500
+    
+    def get_participant_by_id(self, participant_id, include=None, fields=None):
         """Get participant details by ID"""
         try:
-            participant = Participant.query.get(participant_id)
+            includes = parse_includes(include, self.includable)
+            fields = parse_fields(fields, Participant)
+            query = apply_fields(apply_includes(Participant.query, includes, self.includable), Participant, fields)
+            participant = query.get(participant_id)
             if not participant:
                 return jsonify({'error': 'Participant not found'}), 404
-            return jsonify(participant.to_dict()), 200
+            return jsonify(embed(participant, includes, self.includable, fields)), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve participant: {str(e)}'}), 500
     
@@ -42,8 +106,7 @@ class ParticipantController:
         """Create new participant"""
         try:
             # Validate required fields
-            required_fields = ['full_name', 'email', 'affiliation', 'institution']
-            for field in required_fields:
+            for field in self.required_fields:
                 if field not in data or not data[field]:
                     return jsonify({'error': f'Missing required field: {field}'}), 400
             
@@ -82,9 +145,7 @@ class ParticipantController:
                 if existing:
                     return jsonify({'error': 'Email already registered'}), 400
             
-            updatable_fields = ['full_name', 'email', 'affiliation', 'specialization', 
-                              'cross_skill_trained', 'institution']
-            for field in updatable_fields:
+            for field in self.updatable_fields:
                 if field in data:
                     setattr(participant, field, data[field])
             
@@ -97,24 +158,76 @@ class ParticipantController:
     def delete_participant(self, participant_id):
         """Delete participant (with dependency check)"""
         try:
-            participant = Participant.query.get(participant_id)
+            # Existence and every dependent count in one locked query; the DELETE re-checks them
+            participant, counts = delete_checked(Participant, participant_id, self.dependents)
             if not participant:
                 return jsonify({'error': 'Participant not found'}), 404
-            
-            # Check for project associations
-            project_count = ProjectParticipant.query.filter_by(participant_id=participant_id).count()
-            if project_count > 0:
+            blocked = describe(counts, self.dependents)
+            if blocked:
                 return jsonify({
-                    'error': f'Cannot delete participant. They are assigned to {project_count} projects.'
+                    'error': f'Cannot delete participant. They are assigned to {counts["projects"]} projects.'
                 }), 400
             
-            db.session.delete(participant)
             db.session.commit()
             return '', 204
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f'Failed to delete participant: {str(e)}'}), 500
     
+    def get_participant_dependencies(self, participant_id):
+        """What would block deleting the participant, without deleting it"""
+        try:
+            report = dependency_report(Participant, participant_id, self.dependents)
+            if report is None:
+                return jsonify({'error': 'Participant not found'}), 404
+            return jsonify(report), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to check participant dependencies: {str(e)}'}), 500
+    
+    def bulk_create_participants(self, data, atomic=False):
+        """Create many participants in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_create(Participant, data, self.required_fields, self.updatable_fields,
+                                          unique_fields=self.unique_fields, defaults=self.defaults, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to create participants: {str(e)}'}), 400
+    
+    def bulk_update_participants(self, data, atomic=False):
+        """Update many participants in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_update(Participant, data, self.updatable_fields,
+                                          unique_fields=self.unique_fields, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to update participants: {str(e)}'}), 400
+    
+    def bulk_delete_participants(self, data, atomic=False):
+        """Delete many participants in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_delete(Participant, data, self.dependents, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to delete participants: {str(e)}'}), 500
+    
     def get_participant_projects(self, participant_id):
         """Get all projects for a participant"""
         try:
@@ -126,7 +239,7 @@ class ParticipantController:
             projects = db.session.query(
                 Project, ProjectParticipant
             ).join(
-                ProjectParticipant, Project.project_id == ProjectParticipant.project_id
+                ProjectParticipant, Project.id == ProjectParticipant.project_id
             ).filter(
                 ProjectParticipant.participant_id == participant_id
             ).all()
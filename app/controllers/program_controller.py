@@ -2,24 +2,52 @@ from flask import jsonify
 from app.models.program import Program
 from app.models.project import Project
 from database import db
+from app.utils.dependencies import dependency_report, describe
+from app.utils.bulk import bulk_create, bulk_update, bulk_delete, delete_checked
+from app.utils.fields import parse_fields, apply_fields, pick
+from app.utils.pagination import paginate
 
 class ProgramController:
     
-    def get_all_programs(self):
+    # Non-nullable columns clients may order list pages by
+    sortable_fields = ('name',)
+    
+    # Fields clients must send on create, and may send on create or update
+    required_fields = ('name', 'description')
+    updatable_fields = ('name', 'description', 'national_alignment', 'focus_areas', 'phases')
+    
+    # Rows that block a delete, as (foreign key column, key, label)
+    dependents = (
+        (Project.program_id, 'projects', 'projects'),
+    )
+    
+    def get_all_programs(self, page=None, fields=None):
         """List all programs"""
         try:
-            programs = Program.query.all()
-            return jsonify([program.to_dict() for program in programs]), 200
+            fields = parse_fields(fields, Program)
+            query = apply_fields(Program.query, Program, fields)
+            serialize = lambda program: pick(program, fields)
+            
+            if page is not None:
+                return jsonify(paginate(query, Program, page, self.sortable_fields, serialize)), 200
+            
+            programs = query.all()
+            return jsonify([serialize(program) for program in programs]), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve programs: {str(e)}'}), 500
     
-    def get_program_by_id(self, program_id):
+    def get_program_by_id(self, program_id, fields=None):
         """Get program details by ID"""
         try:
-            program = Program.query.get(program_id)
+            fields = parse_fields(fields, Program)
+            program = apply_fields(Program.query, Program, fields).get(program_id)
             if not program:
                 return jsonify({'error': 'Program not found'}), 404
-            return jsonify(program.to_dict()), 200
+            return jsonify(pick(program, fields)), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve program: {str(e)}'}), 500
     
@@ -27,8 +55,7 @@ class ProgramController:
         """Create new program"""
         try:
             # Validate required fields
-            required_fields = ['name', 'description']
-            for field in required_fields:
+            for field in self.required_fields:
                 if field not in data or not data[field]:
                     return jsonify({'error': f'Missing required field: {field}'}), 400
             
@@ -57,8 +84,7 @@ class ProgramController:
                 return jsonify({'error': 'Program not found'}), 404
             
             # Update fields
-            updatable_fields = ['name', 'description', 'national_alignment', 'focus_areas', 'phases']
-            for field in updatable_fields:
+            for field in self.updatable_fields:
                 if field in data:
                     setattr(program, field, data[field])
             
@@ -71,24 +97,75 @@ class ProgramController:
     def delete_program(self, program_id):
         """Delete program (with dependency check)"""
         try:
-            program = Program.query.get(program_id)
+            # Existence and every dependent count in one locked query; the DELETE re-checks them
+            program, counts = delete_checked(Program, program_id, self.dependents)
             if not program:
                 return jsonify({'error': 'Program not found'}), 404
-            
-            # Check for dependent projects
-            project_count = Project.query.filter_by(program_id=program_id).count()
-            if project_count > 0:
+            blocked = describe(counts, self.dependents)
+            if blocked:
                 return jsonify({
-                    'error': f'Cannot delete program. {project_count} projects are still linked to this program.'
+                    'error': f'Cannot delete program. {counts["projects"]} projects are still linked to this program.'
                 }), 400
             
-            db.session.delete(program)
             db.session.commit()
             return '', 204
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f'Failed to delete program: {str(e)}'}), 500
     
+    def get_program_dependencies(self, program_id):
+        """What would block deleting the program, without deleting it"""
+        try:
+            report = dependency_report(Program, program_id, self.dependents)
+            if report is None:
+                return jsonify({'error': 'Program not found'}), 404
+            return jsonify(report), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to check program dependencies: {str(e)}'}), 500
+    
+    def bulk_create_programs(self, data, atomic=False):
+        """Create many programs in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_create(Program, data, self.required_fields, self.updatable_fields,
+                                          atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to create programs: {str(e)}'}), 400
+    
+    def bulk_update_programs(self, data, atomic=False):
+        """Update many programs in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_update(Program, data, self.updatable_fields, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to update programs: {str(e)}'}), 400
+    
+    def bulk_delete_programs(self, data, atomic=False):
+        """Delete many programs in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_delete(Program, data, self.dependents, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to delete programs: {str(e)}'}), 500
+    
     def get_projects_by_program(self, program_id):
         """Get all projects under a program"""
         try:
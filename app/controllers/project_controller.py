@@ -2,40 +2,108 @@ from flask import jsonify
 from app.models.project import Project
 from app.models.program import Program
 from app.models.facility import Facility
+from app.models.equipment import Equipment
 from app.models.participant import Participant
 from app.models.project_participant import ProjectParticipant
 from app.models.outcome import Outcome
+from sqlalchemy.orm import joinedload, selectinload
 from database import db
+from app.utils.dependencies import dependency_report, describe
+from app.utils.bulk import bulk_create, bulk_update, bulk_delete, delete_checked
+from app.utils.pagination import paginate
+from app.utils.export import stream_export
+from app.utils.matching import capability_index
+from app.utils.fields import parse_fields, apply_fields
+from app.utils.includes import parse_includes, apply_includes, dump, embed
 
 class ProjectController:
     
-    def get_all_projects(self, filters=None):
+    # Non-nullable columns clients may order list pages by
+    sortable_fields = ('title',)
+    
+    # Relationships clients may embed with ?include=, as (loader option, serializer)
+    includable = {
+        'facility': (joinedload(Project.facility), lambda project: dump(project.facility)),
+        'program': (joinedload(Project.program), lambda project: dump(project.program)),
+        'outcomes': (selectinload(Project.outcomes), lambda project: dump(project.outcomes)),
+        'participants': (
+            selectinload(Project.participants).joinedload(ProjectParticipant.participant),
+            lambda project: [
+                dict(link.participant.to_dict(), role_on_project=link.role_on_project, skill_role=link.skill_role)
+                for link in project.participants
+            ]
+        ),
+    }
+    
+    # Fields clients must send on create, and may send on create or update
+    required_fields = ('program_id', 'facility_id', 'title', 'nature')
+    updatable_fields = ('program_id', 'facility_id', 'title', 'nature',
+                        'description', 'innovation_focus', 'prototype_stage',
+                        'testing_requirements', 'commercialization_plan')
+    
+    # Foreign keys validated on write, as field -> referenced model
+    foreign_keys = {'program_id': Program, 'facility_id': Facility}
+    
+    # Rows that block a delete, as (foreign key column, key, label)
+    dependents = (
+        (ProjectParticipant.project_id, 'participants', 'participants'),
+        (Outcome.project_id, 'outcomes', 'outcomes'),
+    )
+    
+    def _build_query(self, filters=None):
+        """Base projects query with the list filters applied"""
+        query = Project.query
+        
+        if filters:
+            if 'facility_id' in filters:
+                query = query.filter(Project.facility_id == filters['facility_id'])
+            if 'program_id' in filters:
+                query = query.filter(Project.program_id == filters['program_id'])
+            if 'prototype_stage' in filters:
+                query = query.filter(Project.prototype_stage == filters['prototype_stage'])
+            if 'innovation_focus' in filters:
+                query = query.filter(Project.innovation_focus.ilike(f"%{filters['innovation_focus']}%"))
+        return query
+    
+    def get_all_projects(self, filters=None, page=None, include=None, fields=None):
         """List all projects with optional filtering"""
         try:
-            query = Project.query
-            
-            if filters:
-                if 'facility_id' in filters:
-                    query = query.filter(Project.facility_id == filters['facility_id'])
-                if 'program_id' in filters:
-                    query = query.filter(Project.program_id == filters['program_id'])
-                if 'prototype_stage' in filters:
-                    query = query.filter(Project.prototype_stage == filters['prototype_stage'])
-                if 'innovation_focus' in filters:
-                    query = query.filter(Project.innovation_focus.ilike(f"%{filters['innovation_focus']}%"))
+            includes = parse_includes(include, self.includable)
+            fields = parse_fields(fields, Project)
+            query = apply_fields(apply_includes(self._build_query(filters), includes, self.includable), Project, fields)
+            serialize = lambda project: embed(project, includes, self.includable, fields)
+            
+            if page is not None:
+                return jsonify(paginate(query, Project, page, self.sortable_fields, serialize)), 200
             
             projects = query.all()
-            return jsonify([project.to_dict() for project in projects]), 200
+            return jsonify([serialize(project) for project in projects]), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve projects: {str(e)}'}), 500
     
-    def get_project_by_id(self, project_id):
+    def export_projects(self, filters=None, fmt='ndjson'):
+        """Stream projects as NDJSON or CSV"""
+        try:
+            return stream_export(self._build_query(filters), Project, fmt, 'projects')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': f'Failed to export projects: {str(e)}'}), 500
+    
+    def get_project_by_id(self, project_id, include=None, fields=None):
         """Get project details by ID"""
         try:
-            project = Project.query.get(project_id)
+            includes = parse_includes(include, self.includable)
+            fields = parse_fields(fields, Project)
+            query = apply_fields(apply_includes(Project.query, includes, self.includable), Project, fields)
+            project = query.get(project_id)
             if not project:
                 return jsonify({'error': 'Project not found'}), 404
-            return jsonify(project.to_dict()), 200
+            return jsonify(embed(project, includes, self.includable, fields)), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve project: {str(e)}'}), 500
     
@@ -43,8 +111,7 @@ class ProjectController:
         """Create new project"""
         try:
             # Validate required fields
-            required_fields = ['program_id', 'facility_id', 'title', 'nature_of_project']
-            for field in required_fields:
+            for field in self.required_fields:
                 if field not in data or not data[field]:
                     return jsonify({'error': f'Missing required field: {field}'}), 400
             
@@ -61,7 +128,7 @@ class ProjectController:
                 program_id=data['program_id'],
                 facility_id=data['facility_id'],
                 title=data['title'],
-                nature_of_project=data['nature_of_project'],
+                nature=data['nature'],
                 description=data.get('description'),
                 innovation_focus=data.get('innovation_focus'),
                 prototype_stage=data.get('prototype_stage'),
@@ -95,10 +162,7 @@ class ProjectController:
                 if not facility:
                     return jsonify({'error': 'Invalid facility_id'}), 400
             
-            updatable_fields = ['program_id', 'facility_id', 'title', 'nature_of_project',
-                              'description', 'innovation_focus', 'prototype_stage',
-                              'testing_requirements', 'commercialization_plan']
-            for field in updatable_fields:
+            for field in self.updatable_fields:
                 if field in data:
                     setattr(project, field, data[field])
             
@@ -111,32 +175,76 @@ class ProjectController:
     def delete_project(self, project_id):
         """Delete project (with dependency checks)"""
         try:
-            project = Project.query.get(project_id)
+            # Existence and every dependent count in one locked query; the DELETE re-checks them
+            project, counts = delete_checked(Project, project_id, self.dependents)
             if not project:
                 return jsonify({'error': 'Project not found'}), 404
-            
-            # Check for dependencies
-            participant_count = ProjectParticipant.query.filter_by(project_id=project_id).count()
-            outcome_count = Outcome.query.filter_by(project_id=project_id).count()
-            
-            dependencies = []
-            if participant_count > 0:
-                dependencies.append(f'{participant_count} participants')
-            if outcome_count > 0:
-                dependencies.append(f'{outcome_count} outcomes')
-            
-            if dependencies:
+            blocked = describe(counts, self.dependents)
+            if blocked:
                 return jsonify({
-                    'error': f'Cannot delete project. It has {", ".join(dependencies)} linked to it.'
+                    'error': f'Cannot delete project. It has {blocked} linked to it.'
                 }), 400
             
-            db.session.delete(project)
             db.session.commit()
             return '', 204
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f'Failed to delete project: {str(e)}'}), 500
     
+    def get_project_dependencies(self, project_id):
+        """What would block deleting the project, without deleting it"""
+        try:
+            report = dependency_report(Project, project_id, self.dependents)
+            if report is None:
+                return jsonify({'error': 'Project not found'}), 404
+            return jsonify(report), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to check project dependencies: {str(e)}'}), 500
+    
+    def bulk_create_projects(self, data, atomic=False):
+        """Create many projects in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_create(Project, data, self.required_fields, self.updatable_fields,
+                                          foreign_keys=self.foreign_keys, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to create projects: {str(e)}'}), 400
+    
+    def bulk_update_projects(self, data, atomic=False):
+        """Update many projects in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_update(Project, data, self.updatable_fields,
+                                          foreign_keys=self.foreign_keys, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to update projects: {str(e)}'}), 400
+    
+    def bulk_delete_projects(self, data, atomic=False):
+        """Delete many projects in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_delete(Project, data, self.dependents, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to delete projects: {str(e)}'}), 500
+    
     def assign_participant(self, project_id, data):
         """Assign participant to project"""
         try:
@@ -205,7 +313,7 @@ class ProjectController:
             participants = db.session.query(
                 Participant, ProjectParticipant
             ).join(
-                ProjectParticipant, Participant.participant_id == ProjectParticipant.participant_id
+                ProjectParticipant, Participant.id == ProjectParticipant.participant_id
             ).filter(
                 ProjectParticipant.project_id == project_id
             ).all()
@@ -234,3 +342,31 @@ class ProjectController:
             return jsonify([outcome.to_dict() for outcome in outcomes]), 200
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve outcomes: {str(e)}'}), 500
+    
+    def get_project_recommendations(self, project_id, limit=5):
+        """Recommend facilities and equipment whose capabilities match the project"""
+        try:
+            project = Project.query.get(project_id)
+            if not project:
+                return jsonify({'error': 'Project not found'}), 404
+            
+            try:
+                limit = max(1, min(int(limit), 50))
+            except (TypeError, ValueError):
+                return jsonify({'error': 'limit must be an integer'}), 400
+            
+            requirements = ' '.join(filter(None, [project.innovation_focus, project.testing_requirements]))
+            matches = capability_index.match(requirements, limit)
+            
+            result = {'project_id': project_id}
+            for kind, model, key in (('facility', Facility, 'facilities'), ('equipment', Equipment, 'equipment')):
+                ids = [doc_id for doc_id, _, _ in matches[kind]]
+                rows = {row.id: row for row in model.query.filter(model.id.in_(ids)).all()} if ids else {}
+                result[key] = [
+                    dict(rows[doc_id].to_dict(), score=round(score, 4), matched_terms=terms)
+                    for doc_id, score, terms in matches[kind] if doc_id in rows
+                ]
+            
+            return jsonify(result), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to build recommendations: {str(e)}'}), 500
@@ -2,13 +2,29 @@ from flask import jsonify
 from app.models.service import Service
 from app.models.facility import Facility
 from database import db
+from app.utils.bulk import bulk_create, bulk_update, bulk_delete
+from app.utils.fields import parse_fields, apply_fields, pick
+from app.utils.pagination import paginate, page_size
+from app.utils.search import fulltext_search
 
 class ServiceController:
     
-    def get_all_services(self, filters=None):
+    # Non-nullable columns clients may order list pages by
+    sortable_fields = ('name',)
+    
+    # Fields clients must send on create, and may send on create or update
+    required_fields = ('facility_id', 'name', 'category')
+    updatable_fields = ('facility_id', 'name', 'description', 'category', 'skill_type')
+    
+    # Foreign keys validated on write, as field -> referenced model
+    foreign_keys = {'facility_id': Facility}
+    
+    def get_all_services(self, filters=None, page=None, fields=None):
         """List all services with optional filtering"""
         try:
-            query = Service.query
+            fields = parse_fields(fields, Service)
+            query = apply_fields(Service.query, Service, fields)
+            serialize = lambda service: pick(service, fields)
             
             if filters:
                 if 'category' in filters:
@@ -18,36 +34,51 @@ class ServiceController:
                 if 'facility_id' in filters:
                     query = query.filter(Service.facility_id == filters['facility_id'])
             
+            if page is not None:
+                return jsonify(paginate(query, Service, page, self.sortable_fields, serialize)), 200
+            
             services = query.all()
-            return jsonify([service.to_dict() for service in services]), 200
+            return jsonify([serialize(service) for service in services]), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve services: {str(e)}'}), 500
     
     def search_services(self, search_params):
-        """Search services by various criteria"""
+        """Search services by various criteria, ranked by relevance"""
         try:
             query = Service.query
             
+            # ?q= searches every indexed column, the others are column-scoped
+            terms = {}
             for key, value in search_params.items():
-                if key == 'name':
-                    query = query.filter(Service.name.ilike(f"%{value}%"))
+                if key == 'q':
+                    terms[None] = value
+                elif key == 'name':
+                    terms['name'] = value
                 elif key == 'description':
-                    query = query.filter(Service.description.ilike(f"%{value}%"))
+                    terms['description'] = value
                 elif key == 'category':
                     query = query.filter(Service.category == value)
             
-            services = query.all()
-            return jsonify([service.to_dict() for service in services]), 200
+            query = fulltext_search(query, Service, terms)
+            results = query.limit(page_size(search_params.get('limit'))).all()
+            return jsonify([dict(service.to_dict(), score=score) for service, score in results]), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Search failed: {str(e)}'}), 500
     
-    def get_service_by_id(self, service_id):
+    def get_service_by_id(self, service_id, fields=None):
         """Get service details by ID"""
         try:
-            service = Service.query.get(service_id)
+            fields = parse_fields(fields, Service)
+            service = apply_fields(Service.query, Service, fields).get(service_id)
             if not service:
                 return jsonify({'error': 'Service not found'}), 404
-            return jsonify(service.to_dict()), 200
+            return jsonify(pick(service, fields)), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to retrieve service: {str(e)}'}), 500
     
@@ -55,8 +86,7 @@ class ServiceController:
         """Create new service"""
         try:
             # Validate required fields
-            required_fields = ['facility_id', 'name', 'category']
-            for field in required_fields:
+            for field in self.required_fields:
                 if field not in data or not data[field]:
                     return jsonify({'error': f'Missing required field: {field}'}), 400
             
@@ -94,8 +124,7 @@ class ServiceController:
                 if not facility:
                     return jsonify({'error': 'Invalid facility_id'}), 400
             
-            updatable_fields = ['facility_id', 'name', 'description', 'category', 'skill_type']
-            for field in updatable_fields:
+            for field in self.updatable_fields:
                 if field in data:
                     setattr(service, field, data[field])
             
@@ -118,3 +147,44 @@ class ServiceController:
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f'Failed to delete service: {str(e)}'}), 500
+    
+    def bulk_create_services(self, data, atomic=False):
+        """Create many services in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_create(Service, data, self.required_fields, self.updatable_fields,
+                                          foreign_keys=self.foreign_keys, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to create services: {str(e)}'}), 400
+    
+    def bulk_update_services(self, data, atomic=False):
+        """Update many services in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_update(Service, data, self.updatable_fields,
+                                          foreign_keys=self.foreign_keys, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to update services: {str(e)}'}), 400
+    
+    def bulk_delete_services(self, data, atomic=False):
+        """Delete many services in one transaction, with a result per item"""
+        try:
+            body, status, _ = bulk_delete(Service, data, atomic=atomic)
+            db.session.commit()
+            return jsonify(body), status
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Failed to delete services: {str(e)}'}), 500
@@ -0,0 +1,84 @@
+from flask import jsonify
+from app.models.facility import Facility
+from app.models.program import Program
+from database import db
+from app.utils.stats import COUNTERS, counter_name, read_counters
+
+def _breakdown(counts, label):
+    """[{label: value, 'count': n}, ...] from a one-column counter, largest first"""
+    return [{label: key[0], 'count': count}
+            for key, count in sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))]
+
+class StatsController:
+    
+    def get_totals(self):
+        """Row count of every table"""
+        try:
+            counts = read_counters(*COUNTERS)
+            return jsonify({table: counts[table].get((), 0) for table in COUNTERS}), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to retrieve stats: {str(e)}'}), 500
+    
+    def get_facility_utilization(self):
+        """Projects, equipment and services per facility"""
+        try:
+            names = ('projects.facility_id', 'equipment.facility_id', 'services.facility_id')
+            counts = read_counters(*names)
+            facilities = db.session.execute(
+                db.select(Facility.id, Facility.name, Facility.facility_type).order_by(Facility.name)
+            ).all()
+            result = []
+            for facility_id, name, facility_type in facilities:
+                key = (facility_id,)
+                result.append({
+                    'facility_id': facility_id,
+                    'name': name,
+                    'facility_type': facility_type,
+                    'projects': counts['projects.facility_id'].get(key, 0),
+                    'equipment': counts['equipment.facility_id'].get(key, 0),
+                    'services': counts['services.facility_id'].get(key, 0),
+                })
+            return jsonify(result), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to retrieve facility utilization: {str(e)}'}), 500
+    
+    def get_program_pipeline(self):
+        """Projects per program, broken down by prototype stage"""
+        try:
+            stages = counter_name('projects', ('program_id', 'prototype_stage'))
+            counts = read_counters('projects.program_id', stages)
+            by_program = {}
+            for (program_id, stage), count in counts[stages].items():
+                by_program.setdefault(program_id, {})[stage or 'Unspecified'] = count
+            programs = db.session.execute(db.select(Program.id, Program.name).order_by(Program.name)).all()
+            return jsonify([{
+                'program_id': program_id,
+                'name': name,
+                'projects': counts['projects.program_id'].get((program_id,), 0),
+                'stages': by_program.get(program_id, {}),
+            } for program_id, name in programs]), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to retrieve program pipeline: {str(e)}'}), 500
+    
+    def get_outcome_funnel(self):
+        """Outcomes by commercialization status and by type"""
+        try:
+            counts = read_counters('outcomes', 'outcomes.commercialization_status', 'outcomes.outcome_type')
+            return jsonify({
+                'total': counts['outcomes'].get((), 0),
+                'by_status': _breakdown(counts['outcomes.commercialization_status'], 'commercialization_status'),
+                'by_type': _breakdown(counts['outcomes.outcome_type'], 'outcome_type'),
+            }), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to retrieve outcome funnel: {str(e)}'}), 500
+    
+    def get_participants_by_institution(self):
+        """Participants per institution"""
+        try:
+            counts = read_counters('participants', 'participants.institution')
+            return jsonify({
+                'total': counts['participants'].get((), 0),
+                'by_institution': _breakdown(counts['participants.institution'], 'institution'),
+            }), 200
+        except Exception as e:
+            return jsonify({'error': f'Failed to retrieve participant stats: {str(e)}'}), 500
@@ -0,0 +1,17 @@
+# Import every model so relationship() names resolve no matter which
+# model a module happens to import first
+from app.models.program import Program
+from app.models.facility import Facility
+from app.models.service import Service
+from app.models.equipment import Equipment
+from app.models.project import Project
+from app.models.participant import Participant
+from app.models.project_participant import ProjectParticipant
+from app.models.outcome import Outcome
+from app.models.table_version import TableVersion
+from app.models.import_job import ImportJob
+from app.models.artifact_upload import ArtifactUpload
+from app.models.artifact import Artifact
+from app.models.job import Job
+from app.models.stat_counter import StatCounter
+from app.models.capability_change import CapabilityChange
@@ -0,0 +1,23 @@
+from datetime import datetime
+from app import db
+
+
+class Artifact(db.Model):
+    """A stored artifact file, addressed by its SHA-256 and shared by every outcome that attaches it"""
+    __tablename__ = "artifacts"
+
+    sha256 = db.Column(db.String(64), primary_key=True)  # hex digest, also the file's name in the store
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # outcomes pointing at this file
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'sha256': self.sha256,
+            'size': self.size,
+            'ref_count': self.ref_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f"<Artifact {self.sha256[:12]} refs={self.ref_count}>"
@@ -0,0 +1,33 @@
+from datetime import datetime
+from app import db
+
+
+class ArtifactUpload(db.Model):
+    """A resumable artifact upload; the bytes live in a partial file until an outcome claims them"""
+    __tablename__ = "artifact_uploads"
+
+    id = db.Column(db.String(32), primary_key=True)  # random token, also the partial file's name
+    filename = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)  # declared total size in bytes
+    received = db.Column(db.BigInteger, nullable=False, default=0)
+    checksum = db.Column(db.String(64), nullable=True)  # expected SHA-256 (hex), if the client sent one
+    sha256 = db.Column(db.String(64), nullable=True)  # actual SHA-256 once complete
+    status = db.Column(db.String(20), nullable=False, default='uploading', index=True)  # uploading, complete
+    file_path = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'size': self.size,
+            'offset': self.received,
+            'sha256': self.sha256,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f"<ArtifactUpload {self.id} {self.received}/{self.size}>"
@@ -0,0 +1,15 @@
+from datetime import datetime
+from app import db
+
+
+class CapabilityChange(db.Model):
+    """A facility or equipment row written, for each worker's matching index to re-read (see app.utils.matching)"""
+    __tablename__ = "capability_changes"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'facility' or 'equipment'
+    row_id = db.Column(db.Integer, nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<CapabilityChange {self.kind} {self.row_id}>"
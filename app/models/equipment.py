@@ -1,9 +1,13 @@
+from datetime import datetime
 from app import db
 
 
 
 class Equipment(db.Model):
     __tablename__ = "equipment"
+    __table_args__ = (
+        db.Index("ix_equipment_facility_id_usage_domain", "facility_id", "usage_domain"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     facility_id = db.Column(db.Integer, db.ForeignKey("facilities.id"), nullable=False)
@@ -11,11 +15,25 @@ class Equipment(db.Model):
     capabilities = db.Column(db.String(255), nullable=True)
     description = db.Column(db.Text, nullable=True)
     inventory_code = db.Column(db.String(100), nullable=True)
-    usage_domain = db.Column(db.String(100), nullable=True)  # Electronics, Mechanical, IoT
-    support_phase = db.Column(db.String(100), nullable=True)  # Training, Prototyping, etc.
+    usage_domain = db.Column(db.String(100), nullable=True, index=True)  # Electronics, Mechanical, IoT
+    support_phase = db.Column(db.String(100), nullable=True, index=True)  # Training, Prototyping, etc.
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     facility = db.relationship("Facility", back_populates="equipment")
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'facility_id': self.facility_id,
+            'name': self.name,
+            'capabilities': self.capabilities,
+            'description': self.description,
+            'inventory_code': self.inventory_code,
+            'usage_domain': self.usage_domain,
+            'support_phase': self.support_phase,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
     def __repr__(self):
         return f"<Equipment {self.name}>"
\ No newline at end of file
@@ -1,3 +1,4 @@
+from datetime import datetime
 from app import db
 
 
@@ -10,8 +11,9 @@ class Facility(db.Model):
     location = db.Column(db.String(255), nullable=True)
     description = db.Column(db.Text, nullable=True)
     partner_org = db.Column(db.String(255), nullable=True)  
-    facility_type = db.Column(db.String(100), nullable=True) 
+    facility_type = db.Column(db.String(100), nullable=True, index=True) 
     capabilities = db.Column(db.String(255), nullable=True)  
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     services = db.relationship("Service", back_populates="facility")
@@ -26,7 +28,8 @@ class Facility(db.Model):
             'description': self.description,
             'partner_org': self.partner_org,
             'facility_type': self.facility_type,
-            'capabilities': self.capabilities
+            'capabilities': self.capabilities,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
     def __repr__(self):
@@ -0,0 +1,47 @@
+from datetime import datetime
+from app import db
+
+
+class ImportJob(db.Model):
+    """A spreadsheet import and its progress, updated after every committed chunk"""
+    __tablename__ = "import_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(50), nullable=False)  # programs, facilities, participants, ...
+    filename = db.Column(db.String(255), nullable=False)
+    file_path = db.Column(db.String(255), nullable=False)
+    match_on = db.Column(db.String(50), nullable=True)  # column used to find rows to update
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)  # pending, running, completed, failed
+    total_rows = db.Column(db.Integer, nullable=True)
+    processed_rows = db.Column(db.Integer, nullable=False, default=0)
+    created_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_count = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.JSON, nullable=False, default=list)  # first MAX_IMPORT_ERRORS row errors
+    message = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'entity': self.entity,
+            'filename': self.filename,
+            'match_on': self.match_on,
+            'status': self.status,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'progress': round(self.processed_rows / self.total_rows, 4) if self.total_rows else None,
+            'created_count': self.created_count,
+            'updated_count': self.updated_count,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'message': self.message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f"<ImportJob {self.id} {self.entity} {self.status}>"
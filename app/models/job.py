@@ -0,0 +1,46 @@
+from datetime import datetime
+from app import db
+
+
+class Job(db.Model):
+    """A unit of background work, claimed and run by `flask jobs worker`"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # The worker's claim query: next queued job that is due
+        db.Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(100), nullable=False, index=True)  # task name, see app.utils.jobs.TASKS
+    payload = db.Column(db.JSON, nullable=False, default=dict)  # keyword arguments of the task
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # not claimed before this (retry backoff)
+    locked_by = db.Column(db.String(100), nullable=True)  # worker running it
+    locked_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # stamped by the worker while the job runs
+    last_error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'payload': self.payload,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'locked_by': self.locked_by,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'last_error': self.last_error,
+            'result': self.result,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind} {self.status}>"
@@ -1,20 +1,44 @@
+from datetime import datetime
 from app import db
 
 
 class Outcome(db.Model):
     __tablename__ = "outcomes"
+    __table_args__ = (
+        db.Index("ix_outcomes_project_id_outcome_type", "project_id", "outcome_type"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey("projects.id"), nullable=False)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=True)
     artifact_link = db.Column(db.String(255), nullable=True)
-    outcome_type = db.Column(db.String(100), nullable=True)  # CAD, PCB, Prototype, Report
+    # Stored files: the content address in the artifact store and the name it was uploaded as
+    artifact_sha256 = db.Column(db.String(64), db.ForeignKey("artifacts.sha256", name="fk_outcomes_artifact_sha256"),
+                                nullable=True, index=True)
+    artifact_name = db.Column(db.String(255), nullable=True)
+    outcome_type = db.Column(db.String(100), nullable=True, index=True)  # CAD, PCB, Prototype, Report
     quality_certification = db.Column(db.String(255), nullable=True)  # UIRI certification, etc.
-    commercialization_status = db.Column(db.String(100), nullable=True)  # Demoed, Launched, etc.
+    commercialization_status = db.Column(db.String(100), nullable=True, index=True)  # Demoed, Launched, etc.
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     project = db.relationship("Project", back_populates="outcomes")
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'title': self.title,
+            'description': self.description,
+            'artifact_link': self.artifact_link,
+            'artifact_sha256': self.artifact_sha256,
+            'artifact_name': self.artifact_name,
+            'outcome_type': self.outcome_type,
+            'quality_certification': self.quality_certification,
+            'commercialization_status': self.commercialization_status,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
     def __repr__(self):
         return f"<Outcome {self.title}>"
\ No newline at end of file
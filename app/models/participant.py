@@ -1,3 +1,4 @@
+from datetime import datetime
 from app import db
 
 
@@ -7,13 +8,26 @@ class Participant(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(255), nullable=False)
     email = db.Column(db.String(255), unique=True, nullable=False)
-    affiliation = db.Column(db.String(100), nullable=True)  # CS, SE, etc.
+    affiliation = db.Column(db.String(100), nullable=True, index=True)  # CS, SE, etc.
     specialization = db.Column(db.String(100), nullable=True)  # Software, Hardware, etc.
     cross_skill_trained = db.Column(db.Boolean, default=False)
-    institution = db.Column(db.String(100), nullable=True)  # SCIT, CEDAT, etc.
+    institution = db.Column(db.String(100), nullable=True, index=True)  # SCIT, CEDAT, etc.
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     projects = db.relationship("ProjectParticipant", back_populates="participant")
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'full_name': self.full_name,
+            'email': self.email,
+            'affiliation': self.affiliation,
+            'specialization': self.specialization,
+            'cross_skill_trained': self.cross_skill_trained,
+            'institution': self.institution,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
     def __repr__(self):
         return f"<Participant {self.full_name}>"
\ No newline at end of file
@@ -1,4 +1,5 @@
 
+from datetime import datetime
 from app import db
 
 
@@ -12,6 +13,7 @@ class Program(db.Model):
     national_alignment = db.Column(db.String(255), nullable=True)  
     focus_areas = db.Column(db.String(255), nullable=True)  
     phases = db.Column(db.String(255), nullable=True)  
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     projects = db.relationship("Project", back_populates="program")
@@ -23,7 +25,8 @@ class Program(db.Model):
             'description': self.description,
             'national_alignment': self.national_alignment,
             'focus_areas': self.focus_areas,
-            'phases': self.phases
+            'phases': self.phases,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
     def __repr__(self):
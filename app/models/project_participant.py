@@ -1,17 +1,32 @@
+from datetime import datetime
 from app import db
 
 class ProjectParticipant(db.Model):
     __tablename__ = "project_participants"
+    __table_args__ = (
+        db.Index("ux_project_participants_project_id_participant_id", "project_id", "participant_id", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     project_id = db.Column(db.Integer, db.ForeignKey("projects.id"), nullable=False)
-    participant_id = db.Column(db.Integer, db.ForeignKey("participants.id"), nullable=False)
+    participant_id = db.Column(db.Integer, db.ForeignKey("participants.id"), nullable=False, index=True)
     role_on_project = db.Column(db.String(50), nullable=False)  # Student, Lecturer, Contributor
     skill_role = db.Column(db.String(50), nullable=True)  # Developer, Engineer, Designer, Business Lead
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     project = db.relationship("Project", back_populates="participants")
     participant = db.relationship("Participant", back_populates="projects")
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'participant_id': self.participant_id,
+            'role_on_project': self.role_on_project,
+            'skill_role': self.skill_role,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
     def __repr__(self):
         return f"<ProjectParticipant project_id={self.project_id}, participant_id={self.participant_id}, role={self.role_on_project}, skill={self.skill_role}>"
@@ -1,3 +1,4 @@
+from datetime import datetime
 from app import db
 
 
@@ -5,13 +6,17 @@ from app import db
 
 class Service(db.Model):
     __tablename__ = "services"
+    __table_args__ = (
+        db.Index("ix_services_facility_id_category", "facility_id", "category"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     facility_id = db.Column(db.Integer, db.ForeignKey("facilities.id"), nullable=False)
     name = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    category = db.Column(db.String(100), nullable=True) 
-    skill_type = db.Column(db.String(100), nullable=True)  
+    category = db.Column(db.String(100), nullable=True, index=True) 
+    skill_type = db.Column(db.String(100), nullable=True, index=True)  
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     facility = db.relationship("Facility", back_populates="services")
@@ -23,7 +28,8 @@ class Service(db.Model):
             'name': self.name,
             'description': self.description,
             'category': self.category,
-            'skill_type': self.skill_type
+            'skill_type': self.skill_type,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
     def __repr__(self):
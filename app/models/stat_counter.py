@@ -0,0 +1,15 @@
+from datetime import datetime
+from app import db
+
+
+class StatCounter(db.Model):
+    """Row count of one group of a table, kept current by every write (see app.utils.stats)"""
+    __tablename__ = "stat_counters"
+
+    name = db.Column(db.String(100), primary_key=True)  # 'projects' or 'projects.facility_id', ...
+    key = db.Column(db.String(255), primary_key=True)  # JSON list of the grouped values, '[]' for totals
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<StatCounter {self.name}{self.key}={self.value}>"
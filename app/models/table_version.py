@@ -0,0 +1,14 @@
+from datetime import datetime
+from app import db
+
+
+class TableVersion(db.Model):
+    """Change counter per table, bumped on every flush that touches the table"""
+    __tablename__ = "table_versions"
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TableVersion {self.table_name}={self.version}>"
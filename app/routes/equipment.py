@@ -1,11 +1,17 @@
 from flask import Blueprint, request, jsonify
 from app.controllers.equipment_controller import EquipmentController
+from app.utils.pagination import get_page_args
+from app.utils.conditional import conditional
+from app.utils.bulk import BULK_QUERY_BUDGET, atomic_arg
+from app.utils.instrumentation import query_budget
+from app.models.equipment import Equipment
 
 equipment_bp = Blueprint('equipment', __name__)
 controller = EquipmentController()
 
 # Basic CRUD operations
 @equipment_bp.route('/', methods=['GET'])
+@conditional('equipment')
 def get_all_equipment():
     """List all equipment globally with optional filters"""
     # Handle filters: ?usageDomain=Electronics&supportPhase=Prototyping&facilityId=1
@@ -16,18 +22,20 @@ def get_all_equipment():
         'capability': request.args.get('capability')
     }
     filters = {k: v for k, v in filters.items() if v is not None}
-    return controller.get_all_equipment(filters)
+    return controller.get_all_equipment(filters, get_page_args(), request.args.get('fields'))
 
 @equipment_bp.route('/search', methods=['GET'])
+@conditional('equipment')
 def search_equipment():
     """Search equipment by capability/usage domain"""
     search_params = request.args.to_dict()
     return controller.search_equipment(search_params)
 
 @equipment_bp.route('/<int:equipment_id>', methods=['GET'])
+@conditional(model=Equipment, id_arg='equipment_id')
 def get_equipment_by_id(equipment_id):
     """View equipment details"""
-    return controller.get_equipment_by_id(equipment_id)
+    return controller.get_equipment_by_id(equipment_id, request.args.get('fields'))
 
 @equipment_bp.route('/', methods=['POST'])
 def create_equipment():
@@ -42,4 +50,23 @@ def update_equipment(equipment_id):
 @equipment_bp.route('/<int:equipment_id>', methods=['DELETE'])
 def delete_equipment(equipment_id):
     """Delete equipment"""
-    return controller.delete_equipment(equipment_id)
\ No newline at end of file
+    return controller.delete_equipment(equipment_id)
+
+# Bulk operations: a JSON list of items (ids to delete), ?atomic=true for all-or-nothing
+@equipment_bp.route('/bulk', methods=['POST'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_create_equipment():
+    """Create equipment in bulk"""
+    return controller.bulk_create_equipment(request.json, atomic_arg())
+
+@equipment_bp.route('/bulk', methods=['PATCH'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_update_equipment():
+    """Update equipment in bulk"""
+    return controller.bulk_update_equipment(request.json, atomic_arg())
+
+@equipment_bp.route('/bulk', methods=['DELETE'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_delete_equipment():
+    """Delete equipment in bulk"""
+    return controller.bulk_delete_equipment(request.json, atomic_arg())
\ No newline at end of file
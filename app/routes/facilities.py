@@ -1,11 +1,17 @@
 from flask import Blueprint, request, jsonify
 from app.controllers.facility_controller import FacilityController
+from app.utils.pagination import get_page_args
+from app.utils.conditional import conditional
+from app.utils.bulk import BULK_QUERY_BUDGET, atomic_arg
+from app.utils.instrumentation import query_budget
+from app.models.facility import Facility
 
 facilities_bp = Blueprint('facilities', __name__)
 controller = FacilityController()
 
 # Basic CRUD operations
 @facilities_bp.route('/', methods=['GET'])
+@conditional('facilities', 'services', 'equipment', 'projects')
 def get_all_facilities():
     """List all facilities with optional search/filter"""
     # Handle search parameters: ?type=Lab&partner=UIRI&capability=CNC
@@ -17,18 +23,20 @@ def get_all_facilities():
     }
     # Remove None values
     filters = {k: v for k, v in filters.items() if v is not None}
-    return controller.get_all_facilities(filters)
+    return controller.get_all_facilities(filters, get_page_args(), request.args.get('include'), request.args.get('fields'))
 
 @facilities_bp.route('/search', methods=['GET'])
+@conditional('facilities')
 def search_facilities():
     """Advanced search facilities"""
     search_params = request.args.to_dict()
     return controller.search_facilities(search_params)
 
 @facilities_bp.route('/<int:facility_id>', methods=['GET'])
+@conditional('services', 'equipment', 'projects', model=Facility, id_arg='facility_id')
 def get_facility_by_id(facility_id):
-    """View facility details"""
-    return controller.get_facility_by_id(facility_id)
+    """View facility details (?include=services,equipment,projects)"""
+    return controller.get_facility_by_id(facility_id, request.args.get('include'), request.args.get('fields'))
 
 @facilities_bp.route('/', methods=['POST'])
 def create_facility():
@@ -45,18 +53,48 @@ def delete_facility(facility_id):
     """Delete facility"""
     return controller.delete_facility(facility_id)
 
+@facilities_bp.route('/<int:facility_id>/dependencies', methods=['GET'])
+def get_facility_dependencies(facility_id):
+    """Dry run of the delete: dependent counts and whether it would succeed"""
+    return controller.get_facility_dependencies(facility_id)
+
+# Bulk operations: a JSON list of items (ids to delete), ?atomic=true for all-or-nothing
+@facilities_bp.route('/bulk', methods=['POST'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_create_facilities():
+    """Create facilities in bulk"""
+    return controller.bulk_create_facilities(request.json, atomic_arg())
+
+@facilities_bp.route('/bulk', methods=['PATCH'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_update_facilities():
+    """Update facilities in bulk"""
+    return controller.bulk_update_facilities(request.json, atomic_arg())
+
+@facilities_bp.route('/bulk', methods=['DELETE'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_delete_facilities():
+    """Delete facilities in bulk"""
+    return controller.bulk_delete_facilities(request.json, atomic_arg())
+
 # Related entity routes
 @facilities_bp.route('/<int:facility_id>/services', methods=['GET'])
+@conditional('facilities', 'services',
+             cache_tags=('facilities:{facility_id}', 'services.facility_id={facility_id}'))
 def get_services_by_facility(facility_id):
     """List services offered by facility"""
     return controller.get_services_by_facility(facility_id)
 
 @facilities_bp.route('/<int:facility_id>/equipment', methods=['GET'])
+@conditional('facilities', 'equipment',
+             cache_tags=('facilities:{facility_id}', 'equipment.facility_id={facility_id}'))
 def get_equipment_by_facility(facility_id):
     """List equipment at facility"""
     return controller.get_equipment_by_facility(facility_id)
 
 @facilities_bp.route('/<int:facility_id>/projects', methods=['GET'])
+@conditional('facilities', 'projects',
+             cache_tags=('facilities:{facility_id}', 'projects.facility_id={facility_id}'))
 def get_projects_by_facility(facility_id):
     """List projects at facility"""
     return controller.get_projects_by_facility(facility_id)
\ No newline at end of file
@@ -0,0 +1,22 @@
+from flask import Blueprint, request
+from app.controllers.import_controller import ImportController
+from app.utils.instrumentation import query_budget
+
+imports_bp = Blueprint('imports', __name__)
+controller = ImportController()
+
+@imports_bp.route('/', methods=['GET'])
+def get_imports():
+    """List recent imports (?status=running)"""
+    return controller.get_imports(request.args.get('status'))
+
+@imports_bp.route('/<entity>', methods=['POST'])
+@query_budget(20)  # stores the file and queues the job; the rows are written by the worker
+def create_import(entity):
+    """Import a CSV/XLSX file (multipart field "file"); ?matchOn=email updates existing rows"""
+    return controller.create_import(entity, request.files.get('file'), request.args.get('matchOn'))
+
+@imports_bp.route('/<int:job_id>', methods=['GET'])
+def get_import(job_id):
+    """Import progress and row errors"""
+    return controller.get_import(job_id)
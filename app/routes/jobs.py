@@ -0,0 +1,27 @@
+from flask import Blueprint, request
+from app.controllers.job_controller import JobController
+from app.utils.instrumentation import query_budget
+
+jobs_bp = Blueprint('jobs', __name__)
+controller = JobController()
+
+@jobs_bp.route('/', methods=['GET'])
+def get_jobs():
+    """List recent background jobs (?status=failed&kind=previews.generate)"""
+    return controller.get_jobs(request.args.get('status'), request.args.get('kind'))
+
+@jobs_bp.route('/counts', methods=['GET'])
+def get_job_counts():
+    """Queue depth per status and lag of the oldest due job"""
+    return controller.get_job_counts()
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status"""
+    return controller.get_job(job_id)
+
+@jobs_bp.route('/<int:job_id>/retry', methods=['POST'])
+@query_budget(20)
+def retry_job(job_id):
+    """Queue a failed job again"""
+    return controller.retry_job(job_id)
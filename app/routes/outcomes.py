@@ -1,52 +1,62 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from app.controllers.outcome_controller import OutcomeController
-from werkzeug.utils import secure_filename
+from app.utils.pagination import get_page_args
+from app.utils.conditional import conditional
+from app.utils.bulk import BULK_QUERY_BUDGET, atomic_arg
+from app.utils.instrumentation import query_budget
+from app.utils.downloads import send_artifact
+from app.models.outcome import Outcome
 import os
 
 outcomes_bp = Blueprint('outcomes', __name__)
 controller = OutcomeController()
 
-# Configure upload settings
-UPLOAD_FOLDER = 'uploads/outcomes'
+# Configure upload settings (files are kept in the content-addressed artifact store)
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx', 'zip', 'dwg', 'step', 'stl'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# Basic CRUD operations
-@outcomes_bp.route('/', methods=['GET'])
-def get_all_outcomes():
-    """List all outcomes (admin use) with optional filters"""
+def _list_filters():
+    """Collect the list filters shared by the listing and export routes"""
     filters = {
         'project_id': request.args.get('projectId'),
         'outcome_type': request.args.get('type'),
         'commercialization_status': request.args.get('commercializationStatus')
     }
     filters = {k: v for k, v in filters.items() if v is not None}
-    return controller.get_all_outcomes(filters)
+    return filters
+
+# Basic CRUD operations
+@outcomes_bp.route('/', methods=['GET'])
+@conditional('outcomes')
+def get_all_outcomes():
+    """List all outcomes (admin use) with optional filters"""
+    return controller.get_all_outcomes(_list_filters(), get_page_args(), request.args.get('fields'))
+
+@outcomes_bp.route('/export', methods=['GET'])
+def export_outcomes():
+    """Export outcomes as a stream (?format=ndjson|csv)"""
+    return controller.export_outcomes(_list_filters(), request.args.get('format', 'ndjson'))
 
 @outcomes_bp.route('/<int:outcome_id>', methods=['GET'])
+@conditional(model=Outcome, id_arg='outcome_id')
 def get_outcome_by_id(outcome_id):
     """View outcome details"""
-    return controller.get_outcome_by_id(outcome_id)
+    return controller.get_outcome_by_id(outcome_id, request.args.get('fields'))
 
 @outcomes_bp.route('/', methods=['POST'])
 def create_outcome():
     """Upload new outcome"""
-    # Handle file upload
+    # Handle file upload; the controller stores it by content
     artifact_file = None
     if 'artifact' in request.files:
         file = request.files['artifact']
         if file and file.filename != '' and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            if not os.path.exists(UPLOAD_FOLDER):
-                os.makedirs(UPLOAD_FOLDER)
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(file_path)
-            artifact_file = file_path
+            artifact_file = file
     
-    # Get form data
-    outcome_data = request.form.to_dict()
+    # Get form data (or JSON when attaching a resumable upload by upload_id)
+    outcome_data = request.form.to_dict() or request.get_json(silent=True) or {}
     outcome_data['artifact_file'] = artifact_file
     
     return controller.create_outcome(outcome_data)
@@ -59,12 +69,9 @@ def update_outcome(outcome_id):
     if 'artifact' in request.files:
         file = request.files['artifact']
         if file and file.filename != '' and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(file_path)
-            artifact_file = file_path
+            artifact_file = file
     
-    outcome_data = request.form.to_dict()
+    outcome_data = request.form.to_dict() or request.get_json(silent=True) or {}
     outcome_data['artifact_file'] = artifact_file
     
     return controller.update_outcome(outcome_id, outcome_data)
@@ -74,19 +81,83 @@ def delete_outcome(outcome_id):
     """Delete outcome"""
     return controller.delete_outcome(outcome_id)
 
-# File operations
+# Bulk operations: a JSON list of items (ids to delete), ?atomic=true for all-or-nothing
+@outcomes_bp.route('/bulk', methods=['POST'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_create_outcomes():
+    """Create outcomes in bulk"""
+    return controller.bulk_create_outcomes(request.json, atomic_arg())
+
+@outcomes_bp.route('/bulk', methods=['PATCH'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_update_outcomes():
+    """Update outcomes in bulk"""
+    return controller.bulk_update_outcomes(request.json, atomic_arg())
+
+@outcomes_bp.route('/bulk', methods=['DELETE'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_delete_outcomes():
+    """Delete outcomes in bulk"""
+    return controller.bulk_delete_outcomes(request.json, atomic_arg())
+
+# Resumable uploads for large artifacts: POST /uploads {filename, size, checksum?},
+# PUT each chunk with an Upload-Offset header, POST .../finalize, then create or
+# update the outcome with the returned upload_id
+@outcomes_bp.route('/uploads', methods=['POST'])
+def create_upload():
+    """Start a resumable artifact upload"""
+    return controller.create_upload(request.get_json(silent=True) or {})
+
+@outcomes_bp.route('/uploads/<upload_id>', methods=['GET', 'HEAD'])
+def get_upload(upload_id):
+    """Upload status and the offset to resume from"""
+    return controller.get_upload(upload_id)
+
+@outcomes_bp.route('/uploads/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """Append a chunk (raw request body) at Upload-Offset"""
+    offset = request.headers.get('Upload-Offset', request.args.get('offset'))
+    return controller.upload_chunk(upload_id, offset, request.stream)
+
+@outcomes_bp.route('/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """Verify a finished upload ({checksum?})"""
+    return controller.finalize_upload(upload_id, request.get_json(silent=True) or {})
+
+@outcomes_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    """Abandon an upload"""
+    return controller.delete_upload(upload_id)
+
+# File operations: Range requests, strong ETags from the content hash and,
+# with ARTIFACT_OFFLOAD, bodies streamed by the front proxy (see send_artifact)
 @outcomes_bp.route('/<int:outcome_id>/download', methods=['GET'])
 def download_artifact(outcome_id):
     """Download artifact file"""
-    file_path = controller.get_artifact_path(outcome_id)
+    file_path, filename, digest = controller.get_artifact_path(outcome_id)
     if file_path and os.path.exists(file_path):
-        return send_file(file_path, as_attachment=True)
+        return send_artifact(file_path, filename, digest, as_attachment=True)
     return jsonify({'error': 'File not found'}), 404
 
 @outcomes_bp.route('/<int:outcome_id>/view', methods=['GET'])
 def view_artifact(outcome_id):
     """View artifact (for images/PDFs)"""
-    file_path = controller.get_artifact_path(outcome_id)
+    file_path, filename, digest = controller.get_artifact_path(outcome_id)
+    if file_path and os.path.exists(file_path):
+        # Stored files have no extension, so the mimetype comes from the upload name
+        return send_artifact(file_path, filename, digest)
+    return jsonify({'error': 'File not found'}), 404
+
+@outcomes_bp.route('/<int:outcome_id>/preview', methods=['GET'])
+def preview_artifact(outcome_id):
+    """Small JPEG preview of an image or PDF artifact for gallery pages (?size=small|large)"""
+    return controller.get_preview(outcome_id, request.args.get('size', 'small'))
+
+@outcomes_bp.route('/artifacts/<digest>', methods=['GET'])
+def get_stored_artifact(digest):
+    """Artifact by SHA-256 (?name=, ?download=true); the URL names the content, so it is cached as immutable"""
+    file_path, filename = controller.get_stored_artifact(digest, request.args.get('name'))
     if file_path and os.path.exists(file_path):
-        return send_file(file_path)
+        as_attachment = request.args.get('download', 'false').lower() == 'true'
+        return send_artifact(file_path, filename, digest, as_attachment=as_attachment, immutable=True)
     return jsonify({'error': 'File not found'}), 404
\ No newline at end of file
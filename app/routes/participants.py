@@ -1,13 +1,16 @@
 from flask import Blueprint, request, jsonify
 from app.controllers.participant_controller import ParticipantController
+from app.utils.pagination import get_page_args
+from app.utils.conditional import conditional
+from app.utils.bulk import BULK_QUERY_BUDGET, atomic_arg
+from app.utils.instrumentation import query_budget
+from app.models.participant import Participant
 
 participants_bp = Blueprint('participants', __name__)
 controller = ParticipantController()
 
-# Basic CRUD operations
-@participants_bp.route('/', methods=['GET'])
-def get_all_participants():
-    """List all participants with optional filters"""
+def _list_filters():
+    """Collect the list filters shared by the listing and export routes"""
     # Handle filters: ?affiliation=CS&crossSkillTrained=true&institution=SCIT
     filters = {
         'affiliation': request.args.get('affiliation'),
@@ -16,12 +19,25 @@ def get_all_participants():
         'specialization': request.args.get('specialization')
     }
     filters = {k: v for k, v in filters.items() if v is not None}
-    return controller.get_all_participants(filters)
+    return filters
+
+# Basic CRUD operations
+@participants_bp.route('/', methods=['GET'])
+@conditional('participants', 'project_participants', 'projects')
+def get_all_participants():
+    """List all participants with optional filters"""
+    return controller.get_all_participants(_list_filters(), get_page_args(), request.args.get('include'), request.args.get('fields'))
+
+@participants_bp.route('/export', methods=['GET'])
+def export_participants():
+    """Export participants as a stream (?format=ndjson|csv)"""
+    return controller.export_participants(_list_filters(), request.args.get('format', 'ndjson'))
 
 @participants_bp.route('/<int:participant_id>', methods=['GET'])
+@conditional('project_participants', 'projects', model=Participant, id_arg='participant_id')
 def get_participant_by_id(participant_id):
-    """View participant profile"""
-    return controller.get_participant_by_id(participant_id)
+    """View participant profile (?include=projects)"""
+    return controller.get_participant_by_id(participant_id, request.args.get('include'), request.args.get('fields'))
 
 @participants_bp.route('/', methods=['POST'])
 def create_participant():
@@ -38,8 +54,34 @@ def delete_participant(participant_id):
     """Delete participant"""
     return controller.delete_participant(participant_id)
 
+@participants_bp.route('/<int:participant_id>/dependencies', methods=['GET'])
+def get_participant_dependencies(participant_id):
+    """Dry run of the delete: dependent counts and whether it would succeed"""
+    return controller.get_participant_dependencies(participant_id)
+
+# Bulk operations: a JSON list of items (ids to delete), ?atomic=true for all-or-nothing
+@participants_bp.route('/bulk', methods=['POST'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_create_participants():
+    """Create participants in bulk"""
+    return controller.bulk_create_participants(request.json, atomic_arg())
+
+@participants_bp.route('/bulk', methods=['PATCH'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_update_participants():
+    """Update participants in bulk"""
+    return controller.bulk_update_participants(request.json, atomic_arg())
+
+@participants_bp.route('/bulk', methods=['DELETE'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_delete_participants():
+    """Delete participants in bulk"""
+    return controller.bulk_delete_participants(request.json, atomic_arg())
+
 # Related entity routes
 @participants_bp.route('/<int:participant_id>/projects', methods=['GET'])
+@conditional('participants', 'project_participants', 'projects',
+             cache_tags=('participants:{participant_id}', 'project_participants.participant_id={participant_id}', 'projects'))
 def get_participant_projects(participant_id):
     """List projects for participant"""
     return controller.get_participant_projects(participant_id)
\ No newline at end of file
@@ -1,19 +1,26 @@
 from flask import Blueprint, request, jsonify
 from app.controllers.program_controller import ProgramController
+from app.utils.pagination import get_page_args
+from app.utils.conditional import conditional
+from app.utils.bulk import BULK_QUERY_BUDGET, atomic_arg
+from app.utils.instrumentation import query_budget
+from app.models.program import Program
 
 programs_bp = Blueprint('programs', __name__)
 controller = ProgramController()
 
 # Basic CRUD operations
 @programs_bp.route('/', methods=['GET'])
+@conditional('programs')
 def get_all_programs():
     """List all programs"""
-    return controller.get_all_programs()
+    return controller.get_all_programs(get_page_args(), request.args.get('fields'))
 
 @programs_bp.route('/<int:program_id>', methods=['GET'])
+@conditional(model=Program, id_arg='program_id')
 def get_program_by_id(program_id):
     """View program details"""
-    return controller.get_program_by_id(program_id)
+    return controller.get_program_by_id(program_id, request.args.get('fields'))
 
 @programs_bp.route('/', methods=['POST'])
 def create_program():
@@ -30,8 +37,34 @@ def delete_program(program_id):
     """Delete program"""
     return controller.delete_program(program_id)
 
+@programs_bp.route('/<int:program_id>/dependencies', methods=['GET'])
+def get_program_dependencies(program_id):
+    """Dry run of the delete: dependent counts and whether it would succeed"""
+    return controller.get_program_dependencies(program_id)
+
+# Bulk operations: a JSON list of items (ids to delete), ?atomic=true for all-or-nothing
+@programs_bp.route('/bulk', methods=['POST'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_create_programs():
+    """Create programs in bulk"""
+    return controller.bulk_create_programs(request.json, atomic_arg())
+
+@programs_bp.route('/bulk', methods=['PATCH'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_update_programs():
+    """Update programs in bulk"""
+    return controller.bulk_update_programs(request.json, atomic_arg())
+
+@programs_bp.route('/bulk', methods=['DELETE'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_delete_programs():
+    """Delete programs in bulk"""
+    return controller.bulk_delete_programs(request.json, atomic_arg())
+
 # Related entity routes
 @programs_bp.route('/<int:program_id>/projects', methods=['GET'])
+@conditional('programs', 'projects',
+             cache_tags=('programs:{program_id}', 'projects.program_id={program_id}'))
 def get_projects_by_program(program_id):
     """List projects under program"""
     return controller.get_projects_by_program(program_id)
\ No newline at end of file
@@ -1,13 +1,16 @@
 from flask import Blueprint, request, jsonify
 from app.controllers.project_controller import ProjectController
+from app.utils.pagination import get_page_args
+from app.utils.conditional import conditional
+from app.utils.bulk import BULK_QUERY_BUDGET, atomic_arg
+from app.utils.instrumentation import query_budget
+from app.models.project import Project
 
 projects_bp = Blueprint('projects', __name__)
 controller = ProjectController()
 
-# Basic CRUD operations
-@projects_bp.route('/', methods=['GET'])
-def get_all_projects():
-    """List all projects globally with optional filters"""
+def _list_filters():
+    """Collect the list filters shared by the listing and export routes"""
     # Handle filters: ?facilityId=1&programId=2&stage=Prototype
     filters = {
         'facility_id': request.args.get('facilityId'),
@@ -16,12 +19,25 @@ def get_all_projects():
         'innovation_focus': request.args.get('innovationFocus')
     }
     filters = {k: v for k, v in filters.items() if v is not None}
-    return controller.get_all_projects(filters)
+    return filters
+
+# Basic CRUD operations
+@projects_bp.route('/', methods=['GET'])
+@conditional('projects', 'facilities', 'programs', 'outcomes', 'project_participants', 'participants')
+def get_all_projects():
+    """List all projects globally with optional filters"""
+    return controller.get_all_projects(_list_filters(), get_page_args(), request.args.get('include'), request.args.get('fields'))
+
+@projects_bp.route('/export', methods=['GET'])
+def export_projects():
+    """Export projects as a stream (?format=ndjson|csv)"""
+    return controller.export_projects(_list_filters(), request.args.get('format', 'ndjson'))
 
 @projects_bp.route('/<int:project_id>', methods=['GET'])
+@conditional('facilities', 'programs', 'outcomes', 'project_participants', 'participants', model=Project, id_arg='project_id')
 def get_project_by_id(project_id):
-    """View project details"""
-    return controller.get_project_by_id(project_id)
+    """View project details (?include=facility,program,outcomes,participants)"""
+    return controller.get_project_by_id(project_id, request.args.get('include'), request.args.get('fields'))
 
 @projects_bp.route('/', methods=['POST'])
 def create_project():
@@ -38,6 +54,30 @@ def delete_project(project_id):
     """Delete project"""
     return controller.delete_project(project_id)
 
+@projects_bp.route('/<int:project_id>/dependencies', methods=['GET'])
+def get_project_dependencies(project_id):
+    """Dry run of the delete: dependent counts and whether it would succeed"""
+    return controller.get_project_dependencies(project_id)
+
+# Bulk operations: a JSON list of items (ids to delete), ?atomic=true for all-or-nothing
+@projects_bp.route('/bulk', methods=['POST'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_create_projects():
+    """Create projects in bulk"""
+    return controller.bulk_create_projects(request.json, atomic_arg())
+
+@projects_bp.route('/bulk', methods=['PATCH'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_update_projects():
+    """Update projects in bulk"""
+    return controller.bulk_update_projects(request.json, atomic_arg())
+
+@projects_bp.route('/bulk', methods=['DELETE'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_delete_projects():
+    """Delete projects in bulk"""
+    return controller.bulk_delete_projects(request.json, atomic_arg())
+
 # Participant management routes
 @projects_bp.route('/<int:project_id>/participants', methods=['POST'])
 def assign_participant(project_id):
@@ -50,12 +90,22 @@ def remove_participant(project_id, participant_id):
     return controller.remove_participant(project_id, participant_id)
 
 @projects_bp.route('/<int:project_id>/participants', methods=['GET'])
+@conditional('projects', 'project_participants', 'participants',
+             cache_tags=('projects:{project_id}', 'project_participants.project_id={project_id}', 'participants'))
 def get_project_participants(project_id):
     """List project participants"""
     return controller.get_project_participants(project_id)
 
 # Related entity routes
 @projects_bp.route('/<int:project_id>/outcomes', methods=['GET'])
+@conditional('projects', 'outcomes',
+             cache_tags=('projects:{project_id}', 'outcomes.project_id={project_id}'))
 def get_project_outcomes(project_id):
     """List outcomes for project"""
-    return controller.get_project_outcomes(project_id)
\ No newline at end of file
+    return controller.get_project_outcomes(project_id)
+
+@projects_bp.route('/<int:project_id>/recommendations', methods=['GET'])
+@conditional('facilities', 'equipment', model=Project, id_arg='project_id')
+def get_project_recommendations(project_id):
+    """Recommend facilities and equipment matching the project's requirements"""
+    return controller.get_project_recommendations(project_id, request.args.get('limit', 5))
\ No newline at end of file
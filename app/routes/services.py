@@ -1,11 +1,17 @@
 from flask import Blueprint, request, jsonify
 from app.controllers.service_controller import ServiceController
+from app.utils.pagination import get_page_args
+from app.utils.conditional import conditional
+from app.utils.bulk import BULK_QUERY_BUDGET, atomic_arg
+from app.utils.instrumentation import query_budget
+from app.models.service import Service
 
 services_bp = Blueprint('services', __name__)
 controller = ServiceController()
 
 # Basic CRUD operations
 @services_bp.route('/', methods=['GET'])
+@conditional('services')
 def get_all_services():
     """List all services globally with optional filters"""
     # Handle filters: ?category=Machining&skillType=Hardware&facilityId=1
@@ -15,18 +21,20 @@ def get_all_services():
         'facility_id': request.args.get('facilityId')
     }
     filters = {k: v for k, v in filters.items() if v is not None}
-    return controller.get_all_services(filters)
+    return controller.get_all_services(filters, get_page_args(), request.args.get('fields'))
 
 @services_bp.route('/search', methods=['GET'])
+@conditional('services')
 def search_services():
     """Search services by category"""
     search_params = request.args.to_dict()
     return controller.search_services(search_params)
 
 @services_bp.route('/<int:service_id>', methods=['GET'])
+@conditional(model=Service, id_arg='service_id')
 def get_service_by_id(service_id):
     """View service details"""
-    return controller.get_service_by_id(service_id)
+    return controller.get_service_by_id(service_id, request.args.get('fields'))
 
 @services_bp.route('/', methods=['POST'])
 def create_service():
@@ -41,4 +49,23 @@ def update_service(service_id):
 @services_bp.route('/<int:service_id>', methods=['DELETE'])
 def delete_service(service_id):
     """Delete service"""
-    return controller.delete_service(service_id)
\ No newline at end of file
+    return controller.delete_service(service_id)
+
+# Bulk operations: a JSON list of items (ids to delete), ?atomic=true for all-or-nothing
+@services_bp.route('/bulk', methods=['POST'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_create_services():
+    """Create services in bulk"""
+    return controller.bulk_create_services(request.json, atomic_arg())
+
+@services_bp.route('/bulk', methods=['PATCH'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_update_services():
+    """Update services in bulk"""
+    return controller.bulk_update_services(request.json, atomic_arg())
+
+@services_bp.route('/bulk', methods=['DELETE'])
+@query_budget(BULK_QUERY_BUDGET)
+def bulk_delete_services():
+    """Delete services in bulk"""
+    return controller.bulk_delete_services(request.json, atomic_arg())
\ No newline at end of file
@@ -0,0 +1,38 @@
+from flask import Blueprint
+from app.controllers.stats_controller import StatsController
+from app.utils.conditional import conditional
+
+stats_bp = Blueprint('stats', __name__)
+controller = StatsController()
+
+# Reports read the counters kept by app.utils.stats, never the tables themselves
+@stats_bp.route('/', methods=['GET'])
+@conditional('programs', 'facilities', 'services', 'equipment', 'projects',
+             'participants', 'project_participants', 'outcomes')
+def get_totals():
+    """Row counts of every table"""
+    return controller.get_totals()
+
+@stats_bp.route('/facilities', methods=['GET'])
+@conditional('facilities', 'projects', 'equipment', 'services')
+def get_facility_utilization():
+    """Projects, equipment and services per facility"""
+    return controller.get_facility_utilization()
+
+@stats_bp.route('/programs', methods=['GET'])
+@conditional('programs', 'projects')
+def get_program_pipeline():
+    """Projects per program by prototype stage"""
+    return controller.get_program_pipeline()
+
+@stats_bp.route('/outcomes', methods=['GET'])
+@conditional('outcomes')
+def get_outcome_funnel():
+    """Outcomes by commercialization status and type"""
+    return controller.get_outcome_funnel()
+
+@stats_bp.route('/participants', methods=['GET'])
+@conditional('participants')
+def get_participants_by_institution():
+    """Participants per institution"""
+    return controller.get_participants_by_institution()
@@ -0,0 +1,265 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.orm import Session
+from werkzeug.utils import secure_filename
+from database import db
+from app.models.artifact import Artifact
+from app.models.outcome import Outcome
+from app.utils.bulk import chunks
+from app.utils.jobs import enqueue
+from app.utils.metrics import count_upload_bytes
+from app.utils.previews import preview_root, remove_previews
+
+# Bytes read per block when hashing or copying a file
+COPY_BUFFER_SIZE = 1 << 20
+
+# Files on disk with no artifacts row (a request that failed after storing
+# its file) are swept by `flask artifacts gc` once they are this old
+ORPHAN_GRACE_SECONDS = 3600
+
+
+def store_root():
+    return current_app.config.get('ARTIFACT_STORE') or os.path.join(
+        current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'artifacts')
+
+
+def blob_path(digest):
+    """Where a digest lives: <store>/ab/cd/abcd..., so no directory grows past 65536 entries"""
+    return os.path.join(store_root(), digest[:2], digest[2:4], digest)
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _lock_folder(folder, shared=True):
+    """flock a store folder across processes: shared to store into it, exclusive to delete from it
+
+    Returns the descriptor to close, or None when an exclusive lock is
+    not free right now.
+    """
+    os.makedirs(folder, exist_ok=True)
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def store_file(path, digest=None):
+    """Move a file into the store, or drop it if the same content is already there
+
+    Returns the Artifact row (added to the session, not committed); its
+    ref_count is brought up to date by count_refs() once an outcome points
+    at it.
+    """
+    digest = digest or hash_file(path)
+    target = blob_path(digest)
+    folder = os.path.dirname(target)
+    # Held until the transaction ends: collect_garbage can't delete the file
+    # (or the row) between the check below and the commit that uses them
+    locks = db.session.info.setdefault('artifact_locks', {})
+    if folder not in locks:
+        locks[folder] = _lock_folder(folder)
+    if os.path.exists(target):
+        os.remove(path)
+    else:
+        os.replace(path, target)
+    artifact = db.session.get(Artifact, digest)
+    if artifact is None:
+        artifact = Artifact(sha256=digest, size=os.path.getsize(target), ref_count=0)
+        db.session.add(artifact)
+    return artifact
+
+
+def store_stream(stream):
+    """Hash a file upload while streaming it into the store"""
+    folder = os.path.join(store_root(), 'tmp')
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(dir=folder, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for block in iter(lambda: stream.read(COPY_BUFFER_SIZE), b''):
+                f.write(block)
+                digest.update(block)
+            count_upload_bytes('artifact', f.tell())
+        return store_file(path, digest.hexdigest())
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def attach(outcome, artifact, filename):
+    """Point an outcome at a stored artifact; returns the digest it pointed at before"""
+    previous = outcome.artifact_sha256
+    outcome.artifact_sha256 = artifact.sha256
+    outcome.artifact_name = secure_filename(filename) or artifact.sha256
+    outcome.artifact_link = blob_path(artifact.sha256)
+    return previous
+
+
+def detach(outcome):
+    """Forget an outcome's stored file (e.g. its link now points elsewhere); returns the digest"""
+    previous = outcome.artifact_sha256
+    outcome.artifact_sha256 = None
+    outcome.artifact_name = None
+    return previous
+
+
+def count_refs(digests):
+    """Recount the outcomes pointing at each digest, in the current transaction
+
+    The count is recomputed rather than incremented, so any write path
+    (single, bulk or a manual fix) leaves it exact.
+    """
+    digests = {digest for digest in digests if digest}
+    if not digests:
+        return
+    db.session.flush()
+    refs = select(func.count()).select_from(Outcome).where(
+        Outcome.artifact_sha256 == Artifact.sha256).scalar_subquery()
+    for chunk in chunks(digests):
+        db.session.execute(update(Artifact).where(Artifact.sha256.in_(chunk)).values(ref_count=refs),
+                           execution_options={'synchronize_session': False})
+
+
+def queue_garbage_collection(digests):
+    """Queue collect_garbage for digests that may have lost their last reference"""
+    digests = sorted({digest for digest in digests if digest})
+    if digests:
+        enqueue('artifacts.collect_garbage', {'digests': digests})
+
+
+def collect_garbage(digests=None):
+    """Delete unreferenced artifacts, rows first and then their files
+
+    Runs as the artifacts.collect_garbage job, after the transaction that
+    dropped the references has committed. Returns the number of files removed.
+    """
+    query = select(Artifact.sha256).where(Artifact.ref_count <= 0)
+    if digests is not None:
+        digests = {digest for digest in digests if digest}
+        if not digests:
+            return 0
+        query = query.where(Artifact.sha256.in_(digests))
+    doomed = list(db.session.scalars(query))
+
+    removed = 0
+    for chunk in chunks(doomed):
+        # Take the database write lock first on SQLite: an upload holding a
+        # folder lock holds it too, so neither can end up waiting on the other
+        db.session.connection()
+        locks = {}
+        try:
+            for digest in chunk:
+                folder = os.path.dirname(blob_path(digest))
+                if folder not in locks:
+                    locks[folder] = _lock_folder(folder, shared=False)
+            # A folder an upload is storing into is left for a later run
+            chunk = [digest for digest in chunk if locks[os.path.dirname(blob_path(digest))] is not None]
+            db.session.execute(delete(Artifact).where(Artifact.sha256.in_(chunk), Artifact.ref_count <= 0),
+                               execution_options={'synchronize_session': False})
+            # Rows referenced again meanwhile were not deleted; none can be
+            # re-created while the folders are locked
+            kept = set(db.session.scalars(select(Artifact.sha256).where(Artifact.sha256.in_(chunk))))
+            db.session.commit()
+            for digest in chunk:
+                if digest in kept:
+                    continue
+                try:
+                    os.remove(blob_path(digest))
+                    removed += 1
+                except OSError:
+                    pass  # Already gone
+                remove_previews(digest)
+        finally:
+            for fd in locks.values():
+                if fd is not None:
+                    os.close(fd)
+    return removed
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _release_folders(session, transaction):
+    # After commit or rollback, once the rows store_file added are settled
+    if transaction.parent is None:
+        for fd in session.info.pop('artifact_locks', {}).values():
+            os.close(fd)
+
+
+artifacts_command = AppGroup('artifacts', help='Maintain the content-addressed artifact store.')
+
+
+@artifacts_command.command('gc')
+def gc_command():
+    """Recount references and delete artifacts no outcome uses."""
+    digests = list(db.session.scalars(select(Artifact.sha256)))
+    count_refs(digests)
+    db.session.commit()
+    removed = collect_garbage()
+
+    # Files with no row at all: a request that stored a file and then failed
+    known = set(db.session.scalars(select(Artifact.sha256)))
+    cutoff = time.time() - ORPHAN_GRACE_SECONDS
+    for folder, _, names in os.walk(store_root()):
+        for name in names:
+            path = os.path.join(folder, name)
+            if name not in known and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+
+    # Previews are named <digest>-<size>.jpg
+    for folder, _, names in os.walk(preview_root()):
+        for name in names:
+            path = os.path.join(folder, name)
+            if name.split('-', 1)[0] not in known and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    click.echo(f'Removed {removed} file(s); {len(known)} artifact(s) in use')
+
+
+@artifacts_command.command('migrate')
+def migrate_command():
+    """Move outcome files saved under their upload name into the store."""
+    legacy = defaultdict(list)
+    query = Outcome.query.filter(Outcome.artifact_sha256.is_(None), Outcome.artifact_link.like('uploads/%'),
+                                 ~Outcome.artifact_link.like(store_root() + '%'))
+    for outcome in query:
+        legacy[outcome.artifact_link].append(outcome)
+
+    moved = []
+    for path, outcomes in legacy.items():
+        if not os.path.isfile(path):
+            click.echo(f'{path} is missing, skipped {len(outcomes)} outcome(s)')
+            continue
+        # Store a copy so the originals survive until the rows are committed
+        fd, copy = tempfile.mkstemp(dir=os.path.dirname(path))
+        os.close(fd)
+        shutil.copyfile(path, copy)
+        artifact = store_file(copy)
+        for outcome in outcomes:
+            attach(outcome, artifact, os.path.basename(path))
+        moved.append((path, artifact.sha256))
+    count_refs(digest for _, digest in moved)
+    db.session.commit()
+
+    for path, _ in moved:
+        os.remove(path)
+    click.echo(f'Moved {len(moved)} file(s) into {store_root()}')
@@ -0,0 +1,442 @@
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, insert, select
+from database import db
+from app.utils.conditional import bump_versions
+from app.utils.stats import rebuild as rebuild_stats
+
+DEFAULT_BASELINE = os.path.join('benchmarks', 'baseline.json')
+
+# Rows per table; 'large' is the production-sized data set
+SCALES = {
+    'small': {'programs': 10, 'facilities': 50, 'services': 200, 'equipment': 2000, 'projects': 500,
+              'participants': 5000, 'project_participants': 10000, 'outcomes': 1000},
+    'medium': {'programs': 50, 'facilities': 300, 'services': 1500, 'equipment': 15000, 'projects': 5000,
+               'participants': 50000, 'project_participants': 100000, 'outcomes': 10000},
+    'large': {'programs': 100, 'facilities': 1000, 'services': 5000, 'equipment': 50000, 'projects': 20000,
+              'participants': 500000, 'project_participants': 1000000, 'outcomes': 40000},
+}
+
+# Parents before children, so foreign keys always point at existing ids
+SEED_ORDER = ('programs', 'facilities', 'services', 'equipment', 'projects',
+              'participants', 'project_participants', 'outcomes')
+
+WORDS = ('cnc', 'laser', 'pcb', 'iot', 'sensor', 'solar', 'robotics', 'drone', '3d', 'printing',
+         'embedded', 'firmware', 'agritech', 'water', 'health', 'battery', 'welding', 'textile',
+         'machine', 'learning', 'cad', 'prototype', 'testing', 'microcontroller', 'lathe')
+FACILITY_TYPES = ('Lab', 'Workshop', 'Testing Center', 'Makerspace')
+CATEGORIES = ('Machining', 'Testing', 'Training', 'Design')
+DOMAINS = ('Electronics', 'Mechanical', 'IoT')
+PHASES = ('Training', 'Prototyping', 'Testing', 'Commercialization')
+STAGES = ('Concept', 'Prototype', 'MVP', 'Market Launch')
+INSTITUTIONS = ('SCIT', 'CEDAT', 'UniPod', 'UIRI', 'Lwera')
+AFFILIATIONS = ('CS', 'SE', 'Engineering', 'Other')
+ROLES = ('Student', 'Lecturer', 'Contributor')
+SKILLS = ('Developer', 'Engineer', 'Designer', 'Business Lead')
+OUTCOME_TYPES = ('CAD', 'PCB', 'Prototype', 'Report', 'Business Plan')
+STATUSES = ('Demoed', 'Market Ready', 'Launched')
+
+# URL arguments filled with a random existing id of this table
+ARG_TABLES = {
+    'program_id': 'programs', 'facility_id': 'facilities', 'service_id': 'services',
+    'equipment_id': 'equipment', 'project_id': 'projects', 'participant_id': 'participants',
+    'outcome_id': 'outcomes',
+}
+
+
+def _text(rng, words=4):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _rows(table, start, stop, counts, rng, now):
+    """Synthetic rows start+1..stop of a table (ids are explicit so children can refer to them)"""
+    for row_id in range(start + 1, stop + 1):
+        if table == 'programs':
+            yield {'id': row_id, 'name': f'Program {row_id}', 'description': _text(rng, 12),
+                   'national_alignment': 'NDPIII', 'focus_areas': _text(rng, 3), 'phases': 'Cross-Skilling',
+                   'updated_at': now}
+        elif table == 'facilities':
+            yield {'id': row_id, 'name': f'Facility {row_id}', 'location': f'Site {row_id % 40}',
+                   'description': _text(rng, 12), 'partner_org': rng.choice(INSTITUTIONS),
+                   'facility_type': rng.choice(FACILITY_TYPES), 'capabilities': _text(rng, 5), 'updated_at': now}
+        elif table == 'services':
+            yield {'id': row_id, 'facility_id': rng.randint(1, counts['facilities']), 'name': f'Service {row_id}',
+                   'description': _text(rng, 8), 'category': rng.choice(CATEGORIES),
+                   'skill_type': rng.choice(SKILLS), 'updated_at': now}
+        elif table == 'equipment':
+            yield {'id': row_id, 'facility_id': rng.randint(1, counts['facilities']), 'name': f'Equipment {row_id}',
+                   'capabilities': _text(rng, 4), 'description': _text(rng, 8), 'inventory_code': f'EQ-{row_id:07d}',
+                   'usage_domain': rng.choice(DOMAINS), 'support_phase': rng.choice(PHASES), 'updated_at': now}
+        elif table == 'projects':
+            yield {'id': row_id, 'program_id': rng.randint(1, counts['programs']),
+                   'facility_id': rng.randint(1, counts['facilities']), 'title': f'Project {row_id}',
+                   'nature': 'Research', 'description': _text(rng, 12), 'innovation_focus': _text(rng, 3),
+                   'prototype_stage': rng.choice(STAGES), 'testing_requirements': _text(rng, 6),
+                   'commercialization_plan': _text(rng, 6), 'updated_at': now}
+        elif table == 'participants':
+            yield {'id': row_id, 'full_name': f'Participant {row_id}', 'email': f'participant{row_id}@example.org',
+                   'affiliation': rng.choice(AFFILIATIONS), 'specialization': rng.choice(('Software', 'Hardware')),
+                   'cross_skill_trained': rng.random() < 0.3, 'institution': rng.choice(INSTITUTIONS),
+                   'updated_at': now}
+        elif table == 'project_participants':
+            # Link k of a project goes to a different participant for every k, keeping pairs unique
+            projects, participants = counts['projects'], counts['participants']
+            project, k = (row_id - 1) % projects, (row_id - 1) // projects
+            yield {'id': row_id, 'project_id': project + 1, 'participant_id': (project * 31 + k) % participants + 1,
+                   'role_on_project': rng.choice(ROLES), 'skill_role': rng.choice(SKILLS), 'updated_at': now}
+        elif table == 'outcomes':
+            yield {'id': row_id, 'project_id': rng.randint(1, counts['projects']), 'title': f'Outcome {row_id}',
+                   'description': _text(rng, 8), 'outcome_type': rng.choice(OUTCOME_TYPES),
+                   'quality_certification': None, 'commercialization_status': rng.choice(STATUSES),
+                   'updated_at': now}
+
+
+def seed(counts, seed_value=42, batch_size=10000, echo=lambda message: None):
+    """Fill empty tables with deterministic synthetic rows, one executemany per batch"""
+    if counts['project_participants'] > counts['projects'] * counts['participants']:
+        raise ValueError('More project_participants than distinct (project, participant) pairs')
+    for table in SEED_ORDER:
+        if db.session.scalar(select(func.count()).select_from(db.metadata.tables[table])):
+            raise ValueError(f'{table} is not empty; seed a separate database (DEV_DATABASE_URL)')
+
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    for table in SEED_ORDER:
+        started = time.perf_counter()
+        target = db.metadata.tables[table]
+        for start in range(0, counts[table], batch_size):
+            stop = min(start + batch_size, counts[table])
+            db.session.execute(insert(target), list(_rows(table, start, stop, counts, rng, now)))
+            db.session.commit()
+        echo(f'{table}: {counts[table]} rows in {time.perf_counter() - started:.1f}s')
+
+    # Core inserts skip the flush bookkeeping: new ETags, then counters from scratch
+    bump_versions(db.session, list(SEED_ORDER))
+    db.session.commit()
+    rebuild_stats()
+
+
+def benchmark_routes(app):
+    """GET API routes whose URL arguments can be filled from the seeded tables"""
+    routes, skipped = [], []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if not rule.rule.startswith('/api/') or 'GET' not in rule.methods:
+            continue
+        if all(argument in ARG_TABLES for argument in rule.arguments):
+            routes.append(rule)
+        else:
+            skipped.append(rule.rule)
+    return routes, skipped
+
+
+def _max_ids():
+    return {table: db.session.scalar(select(func.max(db.metadata.tables[table].c.id))) or 0
+            for table in set(ARG_TABLES.values())}
+
+
+def _urls(rule, max_ids, count, rng):
+    """count URLs for a rule, each with random ids (detail routes must not hit one cached row)"""
+    urls = []
+    for _ in range(count):
+        values = {argument: rng.randint(1, max(max_ids[ARG_TABLES[argument]], 1)) for argument in rule.arguments}
+        url = rule.build(values, append_unknown=False)[1]
+        if url.endswith('/search'):
+            url += f'?q={rng.choice(WORDS)}'
+        urls.append(url)
+    return urls
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class TestClientDriver:
+    """Requests straight into the WSGI app, no sockets: the cost of Flask and the controllers"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def get(self, url):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.get(url)
+        # Read the whole body: streamed exports do their work while being iterated
+        response.get_data()
+        response.close()
+        return response.status_code, response.headers.get('X-Query-Count')
+
+    def close(self):
+        pass
+
+
+class HTTPDriver:
+    """Requests over TCP to a WSGI server: this process's app on a threaded server, or --url"""
+
+    def __init__(self, app=None, url=None):
+        self.server = None
+        if url:
+            host = url.split('://', 1)[-1].rstrip('/')
+        else:
+            from werkzeug.serving import make_server
+            self.server = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            host = f'127.0.0.1:{self.server.server_port}'
+        self.host = host
+        self._local = threading.local()
+
+    def get(self, url):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, timeout=60)
+        try:
+            connection.request('GET', url)
+            response = connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            # The server closed the connection (HTTP/1.0 servers do after every response)
+            connection.close()
+            try:
+                connection.request('GET', url)
+                response = connection.getresponse()
+                response.read()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                return 0, None  # Counted as an error: the server dropped the request
+        if response.getheader('Connection', '').lower() == 'close' or response.version == 10:
+            connection.close()
+        return response.status, response.getheader('X-Query-Count')
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+
+
+def run_route(driver, urls, concurrency):
+    """Send urls with `concurrency` requests in flight; latency and SQL figures for the route"""
+    latencies, statuses, statements = [], Counter(), []
+    lock = threading.Lock()
+
+    def send(url):
+        started = time.perf_counter()
+        status, queries = driver.get(url)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+            if queries is not None:
+                statements.append(int(queries))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, urls))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(urls),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'rps': round(len(urls) / wall, 1),
+        'statements': round(sum(statements) / len(statements), 1) if statements else None,
+        'errors': sum(count for status, count in statuses.items() if status >= 500 or status == 0),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Regressions of current against baseline: slower p50/p95 beyond tolerance, or more SQL"""
+    regressions = []
+    for route, result in current['routes'].items():
+        before = baseline['routes'].get(route)
+        if before is None:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            # Sub-millisecond differences are noise whatever the ratio
+            if result[key] > before[key] * (1 + tolerance) and result[key] - before[key] > 1:
+                regressions.append(f'{route} {key} {before[key]} -> {result[key]}')
+        if result['statements'] is not None and before.get('statements') is not None \
+                and result['statements'] > before['statements']:
+            regressions.append(f'{route} statements {before["statements"]} -> {result["statements"]}')
+    return regressions
+
+
+bench_command = AppGroup('bench', help='Seed synthetic data and benchmark the API.')
+
+
+@bench_command.command('seed')
+@click.option('--scale', type=click.Choice(list(SCALES)), default='small', show_default=True)
+@click.option('--set', 'overrides', multiple=True, metavar='TABLE=ROWS', help='Override one table, e.g. participants=100000.')
+@click.option('--seed', 'seed_value', type=int, default=42, show_default=True, help='Random seed; same seed, same data.')
+@click.option('--batch-size', type=int, default=10000, show_default=True)
+def seed_command(scale, overrides, seed_value, batch_size):
+    """Fill an empty database with synthetic data."""
+    counts = dict(SCALES[scale])
+    for override in overrides:
+        table, _, rows = override.partition('=')
+        if table not in counts or not rows.isdigit():
+            raise click.BadParameter(f'Expected TABLE=ROWS with TABLE one of {", ".join(counts)}')
+        counts[table] = int(rows)
+    try:
+        seed(counts, seed_value, batch_size, click.echo)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+
+@bench_command.command('run')
+@click.option('--mode', type=click.Choice(['test-client', 'wsgi']), default='test-client', show_default=True,
+              help='test-client calls the app directly; wsgi goes through a threaded HTTP server.')
+@click.option('--url', default=None, help='Benchmark an already running server instead (wsgi mode).')
+@click.option('--concurrency', '-c', type=int, default=8, show_default=True)
+@click.option('--requests', '-n', 'per_route', type=int, default=100, show_default=True, help='Requests per route.')
+@click.option('--warmup', type=int, default=5, show_default=True, help='Unmeasured requests per route first.')
+@click.option('--route', 'only', multiple=True, help='Only routes containing this text (repeatable).')
+@click.option('--cache/--no-cache', default=False, show_default=True, help='Keep the response cache on.')
+@click.option('--seed', 'seed_value', type=int, default=1, show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='Write the results as JSON.')
+@click.option('--save-baseline', is_flag=True, help='Store the results as the new baseline.')
+@click.option('--baseline', type=click.Path(dir_okay=False), default=DEFAULT_BASELINE, show_default=True)
+@click.option('--tolerance', type=float, default=0.15, show_default=True, help='Allowed slowdown before flagging.')
+@click.option('--fail-on-regression', is_flag=True, help='Exit with status 1 when a regression is found.')
+def run_command(mode, url, concurrency, per_route, warmup, only, cache, seed_value, output, save_baseline,
+                baseline, tolerance, fail_on_regression):
+    """Measure latency percentiles, throughput and SQL per GET route."""
+    app = current_app._get_current_object()
+    # The per-request statement count travels in X-Query-Count
+    app.config['SERVER_TIMING'] = True
+    if not cache:
+        app.extensions['response_cache'] = None
+    for name in ('app.sql.slow', 'app.sql.budget', 'werkzeug'):
+        logging.getLogger(name).disabled = True
+
+    routes, skipped = benchmark_routes(app)
+    routes = [rule for rule in routes if not only or any(text in rule.rule for text in only)]
+    max_ids = _max_ids()
+    db.session.remove()
+    driver = TestClientDriver(app) if mode == 'test-client' and not url else HTTPDriver(app, url)
+    rng = random.Random(seed_value)
+
+    results = {}
+    click.echo(f'{"route":<58} {"p50":>8} {"p95":>8} {"p99":>8} {"req/s":>8} {"sql":>6}')
+    try:
+        for rule in routes:
+            for warm in _urls(rule, max_ids, warmup, rng):
+                driver.get(warm)
+            result = run_route(driver, _urls(rule, max_ids, per_route, rng), concurrency)
+            results[rule.rule] = result
+            sql = '-' if result['statements'] is None else result['statements']
+            click.echo(f'{rule.rule:<58} {result["p50_ms"]:>8} {result["p95_ms"]:>8} {result["p99_ms"]:>8} '
+                       f'{result["rps"]:>8} {sql:>6}' + (f'  {result["errors"]} errors' if result['errors'] else ''))
+    finally:
+        driver.close()
+
+    report = {
+        'meta': {
+            'mode': 'wsgi' if url else mode, 'url': url, 'concurrency': concurrency, 'requests_per_route': per_route,
+            'cache': cache, 'rows': {table: max_ids.get(table) for table in ARG_TABLES.values()},
+            'database': db.engine.dialect.name, 'python': platform.python_version(),
+            'machine': platform.machine(), 'at': datetime.utcnow().isoformat() + 'Z',
+        },
+        'peak_rss_mb': _peak_rss_mb(),
+        'routes': results,
+    }
+    click.echo(f'Peak RSS {report["peak_rss_mb"]} MB; skipped (no sample arguments): {", ".join(skipped) or "none"}')
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if save_baseline:
+        os.makedirs(os.path.dirname(baseline) or '.', exist_ok=True)
+        with open(baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        click.echo(f'Saved baseline to {baseline}')
+    elif os.path.exists(baseline):
+        with open(baseline) as f:
+            stored = json.load(f)
+        if stored['meta'].get('mode') != report['meta']['mode'] or stored['meta'].get('concurrency') != concurrency:
+            click.echo('Note: the baseline was taken with a different mode or concurrency')
+        regressions = compare(report, stored, tolerance)
+        for regression in regressions:
+            click.echo(f'REGRESSION {regression}')
+        if not regressions:
+            click.echo(f'No regressions against {baseline} (tolerance {tolerance:.0%})')
+        elif fail_on_regression:
+            sys.exit(1)
+
+
+# Run in a fresh interpreter per sample: a cold start is only cold once per process
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+status = app.test_client().get(sys.argv[1]).status_code
+done = time.perf_counter()
+json.dump({'import': imported - started, 'create_app': created - imported,
+           'first_request': done - created, 'status': status, 'modules': len(sys.modules)}, sys.stdout)
+"""
+
+
+def measure_startup(url='/health', env=None):
+    """Time importing the app, create_app() and the first request in a new process"""
+    env = dict(os.environ if env is None else env)
+    # Start the way gunicorn does, not the way the flask command does
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    result = subprocess.run([sys.executable, '-c', STARTUP_PROBE, url], env=env, cwd=os.getcwd(),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@bench_command.command('startup')
+@click.option('--runs', '-n', type=int, default=5, show_default=True, help='Fresh processes to start.')
+@click.option('--url', default='/health', show_default=True, help='The first request each process serves.')
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='Write the results as JSON.')
+def startup_command(runs, url, output):
+    """Measure cold start: import, create_app() and first request, in milliseconds."""
+    samples = []
+    for _ in range(runs):
+        try:
+            samples.append(measure_startup(url))
+        except subprocess.CalledProcessError as e:
+            raise click.ClickException(f'The app failed to start:\n{e.stderr}')
+    phases = ('import', 'create_app', 'first_request')
+    report = {phase: round(statistics.median(s[phase] for s in samples) * 1000, 1) for phase in phases}
+    report['total'] = round(sum(report[phase] for phase in phases), 1)
+    click.echo(f'{"phase":<14} {"median ms":>10}')
+    for phase in phases + ('total',):
+        click.echo(f'{phase:<14} {report[phase]:>10}')
+    click.echo(f'{samples[-1]["modules"]} modules loaded; first request {url} answered {samples[-1]["status"]}')
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'runs': runs, 'url': url, 'median_ms': report, 'modules': samples[-1]['modules'],
+                       'samples': samples}, f, indent=2)
@@ -0,0 +1,276 @@
+from collections import Counter
+from flask import current_app, request
+from sqlalchemy import delete, func, insert, select
+from database import db
+from app.utils.cache import remember_rows
+from app.utils.conditional import bump_versions
+from app.utils.dependencies import dependency_counts, describe, no_dependents
+from app.utils.matching import mark_rows_dirty
+from app.utils.stats import count_rows
+
+# Keeps IN (...) lists well under every backend's bound-parameter limit
+IN_CHUNK_SIZE = 1000
+
+# query_budget of the /bulk views: a few statements per IN_CHUNK_SIZE chunk
+# (about 25 at MAX_BULK_ITEMS), while one per item would go far past it
+BULK_QUERY_BUDGET = 100
+
+
+def chunks(values, size=IN_CHUNK_SIZE):
+    """Split values into lists of at most size, e.g. to keep IN (...) lists bounded"""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _items(data, key='items'):
+    """The list of items in a bulk request body: a JSON list or {key: [...]}"""
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list):
+        raise ValueError(f'Expected a JSON list or an object with "{key}"')
+    limit = current_app.config.get('MAX_BULK_ITEMS', 10000)
+    if len(data) > limit:
+        raise ValueError(f'At most {limit} items per bulk request')
+    return data
+
+
+def existing_ids(model, ids):
+    found = set()
+    for chunk in chunks(ids):
+        found.update(db.session.scalars(select(model.id).where(model.id.in_(chunk))))
+    return found
+
+
+def value_owners(column, model, values):
+    """Map each taken value of a unique column to the id of the row holding it"""
+    owners = {}
+    for chunk in chunks(values):
+        owners.update(db.session.execute(select(column, model.id).where(column.in_(chunk))).all())
+    return owners
+
+
+def _check_duplicates(ids, errors):
+    seen = set()
+    for i, row_id in list(ids.items()):
+        if row_id in seen:
+            errors[i] = (400, 'Duplicate id in batch')
+            del ids[i]
+        seen.add(row_id)
+
+
+def _check_foreign_keys(items, errors, foreign_keys):
+    # One IN lookup per referenced table for the whole batch
+    for field, parent in (foreign_keys or {}).items():
+        wanted = {item[field] for i, item in enumerate(items) if i not in errors and item.get(field)}
+        found = existing_ids(parent, wanted)
+        for i, item in enumerate(items):
+            if i not in errors and field in item and item[field] not in found:
+                errors[i] = (400, f'Invalid {field}')
+
+
+def _check_unique(model, items, errors, unique_fields, ids=None):
+    for field, message in (unique_fields or {}).items():
+        counts = Counter(item[field] for i, item in enumerate(items) if i not in errors and field in item)
+        owners = value_owners(getattr(model, field), model, counts)
+        for i, item in enumerate(items):
+            if i in errors or field not in item:
+                continue
+            if counts[item[field]] > 1:
+                errors[i] = (400, f'Duplicate {field} in batch')
+            elif item[field] in owners and (ids is None or owners[item[field]] != ids[i]):
+                errors[i] = (400, message)
+
+
+def _apply(count, errors, atomic):
+    """Whether to write the valid items; atomic batches with any failure write nothing"""
+    return not (atomic and errors) and len(errors) < count
+
+
+def _results(count, errors, applied, ok_status, ids):
+    results = []
+    for i in range(count):
+        if i in errors:
+            status, message = errors[i]
+            results.append({'index': i, 'status': status, 'error': message})
+        elif applied:
+            results.append({'index': i, 'status': ok_status, 'id': ids[i]})
+        else:
+            results.append({'index': i, 'status': 424, 'error': 'Not applied: another item in the batch failed'})
+    succeeded = count - len(errors) if applied else 0
+    body = {'succeeded': succeeded, 'failed': count - succeeded, 'results': results}
+    status = (200 if ok_status == 204 else ok_status) if not errors else (207 if succeeded else 400)
+    return body, status
+
+
+def _insert_many(model, rows):
+    """executemany INSERT of rows in the current transaction, returning their ids in order"""
+    dialect = db.session.get_bind().dialect
+    if dialect.name == 'sqlite':
+        db.session.execute(insert(model), rows)
+        # SQLite assigns max(id) + 1 to each row and this transaction now
+        # holds the write lock, so the batch took the last len(rows) ids
+        last = db.session.scalar(select(func.max(model.id)))
+        ids = list(range(last - len(rows) + 1, last + 1))
+    elif dialect.insert_executemany_returning_sort_by_parameter_order:
+        ids = list(db.session.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows))
+    else:
+        objects = [model(**row) for row in rows]
+        db.session.add_all(objects)
+        db.session.flush()
+        return [row.id for row in objects]
+
+    for row, row_id in zip(rows, ids):
+        row['id'] = row_id
+    _written(model, rows, 1)
+    return ids
+
+
+def _delete_many(model, rows, dependents=()):
+    """DELETE loaded rows by id; the ORM would send one statement per row on SQLite
+
+    With dependents the DELETE itself re-checks that nothing references the
+    rows, so a dependent inserted after the check cannot be orphaned.
+    """
+    guard = no_dependents(model, dependents)
+    for chunk in chunks(row.id for row in rows):
+        deleted = db.session.execute(delete(model).where(model.id.in_(chunk), guard),
+                                     execution_options={'synchronize_session': False}).rowcount
+        if deleted != len(chunk):
+            raise ValueError(f'{model.__name__} rows were linked to while being deleted; nothing was deleted')
+    columns = [column.key for column in model.__table__.columns]
+    _written(model, [{key: getattr(row, key) for key in columns} for row in rows], -1)
+    for row in rows:
+        db.session.expunge(row)
+
+
+def _written(model, rows, sign):
+    """Bookkeeping the flush events do for ORM writes: table versions, cache tags, matching index, counters"""
+    bump_versions(db.session, [model.__tablename__])
+    count_rows(db.session, model.__tablename__, rows, sign)
+    remember_rows(db.session, model, rows)
+    mark_rows_dirty(db.session, model, [row['id'] for row in rows])
+
+
+def bulk_create(model, data, required_fields, fields, foreign_keys=None, unique_fields=None,
+                defaults=None, atomic=False):
+    """Validate and insert a batch of items in the current transaction
+
+    Validation is set-based (one IN lookup per foreign key / unique column)
+    and the valid rows go out as a single executemany INSERT. Returns
+    (body, status, {item index: new id}); the caller commits.
+    """
+    items = _items(data)
+    errors = {}
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[i] = (400, 'Expected a JSON object')
+            continue
+        for field in required_fields:
+            if not item.get(field):
+                errors[i] = (400, f'Missing required field: {field}')
+                break
+    _check_foreign_keys(items, errors, foreign_keys)
+    _check_unique(model, items, errors, unique_fields)
+
+    valid = [i for i in range(len(items)) if i not in errors]
+    defaults = defaults or {}
+    # Same keys on every row so they go out as one executemany
+    keys = [field for field in fields if field in defaults or any(field in items[i] for i in valid)]
+    rows = [{field: items[i].get(field, defaults.get(field)) for field in keys} for i in valid]
+
+    applied = _apply(len(items), errors, atomic)
+    ids = dict(zip(valid, _insert_many(model, rows))) if applied else {}
+    body, status = _results(len(items), errors, applied, 201, ids)
+    return body, status, ids
+
+
+def bulk_update(model, data, fields, foreign_keys=None, unique_fields=None, atomic=False):
+    """Apply a batch of partial updates ({"id": ..., field: value}) in the current transaction"""
+    items = _items(data)
+    errors = {}
+    ids = {}
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+            errors[i] = (400, 'Expected a JSON object with an integer id')
+        else:
+            ids[i] = item['id']
+    _check_duplicates(ids, errors)
+
+    rows = {}
+    for chunk in chunks(ids.values()):
+        rows.update((row.id, row) for row in model.query.filter(model.id.in_(chunk)))
+    for i, row_id in ids.items():
+        if row_id not in rows:
+            errors[i] = (404, f'{model.__name__} {row_id} not found')
+    _check_foreign_keys(items, errors, foreign_keys)
+    _check_unique(model, items, errors, unique_fields, ids)
+
+    applied = _apply(len(items), errors, atomic)
+    updated = []
+    if applied:
+        for i, item in enumerate(items):
+            if i not in errors:
+                row = rows[ids[i]]
+                for field in fields:
+                    if field in item:
+                        setattr(row, field, item[field])
+                updated.append(row)
+        db.session.flush()
+    body, status = _results(len(items), errors, applied, 200, ids)
+    return body, status, updated
+
+
+def bulk_delete(model, data, dependents=(), atomic=False):
+    """Delete a batch of ids, refusing rows that still have dependents
+
+    dependents lists (foreign key column, key, label); the rows and all
+    their dependent counts are loaded with one query per chunk of ids.
+    """
+    items = _items(data, 'ids')
+    errors = {}
+    ids = {}
+    for i, row_id in enumerate(items):
+        if not isinstance(row_id, int):
+            errors[i] = (400, 'Expected an integer id')
+        else:
+            ids[i] = row_id
+    _check_duplicates(ids, errors)
+
+    found = {}
+    for chunk in chunks(ids.values()):
+        found.update(dependency_counts(model, chunk, dependents, lock=True))
+
+    for i, row_id in ids.items():
+        if row_id not in found:
+            errors[i] = (404, f'{model.__name__} {row_id} not found')
+        elif any(found[row_id][1].values()):
+            errors[i] = (400, f'Cannot delete. It has {describe(found[row_id][1], dependents)} linked to it.')
+
+    applied = _apply(len(items), errors, atomic)
+    deleted = []
+    if applied:
+        deleted = [found[row_id][0] for i, row_id in ids.items() if i not in errors]
+        _delete_many(model, deleted, dependents)
+    body, status = _results(len(items), errors, applied, 204, ids)
+    return body, status, deleted
+
+
+def delete_checked(model, row_id, dependents=()):
+    """Delete one row unless something references it, in the current transaction
+
+    Returns (row, {key: count}): row is None when it does not exist, and
+    nothing was deleted when any count is non-zero. The caller commits.
+    """
+    found = dependency_counts(model, [row_id], dependents, lock=True)
+    if row_id not in found:
+        return None, {}
+    row, counts = found[row_id]
+    if not any(counts.values()):
+        _delete_many(model, [row], dependents)
+    return row, counts
+
+
+def atomic_arg():
+    """?atomic=true: apply the batch only if every item is valid"""
+    return request.args.get('atomic', 'false').lower() == 'true'
@@ -0,0 +1,202 @@
+import hashlib
+import itertools
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+
+class CacheBackend:
+    """Storage interface for the response cache
+
+    Entries are looked up by keys that embed the current generation of every
+    tag they depend on; invalidating a tag just moves its generation on, so
+    stale entries are never read again and age out on their own.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def generations(self, tags):
+        """Current generation of each tag, 0 for tags never invalidated"""
+        raise NotImplementedError
+
+    def bump(self, tags):
+        """Give every tag a new, never used before generation"""
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Per-process LRU cache with a TTL on every entry"""
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._sequence = itertools.count(1)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generations(self, tags):
+        with self._lock:
+            return [self._generations.get(tag, (0, 0))[0] for tag in tags]
+
+    def bump(self, tags):
+        now = time.monotonic()
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = (next(self._sequence), now)
+            # A tag untouched for longer than the TTL has no live entries left,
+            # so forgetting its generation (back to 0) is safe
+            if len(self._generations) > self.max_entries * 4:
+                cutoff = now - self.ttl
+                self._generations = {
+                    tag: value for tag, value in self._generations.items() if value[1] >= cutoff
+                }
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by every worker and host through Redis"""
+
+    def __init__(self, url, ttl=60, prefix='capstone:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RESPONSE_CACHE_BACKEND = "redis" needs the redis package installed')
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+
+    def generations(self, tags):
+        values = self.client.mget([f'{self.prefix}gen:{tag}' for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump(self, tags):
+        # Generations come from one ever-increasing counter so a tag whose key
+        # expired can never fall back onto a generation that is still cached
+        generation = self.client.incr(f'{self.prefix}gen-sequence')
+        pipe = self.client.pipeline()
+        for tag in tags:
+            pipe.set(f'{self.prefix}gen:{tag}', generation, ex=self.ttl * 2)
+        pipe.execute()
+
+
+def init_cache(app):
+    """Create the configured response cache backend (RESPONSE_CACHE_BACKEND)"""
+    backend = app.config.get('RESPONSE_CACHE_BACKEND', 'memory')
+    ttl = app.config.get('RESPONSE_CACHE_TTL', 60)
+    if backend == 'memory':
+        cache = MemoryCache(app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024), ttl)
+    elif backend == 'redis':
+        cache = RedisCache(app.config['RESPONSE_CACHE_URL'], ttl)
+    elif isinstance(backend, CacheBackend):
+        cache = backend
+    else:
+        cache = None
+    app.extensions['response_cache'] = cache
+    return cache
+
+
+def get_cache():
+    """The current app's response cache, or None when caching is off"""
+    return current_app.extensions.get('response_cache')
+
+
+def cache_key(cache, path, tags):
+    generations = cache.generations(tags)
+    raw = path + '|' + '|'.join(f'{tag}={gen}' for tag, gen in zip(tags, generations))
+    return 'response:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+# Invalidation: remember which tables, rows and parent rows a transaction
+# touched and bump their tags once it commits, so readers never cache
+# uncommitted data. Tags look like
+#   equipment                   any equipment row
+#   equipment:7                 equipment row 7
+#   equipment.facility_id=3     equipment rows belonging to facility 3
+
+def _row_tags(obj):
+    state = inspect(obj)
+    table = obj.__table__.name
+    tags = {table}
+    if getattr(obj, 'id', None) is not None:
+        tags.add(f'{table}:{obj.id}')
+    for column in obj.__table__.columns:
+        if not column.foreign_keys:
+            continue
+        key = state.mapper.get_property_by_column(column).key
+        # A moved row leaves its old parent's listing as well
+        for value in (state.dict.get(key), *state.attrs[key].history.deleted):
+            if value is not None:
+                tags.add(f'{table}.{column.name}={value}')
+    return tags
+
+
+def remember_rows(session, model, rows):
+    """Tag rows written by Core statements, which skip the flush events
+
+    rows are column -> value dicts including the id.
+    """
+    table = model.__table__
+    foreign_keys = [column.name for column in table.columns if column.foreign_keys]
+    tags = session.info.setdefault('cache_tags', set())
+    tags.add(table.name)
+    for row in rows:
+        tags.add(f'{table.name}:{row["id"]}')
+        for name in foreign_keys:
+            if row.get(name) is not None:
+                tags.add(f'{table.name}.{name}={row[name]}')
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_tags(session, flush_context):
+    tags = session.info.setdefault('cache_tags', set())
+    dirty = [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    for obj in itertools.chain(session.new, dirty, session.deleted):
+        tags.update(_row_tags(obj))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate(session):
+    tags = session.info.pop('cache_tags', None)
+    if tags and has_app_context():
+        cache = get_cache()
+        if cache is not None:
+            cache.bump(sorted(tags))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard(session):
+    session.info.pop('cache_tags', None)
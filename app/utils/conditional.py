@@ -0,0 +1,146 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import make_response, request
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+from database import db
+from app.models.table_version import TableVersion
+from app.utils.cache import cache_key, get_cache
+from app.utils.metrics import count_cache_lookup
+from app.utils.replicas import on_primary, read_from_replica
+
+
+def bump_versions(session, tables):
+    """Advance the change counter of each table inside the current transaction
+
+    ORM writes are picked up automatically; call this after bulk Core
+    statements that bypass the session's unit of work.
+    """
+    now = datetime.utcnow()
+    versions = TableVersion.__table__
+    # Also drop cached responses built from these tables once this commits
+    session.info.setdefault('cache_tags', set()).update(tables)
+    for table in sorted(set(tables)):
+        result = session.execute(
+            update(versions)
+            .where(versions.c.table_name == table)
+            .values(version=versions.c.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            session.execute(insert(versions).values(table_name=table, version=1, updated_at=now))
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_changes(session, flush_context):
+    tables = set()
+    for obj in list(session.new) + list(session.deleted):
+        tables.add(obj.__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            tables.add(obj.__table__.name)
+    tables.discard(TableVersion.__tablename__)
+    if tables:
+        bump_versions(session, tables)
+
+
+def _http_time(value):
+    # HTTP dates have whole-second resolution
+    return value.replace(tzinfo=timezone.utc, microsecond=0) if value else None
+
+
+def _versions(tables, model, row_id):
+    """ETag parts and change timestamps of the tables (and the row); (None, None) if the row is gone"""
+    rows = db.session.execute(
+        select(TableVersion.table_name, TableVersion.version, TableVersion.updated_at)
+        .where(TableVersion.table_name.in_(tables))
+    ).all() if tables else []
+    parts = sorted(f'{name}:{version}' for name, version, _ in rows)
+    stamps = [stamp for _, _, stamp in rows if stamp]
+
+    if model is not None:
+        row_stamp = db.session.execute(select(model.updated_at).where(model.id == row_id)).first()
+        if row_stamp is None:
+            return None, None
+        parts.append(f'row:{row_stamp[0]}')
+        if row_stamp[0]:
+            stamps.append(row_stamp[0])
+    return parts, stamps
+
+
+def _current(tables, model, row_id, parts):
+    """Whether a response built from these versions may be cached"""
+    if not read_from_replica():
+        return True
+    # A lagging replica must not refill the cache a write on the primary just invalidated
+    with on_primary():
+        return _versions(tables, model, row_id)[0] == parts
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional(*tables, model=None, id_arg=None, cache_tags=None):
+    """ETag/Last-Modified support for a GET view
+
+    The validators are derived from the version rows of `tables` (everything
+    a collection response can depend on, includes and sub-resources too).
+    Detail views pass model and the URL argument holding the id, so the
+    row's own updated_at is used and `tables` only lists related tables.
+    A matching If-None-Match or If-Modified-Since is answered with 304
+    before the view runs.
+
+    When a response cache is configured, 200 responses are stored under
+    the same dependencies (plus the row itself for detail views) and
+    served, or turned into a 304, without touching the database.
+    Sub-resource views narrow that with cache_tags, tag templates filled
+    from the URL arguments (see app.utils.cache), e.g.
+    'equipment.facility_id={facility_id}'.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is not None:
+                if cache_tags is not None:
+                    tags = [tag.format(**kwargs) for tag in cache_tags]
+                else:
+                    tags = list(tables)
+                if model is not None:
+                    tags.append(f'{model.__tablename__}:{kwargs[id_arg]}')
+                key = cache_key(cache, request.full_path, tags)
+                hit = cache.get(key)
+                count_cache_lookup(hit is not None)
+                if hit is not None:
+                    body, headers = hit
+                    return make_response(body, 200, headers).make_conditional(request)
+
+            row_id = kwargs[id_arg] if model is not None else None
+            parts, stamps = _versions(tables, model, row_id)
+            if parts is None:
+                # Let the view produce its usual 404
+                return view(*args, **kwargs)
+
+            etag = hashlib.sha1(f'{request.full_path}|{"|".join(parts)}'.encode()).hexdigest()
+            last_modified = _http_time(max(stamps)) if stamps else None
+
+            if _not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            if cache is not None and response.status_code == 200 and _current(tables, model, row_id, parts):
+                cache.set(key, (response.get_data(), list(response.headers)))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,47 @@
+from sqlalchemy import and_, exists, func, select
+from database import db
+
+# Controllers list what blocks a delete as (foreign key column, key, label),
+# e.g. (Equipment.facility_id, 'equipment', 'equipment items'): the key names
+# the count in results and /dependencies responses, the label in messages.
+
+
+def _counts(model, dependents):
+    # Correlated, so each is an index lookup on the foreign key per parent row
+    return [select(func.count()).where(column == model.id).correlate(model).scalar_subquery()
+            for column, _, _ in dependents]
+
+
+def dependency_counts(model, ids, dependents, lock=False):
+    """{id: (row, {key: count})} for those of ids that exist, in one query
+
+    Every dependent table is counted in the same statement that loads the
+    rows. With lock, the rows are selected FOR UPDATE (where the backend
+    supports it) so the answer holds until the transaction ends.
+    """
+    query = select(model, *_counts(model, dependents)).where(model.id.in_(ids))
+    if lock:
+        query = query.with_for_update()
+    found = {}
+    for row, *counts in db.session.execute(query):
+        found[row.id] = (row, {key: count for (_, key, _), count in zip(dependents, counts)})
+    return found
+
+
+def no_dependents(model, dependents):
+    """WHERE clause matching only rows nothing references, to guard the DELETE itself"""
+    return and_(*[~exists().where(column == model.id) for column, _, _ in dependents])
+
+
+def describe(counts, dependents):
+    """'2 services, 1 projects' for the non-zero counts"""
+    return ', '.join(f'{counts[key]} {label}' for _, key, label in dependents if counts.get(key))
+
+
+def dependency_report(model, row_id, dependents):
+    """Body of the dry-run /dependencies endpoints, or None if the row does not exist"""
+    found = dependency_counts(model, [row_id], dependents)
+    if row_id not in found:
+        return None
+    counts = found[row_id][1]
+    return {'id': row_id, 'dependents': counts, 'can_delete': not any(counts.values())}
@@ -0,0 +1,55 @@
+import os
+from flask import current_app, request
+from werkzeug.utils import send_file
+
+# Cache lifetime for URLs whose content can never change (one year, the
+# longest HTTP caches are expected to honour)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+OFFLOAD_MODES = ('x-sendfile', 'x-accel-redirect')
+
+
+def _accel_location(path):
+    """The internal nginx location of a file under UPLOAD_FOLDER, or None if it lies outside"""
+    root = os.path.abspath(current_app.config.get('UPLOAD_FOLDER', 'uploads'))
+    relative = os.path.relpath(path, root)
+    if relative.startswith(os.pardir):
+        return None
+    prefix = current_app.config.get('ARTIFACT_ACCEL_PREFIX', '/_uploads/')
+    return prefix.rstrip('/') + '/' + relative.replace(os.sep, '/')
+
+
+def send_artifact(path, filename, digest=None, as_attachment=False, immutable=False):
+    """Serve a file with Range support and validators derived from its content
+
+    digest (the file's SHA-256) becomes a strong ETag, so If-None-Match and
+    If-Range hold across workers and restarts. immutable is for URLs that
+    name the content itself; other responses must be revalidated.
+
+    With ARTIFACT_OFFLOAD set to 'x-sendfile' (Apache, lighttpd) or
+    'x-accel-redirect' (nginx), only the headers come from Python and the
+    front proxy streams the body and answers Range requests itself.
+    """
+    mode = current_app.config.get('ARTIFACT_OFFLOAD')
+    location = _accel_location(path) if mode == 'x-accel-redirect' else path
+    offload = mode in OFFLOAD_MODES and location is not None
+
+    response = send_file(path, request.environ, download_name=filename, as_attachment=as_attachment,
+                         etag=digest or True, conditional=not offload, use_x_sendfile=offload,
+                         response_class=current_app.response_class)
+    if offload:
+        response.headers.pop('X-Sendfile')
+        # 304s are still answered here; the proxy handles everything else
+        response = response.make_conditional(request.environ)
+        if response.status_code != 304:
+            header = 'X-Accel-Redirect' if mode == 'x-accel-redirect' else 'X-Sendfile'
+            response.headers[header] = location
+    # Advertised on full responses too, so clients know they can resume
+    response.accept_ranges = 'bytes'
+
+    if immutable:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
@@ -0,0 +1,53 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from database import db
+
+
+def list_routes(app):
+    """GET API routes without URL parameters, i.e. the collection endpoints"""
+    return sorted(
+        rule.rule for rule in app.url_map.iter_rules()
+        if rule.rule.startswith('/api/') and 'GET' in rule.methods and not rule.arguments
+    )
+
+
+def capture_statements(app, url):
+    """Run a GET request and return the SELECT statements it sent to the database"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = app.test_client().get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response.status_code, statements
+
+
+def explain_statement(statement, parameters):
+    """Query plan lines for one statement on the current engine"""
+    prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(prefix + statement, parameters).fetchall()
+    # SQLite returns (id, parent, notused, detail); others a single text column
+    return [str(row[-1]) for row in rows]
+
+
+@click.command('explain')
+@click.argument('urls', nargs=-1)
+@with_appcontext
+def explain_command(urls):
+    """Print the query plans behind GET routes (default: every list route)"""
+    app = current_app._get_current_object()
+    for url in urls or list_routes(app):
+        status, statements = capture_statements(app, url)
+        click.echo(f'GET {url} -> {status}, {len(statements)} statement(s)')
+        for statement, parameters in statements:
+            click.echo('  ' + ' '.join(statement.split()))
+            for line in explain_statement(statement, parameters):
+                click.echo(f'    {line}')
@@ -0,0 +1,33 @@
+from datetime import datetime
+from sqlalchemy.orm import load_only
+
+
+def parse_fields(value, model):
+    """Turn ?fields=a,b into column names of model; None means every column"""
+    if not value:
+        return None
+    columns = model.__table__.columns.keys()
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in columns]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    # The primary key is always returned so clients can address the row
+    return list(dict.fromkeys(['id'] + names))
+
+
+def apply_fields(query, model, fields, *extra):
+    """Restrict the SELECT to the requested columns plus any extra ones the caller needs"""
+    if not fields:
+        return query
+    names = list(dict.fromkeys(fields + [name for name in extra if name]))
+    return query.options(load_only(*[getattr(model, name) for name in names]))
+
+
+def pick(row, fields):
+    """Serialize only the requested columns, never touching the deferred ones"""
+    if not fields:
+        return row.to_dict()
+    data = {name: getattr(row, name) for name in fields}
+    # Match to_dict(), which renders timestamps as ISO 8601
+    return {name: value.isoformat() if isinstance(value, datetime) else value
+            for name, value in data.items()}
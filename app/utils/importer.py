@@ -0,0 +1,232 @@
+import csv
+import os
+import re
+from datetime import datetime
+from itertools import islice
+from flask import current_app
+from sqlalchemy import Boolean, Integer
+from database import db
+from app.models.import_job import ImportJob
+from app.models.program import Program
+from app.models.facility import Facility
+from app.models.service import Service
+from app.models.equipment import Equipment
+from app.models.project import Project
+from app.models.participant import Participant
+from app.models.outcome import Outcome
+from app.controllers.program_controller import ProgramController
+from app.controllers.facility_controller import FacilityController
+from app.controllers.service_controller import ServiceController
+from app.controllers.equipment_controller import EquipmentController
+from app.controllers.project_controller import ProjectController
+from app.controllers.participant_controller import ParticipantController
+from app.controllers.outcome_controller import OutcomeController
+from app.utils.bulk import bulk_create, bulk_update, existing_ids, value_owners
+
+# Importable entities: the model and the controller whose field rules apply
+IMPORTABLE = {
+    'programs': (Program, ProgramController),
+    'facilities': (Facility, FacilityController),
+    'services': (Service, ServiceController),
+    'equipment': (Equipment, EquipmentController),
+    'projects': (Project, ProjectController),
+    'participants': (Participant, ParticipantController),
+    'outcomes': (Outcome, OutcomeController),
+}
+
+IMPORT_FORMATS = ('csv', 'xlsx')
+
+TRUE_VALUES = {'true', 'yes', 'y', '1'}
+FALSE_VALUES = {'false', 'no', 'n', '0'}
+
+
+def import_format(filename):
+    """csv or xlsx, from the file extension"""
+    fmt = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f'Unsupported file type; expected one of: {", ".join(IMPORT_FORMATS)}')
+    return fmt
+
+
+def default_match_on(controller):
+    """Rows are matched to existing ones by a unique field when there is one, else by id"""
+    return next(iter(getattr(controller, 'unique_fields', {})), 'id')
+
+
+def column_name(header):
+    """'Full Name', 'fullName' and 'full_name' all mean full_name"""
+    name = re.sub(r'(?<=[a-z0-9])([A-Z])', r'_\1', str(header or '').strip())
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def _open_xlsx(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('XLSX imports need the openpyxl package installed')
+    # read_only streams rows from the zip instead of building the whole sheet
+    return load_workbook(path, read_only=True, data_only=True)
+
+
+def count_rows(path, fmt):
+    """Data rows in the file (for progress), without parsing it"""
+    if fmt == 'xlsx':
+        workbook = _open_xlsx(path)
+        try:
+            max_row = workbook.active.max_row
+            return max(max_row - 1, 0) if max_row else None
+        finally:
+            workbook.close()
+    lines = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            lines += block.count(b'\n')
+    # Quoted multi-line cells make this an estimate, which is fine for progress
+    return max(lines - 1, 0)
+
+
+def read_rows(path, fmt):
+    """Yield (row number, {column: value}) lazily from a CSV or XLSX file"""
+    if fmt == 'xlsx':
+        workbook = _open_xlsx(path)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [column_name(cell) for cell in next(rows, ())]
+            for number, values in enumerate(rows, start=2):
+                if any(value is not None for value in values):
+                    yield number, dict(zip(header, values))
+        finally:
+            workbook.close()
+        return
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = [column_name(cell) for cell in next(reader, [])]
+        for number, values in enumerate(reader, start=2):
+            if any(values):
+                yield number, dict(zip(header, values))
+
+
+def _coerce(model, values):
+    """Convert spreadsheet cells to the column types; blank cells are left out"""
+    columns = model.__table__.columns
+    row = {}
+    for name, value in values.items():
+        if name not in columns or value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '':
+                continue
+        column_type = columns[name].type
+        if isinstance(column_type, Boolean):
+            if not isinstance(value, bool):
+                text = str(value).lower()
+                if text not in TRUE_VALUES | FALSE_VALUES:
+                    raise ValueError(f'Invalid {name}: expected true or false')
+                value = text in TRUE_VALUES
+        elif isinstance(column_type, Integer):
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f'Invalid {name}: expected a whole number')
+            if not number.is_integer():
+                raise ValueError(f'Invalid {name}: expected a whole number')
+            value = int(number)
+        elif isinstance(value, float) and value.is_integer():
+            value = str(int(value))  # spreadsheet numbers such as inventory codes
+        elif not isinstance(value, str):
+            value = str(value)
+        row[name] = value
+    return row
+
+
+def _upsert(model, controller, rows, match_on):
+    """Write one chunk of (row number, values); returns (created, updated, errors)"""
+    errors = []
+    items = []
+    for number, values in rows:
+        try:
+            items.append((number, _coerce(model, values)))
+        except ValueError as e:
+            errors.append({'row': number, 'error': str(e)})
+
+    # One lookup finds which rows already exist
+    keys = {item[match_on] for _, item in items if match_on in item}
+    if match_on == 'id':
+        existing = {row_id: row_id for row_id in existing_ids(model, keys)}
+    else:
+        existing = value_owners(getattr(model, match_on), model, keys)
+
+    creates, updates = [], []
+    for number, item in items:
+        row_id = existing.get(item.get(match_on))
+        if row_id is not None:
+            updates.append((number, dict(item, id=row_id)))
+        else:
+            item.pop('id', None)
+            creates.append((number, item))
+
+    created = updated = 0
+    if creates:
+        body, _, _ = bulk_create(
+            model, [item for _, item in creates], controller.required_fields, controller.updatable_fields,
+            foreign_keys=getattr(controller, 'foreign_keys', None),
+            unique_fields=getattr(controller, 'unique_fields', None),
+            defaults=getattr(controller, 'defaults', None))
+        created = body['succeeded']
+        errors += [{'row': creates[r['index']][0], 'error': r['error']} for r in body['results'] if 'error' in r]
+    if updates:
+        body, _, _ = bulk_update(
+            model, [item for _, item in updates], controller.updatable_fields,
+            foreign_keys=getattr(controller, 'foreign_keys', None),
+            unique_fields=getattr(controller, 'unique_fields', None))
+        updated = body['succeeded']
+        errors += [{'row': updates[r['index']][0], 'error': r['error']} for r in body['results'] if 'error' in r]
+    return created, updated, sorted(errors, key=lambda e: e['row'])
+
+
+def run_import(job_id):
+    """Process an import job chunk by chunk; each chunk commits with the job's progress"""
+    job = db.session.get(ImportJob, job_id)
+    model, controller_class = IMPORTABLE[job.entity]
+    controller = controller_class()
+    chunk_size = current_app.config.get('IMPORT_CHUNK_SIZE', 1000)
+    max_errors = current_app.config.get('MAX_IMPORT_ERRORS', 1000)
+    fmt = import_format(job.file_path)
+
+    job.status = 'running'
+    job.started_at = datetime.utcnow()
+    job.total_rows = count_rows(job.file_path, fmt)
+    db.session.commit()
+
+    try:
+        rows = read_rows(job.file_path, fmt)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            try:
+                created, updated, errors = _upsert(model, controller, chunk, job.match_on)
+            except Exception as e:
+                db.session.rollback()
+                created, updated = 0, 0
+                errors = [{'row': number, 'error': f'Chunk failed: {str(e)}'} for number, _ in chunk]
+            job.processed_rows += len(chunk)
+            job.created_count += created
+            job.updated_count += updated
+            job.error_count += len(errors)
+            if len(job.errors) < max_errors:
+                job.errors = job.errors + errors[:max_errors - len(job.errors)]
+            db.session.commit()
+
+        job.status = 'completed'
+        job.total_rows = job.processed_rows
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        os.remove(job.file_path)
+    except Exception as e:
+        db.session.rollback()
+        job.status = 'failed'
+        job.message = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
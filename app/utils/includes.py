@@ -0,0 +1,36 @@
+from app.utils.fields import pick
+
+
+def parse_includes(value, includable):
+    """Turn ?include=a,b into relationship names, rejecting anything not includable"""
+    if not value:
+        return []
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in includable]
+    if unknown:
+        raise ValueError(f'Cannot include: {", ".join(unknown)}')
+    # Keep the client's order but drop duplicates
+    return list(dict.fromkeys(names))
+
+
+def apply_includes(query, includes, includable):
+    """Attach the eager-loading option of every requested relationship"""
+    options = [includable[name][0] for name in includes]
+    return query.options(*options) if options else query
+
+
+def dump(value):
+    """to_dict() a related object or collection, passing None through"""
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return [item.to_dict() for item in value]
+    return value.to_dict()
+
+
+def embed(row, includes, includable, fields=None):
+    """Serialize a row (or just its requested fields) with relationships nested under their names"""
+    data = pick(row, fields)
+    for name in includes:
+        data[name] = includable[name][1](row)
+    return data
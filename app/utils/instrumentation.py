@@ -0,0 +1,158 @@
+import heapq
+import inspect
+import json
+import logging
+import re
+import time
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# One JSON object per line, so log shippers can index the fields
+slow_query_log = logging.getLogger('app.sql.slow')
+budget_log = logging.getLogger('app.sql.budget')
+
+DEFAULT_SLOW_QUERY_MS = 200
+DEFAULT_QUERY_BUDGET = 50
+SLOWEST_KEPT = 3
+
+
+class RequestQueries:
+    """SQL statements of one request: count, total time and the slowest few"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = []  # min-heap of (seconds, sequence, statement)
+        self.statements = {}  # statement -> times sent, to point at N+1 loops
+
+    def add(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        entry = (seconds, self.count, statement)
+        if len(self.slowest) < SLOWEST_KEPT:
+            heapq.heappush(self.slowest, entry)
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def most_repeated(self):
+        statement, times = max(self.statements.items(), key=lambda item: item[1], default=(None, 0))
+        return statement, times
+
+
+def request_queries():
+    """The current request's RequestQueries, or None outside instrumented requests"""
+    return g.get('_sql_queries') if has_request_context() else None
+
+
+def query_budget(limit):
+    """Override QUERY_BUDGET for one view (None: never flag it)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g._sql_budget = limit
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _summary(statement, length=None):
+    text = re.sub(r'\s+', ' ', statement).strip()
+    return text if length is None or len(text) <= length else text[:length - 3] + '...'
+
+
+def _location():
+    """First frame of our own code that led to the statement"""
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_globals.get('__name__', '')
+        if name.startswith('app.') and name != __name__:
+            return f'{frame.f_code.co_filename}:{frame.f_lineno} ({frame.f_code.co_name})'
+        frame = frame.f_back
+    return None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    queries = request_queries()
+    if queries is not None:
+        queries.add(statement, seconds)
+    if not has_app_context():
+        return
+    # Workers and CLI commands log slow statements too, they just have no request
+    threshold = current_app.config.get('SLOW_QUERY_THRESHOLD_MS', DEFAULT_SLOW_QUERY_MS)
+    if threshold is not None and seconds * 1000 >= threshold:
+        record = {
+            'event': 'slow_query',
+            'duration_ms': round(seconds * 1000, 2),
+            'statement': _summary(statement, 2000),
+            'executemany': executemany,
+            'location': _location(),
+        }
+        if has_request_context():
+            record.update(method=request.method, path=request.path, endpoint=request.endpoint)
+        slow_query_log.warning(json.dumps(record))
+
+
+def _start():
+    g._sql_queries = RequestQueries()
+
+
+def _server_timing(queries):
+    elapsed = (time.perf_counter() - queries.started) * 1000
+    metrics = [
+        f'app;dur={elapsed:.2f}',
+        f'db;dur={queries.seconds * 1000:.2f};desc="{queries.count} queries"',
+    ]
+    ranked = sorted(queries.slowest, reverse=True)
+    for number, (seconds, _, statement) in enumerate(ranked, 1):
+        description = _summary(statement, 100).replace('\\', '\\\\').replace('"', '\\"')
+        metrics.append(f'sql-{number};dur={seconds * 1000:.2f};desc="{description}"')
+    return ', '.join(metrics)
+
+
+def _finish(response):
+    queries = g.get('_sql_queries')
+    if queries is None:
+        return response
+    budget = g.pop('_sql_budget', current_app.config.get('QUERY_BUDGET', DEFAULT_QUERY_BUDGET))
+    over_budget = budget is not None and queries.count > budget
+    if over_budget:
+        statement, times = queries.most_repeated()
+        budget_log.warning(json.dumps({
+            'event': 'query_budget_exceeded',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'queries': queries.count,
+            'budget': budget,
+            'db_ms': round(queries.seconds * 1000, 2),
+            'most_repeated': {'statement': _summary(statement, 500), 'times': times},
+        }))
+
+    show = current_app.config.get('SERVER_TIMING')
+    if show if show is not None else current_app.debug:
+        # Queries a streamed body runs after this point are not included
+        response.headers['Server-Timing'] = _server_timing(queries)
+        response.headers['X-Query-Count'] = str(queries.count)
+        if over_budget:
+            response.headers['X-Query-Budget-Exceeded'] = f'{queries.count}/{budget}'
+    return response
+
+
+def init_instrumentation(app):
+    """Count and time the SQL of every request (see SLOW_QUERY_THRESHOLD_MS, QUERY_BUDGET, SERVER_TIMING)"""
+    app.before_request(_start)
+    app.after_request(_finish)
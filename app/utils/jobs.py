@@ -0,0 +1,274 @@
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from importlib import import_module
+import click
+from flask import current_app, has_app_context
+from flask.cli import AppGroup
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from database import db
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+# Task name -> 'module:function'; the function is called with the job's payload as keyword arguments
+TASKS = {
+    'imports.run': 'app.utils.importer:run_import',
+    'previews.generate': 'app.utils.previews:generate_previews',
+    'artifacts.collect_garbage': 'app.utils.artifacts:collect_garbage',
+}
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+# JOB_RUNNER = 'thread' drains the queue on a thread of the web process
+# instead of a separate `flask jobs worker`; handy in development
+_thread_runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix='jobs')
+
+
+class PermanentJobError(Exception):
+    """Raised by a task for a failure no retry can fix; the job fails at once"""
+
+
+def enqueue(kind, payload=None, max_attempts=None, delay=0):
+    """Add a job to the current transaction; it becomes visible to workers when that commits"""
+    if kind not in TASKS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    job = Job(kind=kind, payload=payload or {}, status='queued', attempts=0,
+              max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 5),
+              run_at=datetime.utcnow() + timedelta(seconds=delay))
+    db.session.add(job)
+    db.session.info['jobs_enqueued'] = True
+    return job
+
+
+def _task(kind):
+    module, name = TASKS[kind].split(':')
+    return getattr(import_module(module), name)
+
+
+def backoff(attempts):
+    """Seconds before retry number `attempts`: exponential with jitter, capped"""
+    base = current_app.config.get('JOB_RETRY_BASE_SECONDS', 5)
+    cap = current_app.config.get('JOB_RETRY_MAX_SECONDS', 600)
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    # Jitter spreads out retries of jobs that failed together
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim_job(worker_id):
+    """Lock the next due job for this worker, or return None
+
+    The conditional UPDATE only succeeds for one worker, so the same job
+    is never handed out twice even without SELECT ... FOR UPDATE.
+    """
+    now = datetime.utcnow()
+    candidates = db.session.scalars(
+        select(Job.id).where(Job.status == 'queued', Job.run_at <= now)
+        .order_by(Job.run_at, Job.id).limit(5)
+    ).all()
+    for job_id in candidates:
+        claimed = db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', locked_by=worker_id, locked_at=now, heartbeat_at=now,
+                    attempts=Job.attempts + 1),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+    db.session.commit()
+    return None
+
+
+@contextmanager
+def _heartbeat(job_id):
+    """Stamp the job's heartbeat_at every JOB_HEARTBEAT_SECONDS while the body runs
+
+    A thread with its own connection, so a task busy in a long statement or
+    transaction still shows its worker is alive.
+    """
+    interval = current_app.config.get('JOB_HEARTBEAT_SECONDS', 30)
+    engine = db.engine
+    jobs = Job.__table__
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(interval):
+            try:
+                with engine.begin() as connection:
+                    connection.execute(update(jobs).where(jobs.c.id == job_id, jobs.c.status == 'running')
+                                       .values(heartbeat_at=datetime.utcnow()))
+            except Exception:
+                logger.warning('Could not record a heartbeat for job %s', job_id, exc_info=True)
+
+    thread = threading.Thread(target=beat, name=f'jobs-heartbeat-{job_id}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """Run a claimed job, then record success, a retry or the final failure"""
+    job_id, kind, payload = job.id, job.kind, job.payload
+    # Don't sit in the claim's transaction (on SQLite, the write lock) while the task runs
+    db.session.commit()
+    try:
+        with _heartbeat(job_id):
+            result = _task(kind)(**payload)
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.last_error = f'{type(e).__name__}: {e}'
+        job.locked_by = None
+        if job.attempts >= job.max_attempts or isinstance(e, PermanentJobError):
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            logger.exception('Job %s (%s) failed for good', job_id, job.kind)
+        else:
+            job.status = 'queued'
+            job.run_at = datetime.utcnow() + timedelta(seconds=backoff(job.attempts))
+            logger.warning('Job %s (%s) failed, retrying at %s', job_id, job.kind, job.run_at, exc_info=True)
+        db.session.commit()
+        return False
+
+    job = db.session.get(Job, job_id)
+    job.status = 'succeeded'
+    job.result = result if isinstance(result, (dict, list, str, int, float, bool)) else None
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return True
+
+
+def requeue_stale():
+    """Hand back jobs whose worker died mid-run (no heartbeat for JOB_TIMEOUT_SECONDS)"""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get('JOB_TIMEOUT_SECONDS', 300))
+    # Jobs claimed before heartbeats were recorded only have locked_at
+    stale = Job.query.filter(Job.status == 'running',
+                             func.coalesce(Job.heartbeat_at, Job.locked_at) < cutoff).all()
+    for job in stale:
+        job.status = 'failed' if job.attempts >= job.max_attempts else 'queued'
+        job.last_error = f'Worker {job.locked_by} stopped responding'
+        job.locked_by = None
+        job.run_at = datetime.utcnow()
+    db.session.commit()
+    return len(stale)
+
+
+def work(worker_id, stop=None, poll_interval=1.0, until_idle=False):
+    """Claim and run jobs until stop is set (or, with until_idle, the queue has nothing due)"""
+    while stop is None or not stop.is_set():
+        job = claim_job(worker_id)
+        if job is None:
+            if until_idle:
+                return
+            (stop.wait if stop is not None else time.sleep)(poll_interval)
+            continue
+        run_job(job)
+        db.session.remove()
+
+
+def _process_main(app, worker_id, stop):
+    # Ctrl-C reaches the whole process group; the parent decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    with app.app_context():
+        # Connections must not be shared with the parent across fork
+        db.engine.dispose(close=False)
+        work(worker_id, stop, app.config.get('JOB_POLL_INTERVAL', 1.0))
+
+
+def _drain(app):
+    with app.app_context():
+        try:
+            work(f'{socket.gethostname()}:{os.getpid()}:thread', until_idle=True)
+        finally:
+            db.session.remove()
+
+
+@event.listens_for(Session, 'after_commit')
+def _kick_thread_runner(session):
+    if session.info.pop('jobs_enqueued', False) and has_app_context() \
+            and current_app.config.get('JOB_RUNNER', 'worker') == 'thread':
+        _thread_runner.submit(_drain, current_app._get_current_object())
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_enqueued(session):
+    session.info.pop('jobs_enqueued', None)
+
+
+jobs_command = AppGroup('jobs', help='Run and inspect background jobs.')
+
+
+@jobs_command.command('worker')
+@click.option('--processes', '-p', type=int, default=None,
+              help='Worker processes (default JOB_WORKER_PROCESSES or the CPU count).')
+def worker_command(processes):
+    """Run jobs in a pool of worker processes until SIGTERM or Ctrl-C."""
+    app = current_app._get_current_object()
+    processes = processes or app.config.get('JOB_WORKER_PROCESSES') or os.cpu_count() or 1
+    # fork shares the loaded app with the children; the app is not picklable for spawn
+    context = multiprocessing.get_context('fork')
+    stop = context.Event()
+    host = f'{socket.gethostname()}:{os.getpid()}'
+
+    def start(number):
+        process = context.Process(target=_process_main, args=(app, f'{host}:{number}', stop),
+                                  name=f'jobs-worker-{number}')
+        process.start()
+        return process
+
+    # The handler only records the signal: setting a multiprocessing Event
+    # from a handler can deadlock against a wait() on the same lock
+    signals = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: signals.append(signum))
+    signal.signal(signal.SIGINT, lambda signum, frame: signals.append(signum))
+
+    def forget_connections():
+        # Children get a fresh pool; open connections must not cross a fork
+        db.session.remove()
+        db.engine.dispose()
+
+    forget_connections()
+    pool = [start(number) for number in range(processes)]
+    click.echo(f'Started {processes} job worker process(es)')
+
+    checked = time.monotonic()
+    while not signals:
+        time.sleep(0.5)
+        if time.monotonic() - checked < 5:
+            continue
+        checked = time.monotonic()
+        requeued = requeue_stale()
+        if requeued:
+            click.echo(f'Requeued {requeued} stale job(s)')
+        # Replace any worker that died (e.g. killed for memory); its job is requeued once stale
+        dead = [number for number, process in enumerate(pool) if not process.is_alive()]
+        if dead:
+            forget_connections()
+            for number in dead:
+                click.echo(f'Worker {number} exited with {pool[number].exitcode}, restarting')
+                pool[number] = start(number)
+
+    click.echo('Stopping after the running jobs finish...')
+    stop.set()
+    for process in pool:
+        process.join()
+
+
+@jobs_command.command('run')
+def run_command():
+    """Run every job that is due in this process, then exit (cron-friendly)."""
+    work(f'{socket.gethostname()}:{os.getpid()}:once', until_idle=True)
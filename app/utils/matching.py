@@ -0,0 +1,207 @@
+import itertools
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.orm import Session
+from database import db
+from app.models.facility import Facility
+from app.models.equipment import Equipment
+from app.models.capability_change import CapabilityChange
+from app.utils.replicas import on_primary
+
+# Which columns describe what a facility or piece of equipment can do
+INDEXED_FIELDS = {
+    'facility': (Facility, ('capabilities', 'facility_type')),
+    'equipment': (Equipment, ('capabilities', 'usage_domain', 'support_phase')),
+}
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'the', 'to', 'with', 'will', 'we', 'our', 'this', 'that',
+}
+
+# How long entries stay in the change log. A worker that hasn't looked at
+# it for longer than that may have missed some and rebuilds instead
+CHANGE_RETENTION = timedelta(days=1)
+
+# Entries are stamped when their transaction flushes but only show up once it
+# commits, possibly after later-stamped ones have been read. Entries this
+# recent are looked at again on each refresh; ones already applied are skipped.
+CHANGE_WINDOW = timedelta(minutes=5)
+
+PRUNE_INTERVAL = timedelta(hours=1)
+
+
+def tokenize(value):
+    """Split a free-text capability string into normalized terms"""
+    tokens = []
+    for token in re.findall(r'\w+', (value or '').lower()):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        # Fold simple plurals so "printers" matches "printer"
+        if len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class CapabilityIndex:
+    """Inverted index from capability terms to facilities and equipment"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {kind: defaultdict(dict) for kind in INDEXED_FIELDS}
+        self._documents = {kind: {} for kind in INDEXED_FIELDS}
+        # When the index last caught up with the change log, and the entries
+        # inside CHANGE_WINDOW of that it has already applied
+        self._synced_at = None
+        self._seen = set()
+
+    def invalidate(self):
+        """Force a full rebuild on the next lookup"""
+        with self._lock:
+            self._synced_at = None
+
+    def _remove(self, kind, doc_id):
+        terms = self._documents[kind].pop(doc_id, None)
+        if not terms:
+            return
+        postings = self._postings[kind]
+        for term in terms:
+            postings[term].pop(doc_id, None)
+            if not postings[term]:
+                del postings[term]
+
+    def _add(self, kind, doc_id, row):
+        terms = Counter()
+        for value in row:
+            terms.update(tokenize(value))
+        if not terms:
+            return
+        self._documents[kind][doc_id] = terms
+        for term, count in terms.items():
+            self._postings[kind][term][doc_id] = count
+
+    def _rows(self, kind, ids=None):
+        model, fields = INDEXED_FIELDS[kind]
+        query = model.query.with_entities(model.id, *[getattr(model, f) for f in fields])
+        if ids is not None:
+            query = query.filter(model.id.in_(ids))
+        return query.yield_per(1000)
+
+    def _changes(self, since):
+        changes = CapabilityChange.__table__
+        return db.session.execute(
+            select(changes.c.id, changes.c.kind, changes.c.row_id).where(changes.c.changed_at >= since)
+        ).all()
+
+    def _rebuild(self, now):
+        # Read before the rows: entries committed while rebuilding are applied next time
+        self._seen = {change_id for change_id, _, _ in self._changes(now - CHANGE_WINDOW)}
+        for kind in INDEXED_FIELDS:
+            self._postings[kind] = defaultdict(dict)
+            self._documents[kind] = {}
+            for doc_id, *row in self._rows(kind):
+                self._add(kind, doc_id, row)
+        self._synced_at = now
+
+    def _catch_up(self, now):
+        changes = self._changes(self._synced_at - CHANGE_WINDOW)
+        by_kind = defaultdict(set)
+        for change_id, kind, doc_id in changes:
+            if change_id not in self._seen:
+                by_kind[kind].add(doc_id)
+        self._seen = {change_id for change_id, _, _ in changes}
+        self._synced_at = now
+        for kind, ids in by_kind.items():
+            for doc_id in ids:
+                self._remove(kind, doc_id)
+            # Deleted rows simply don't come back and stay removed
+            for doc_id, *row in self._rows(kind, ids):
+                self._add(kind, doc_id, row)
+
+    def refresh(self):
+        """Re-read the rows written since the last lookup, by this worker or any other"""
+        # A lagging replica would hand back the rows as they were before the write
+        with self._lock, on_primary():
+            now = datetime.utcnow()
+            if self._synced_at is None or now - self._synced_at > CHANGE_RETENTION:
+                self._rebuild(now)
+            else:
+                self._catch_up(now)
+
+    def _score(self, kind, terms):
+        postings = self._postings[kind]
+        total = len(self._documents[kind])
+        scores = defaultdict(float)
+        matched = defaultdict(set)
+        for term in set(terms):
+            docs = postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + total / len(docs))
+            for doc_id, count in docs.items():
+                scores[doc_id] += idf * (1 + math.log(count))
+                matched[doc_id].add(term)
+        # Dampen long capability lists so they don't win on volume alone
+        for doc_id in scores:
+            scores[doc_id] /= math.sqrt(sum(self._documents[kind][doc_id].values()))
+        return scores, matched
+
+    def match(self, text, limit=10):
+        """Top-k (kind -> [(id, score, matched terms)]) for a free-text requirement"""
+        self.refresh()
+        terms = tokenize(text)
+        results = {}
+        with self._lock:
+            for kind in INDEXED_FIELDS:
+                scores, matched = self._score(kind, terms)
+                ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+                results[kind] = [(doc_id, score, sorted(matched[doc_id])) for doc_id, score in ranked]
+        return results
+
+
+capability_index = CapabilityIndex()
+
+
+_pruned_at = None
+
+
+def _log_changes(session, dirty):
+    global _pruned_at
+    if not dirty:
+        return
+    now = datetime.utcnow()
+    changes = CapabilityChange.__table__
+    session.execute(insert(changes), [
+        {'kind': kind, 'row_id': doc_id, 'changed_at': now} for kind, doc_id in sorted(dirty)
+    ])
+    if _pruned_at is None or now - _pruned_at > PRUNE_INTERVAL:
+        _pruned_at = now
+        session.execute(delete(changes).where(changes.c.changed_at < now - CHANGE_RETENTION))
+
+
+def mark_rows_dirty(session, model, ids):
+    """Log rows written by Core statements, which skip the flush events"""
+    for kind, (indexed, _) in INDEXED_FIELDS.items():
+        if indexed is model:
+            _log_changes(session, {(kind, doc_id) for doc_id in ids})
+
+
+# Entries are written in the same transaction as the rows: they show up for
+# other workers exactly when the change does, and vanish with a rollback
+
+@event.listens_for(Session, 'after_flush')
+def _collect_rows(session, flush_context):
+    dirty = set()
+    for kind, (model, fields) in INDEXED_FIELDS.items():
+        for obj in itertools.chain(session.new, session.deleted):
+            if type(obj) is model:
+                dirty.add((kind, obj.id))
+        for obj in session.dirty:
+            if type(obj) is model and any(inspect(obj).attrs[field].history.has_changes() for field in fields):
+                dirty.add((kind, obj.id))
+    _log_changes(session, dirty)
@@ -0,0 +1,288 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from flask import current_app, g, request
+from sqlalchemy import func, select
+from database import db
+from app.models.job import Job
+from app.utils.instrumentation import request_queries
+from app.utils.jobs import JOB_STATUSES
+
+# Upper bounds in seconds of the request latency histogram
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Multi-process servers: each process writes its numbers here at most this
+# often, and /metrics answers with the sum over every process
+DUMP_INTERVAL = 1.0
+
+
+class Registry:
+    """Counters and histograms of this process, updated under one lock
+
+    Every series is a plain dict keyed by its label values, so recording a
+    request is a few dict updates; the text format is only built on scrape.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.counters = defaultdict(lambda: defaultdict(float))  # name -> labels -> value
+        self.histograms = {}  # labels -> [count per bucket..., +Inf count, sum]
+        self._dumped = 0.0
+        self._timer = None
+
+    def start_request(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finish_request(self, labels, seconds, statements, db_seconds, body_bytes):
+        with self._lock:
+            self.in_flight -= 1
+            self.counters['http_requests_total'][labels] += 1
+            endpoint = labels[:2]
+            if statements:
+                self.counters['http_request_db_statements_total'][endpoint] += statements
+                self.counters['http_request_db_seconds_total'][endpoint] += db_seconds
+            if body_bytes:
+                self.counters['http_request_body_bytes_total'][endpoint] += body_bytes
+            histogram = self.histograms.get(labels)
+            if histogram is None:
+                histogram = self.histograms[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(self.buckets)] += 1
+            histogram[-1] += seconds
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self.counters[name][labels] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'in_flight': self.in_flight,
+                'counters': {name: [[list(labels), value] for labels, value in series.items()]
+                             for name, series in self.counters.items()},
+                'histograms': [[list(labels), list(values)] for labels, values in self.histograms.items()],
+            }
+
+
+registry = Registry()
+
+
+def _forget_parent_counts():
+    # A forked worker starts from zero, or its dump would repeat the parent's numbers
+    global registry
+    registry = Registry(registry.buckets)
+
+
+os.register_at_fork(after_in_child=_forget_parent_counts)
+
+# name -> (type, help, label names)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests handled', ('blueprint', 'endpoint', 'method', 'status')),
+    'http_request_duration_seconds': ('histogram', 'Request latency',
+                                      ('blueprint', 'endpoint', 'method', 'status')),
+    'http_requests_in_flight': ('gauge', 'Requests being handled right now', ()),
+    'http_request_db_statements_total': ('counter', 'SQL statements sent by requests', ('blueprint', 'endpoint')),
+    'http_request_db_seconds_total': ('counter', 'Time requests spent in SQL statements', ('blueprint', 'endpoint')),
+    'http_request_body_bytes_total': ('counter', 'Request body bytes received', ('blueprint', 'endpoint')),
+    'response_cache_requests_total': ('counter', 'Response cache lookups by result', ('result',)),
+    'upload_bytes_total': ('counter', 'Bytes of uploaded files written to disk', ('kind',)),
+    'db_pool_size': ('gauge', 'Connections the pool keeps open', ()),
+    'db_pool_checked_out': ('gauge', 'Pooled connections in use', ()),
+    'db_pool_overflow': ('gauge', 'Connections open beyond the pool size', ()),
+    'jobs': ('gauge', 'Background jobs by status', ('status',)),
+    'app_startup_seconds': ('gauge', 'Time the app took to start, by phase', ('phase',)),
+}
+
+
+def count_cache_lookup(hit):
+    registry.inc('response_cache_requests_total', ('hit' if hit else 'miss',))
+
+
+def count_upload_bytes(kind, size):
+    if size:
+        registry.inc('upload_bytes_total', (kind,), size)
+
+
+def _start():
+    g._metrics_started = time.perf_counter()
+    registry.start_request()
+
+
+def _record_status(response):
+    g._metrics_status = response.status_code
+    return response
+
+
+def _finish(error=None):
+    started = g.pop('_metrics_started', None)
+    if started is None:
+        return
+    status = g.pop('_metrics_status', 500)
+    queries = request_queries()
+    labels = (request.blueprint or '', request.endpoint or 'unmatched', request.method, str(status))
+    registry.finish_request(
+        labels, time.perf_counter() - started,
+        queries.count if queries else 0, queries.seconds if queries else 0.0,
+        request.content_length or 0,
+    )
+    _maybe_dump()
+
+
+def _dump_folder():
+    return current_app.config.get('METRICS_DIR')
+
+
+def _dump(folder):
+    os.makedirs(folder, exist_ok=True)
+    fd, partial = tempfile.mkstemp(dir=folder, suffix='.part')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(partial, os.path.join(folder, f'{os.getpid()}.json'))
+    registry._dumped = time.monotonic()
+    registry._timer = None
+
+
+def _maybe_dump():
+    folder = _dump_folder()
+    if not folder:
+        return
+    wait = DUMP_INTERVAL - (time.monotonic() - registry._dumped)
+    if wait <= 0:
+        _dump(folder)
+    elif registry._timer is None:
+        # Write the requests of this interval even if the process goes idle
+        registry._timer = threading.Timer(wait, _dump, (folder,))
+        registry._timer.daemon = True
+        registry._timer.start()
+
+
+def flush():
+    """Write this process's numbers now, e.g. from a server worker about to exit"""
+    folder = _dump_folder()
+    if folder:
+        _dump(folder)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _snapshots():
+    folder = _dump_folder()
+    if not folder:
+        return [registry.snapshot()]
+    _dump(folder)
+    snapshots = []
+    for path in glob.glob(os.path.join(folder, '*.json')):
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # Being replaced right now
+    return snapshots
+
+
+def _merge(snapshots):
+    """Sum the series of every process; gauges only count processes still running"""
+    counters = defaultdict(lambda: defaultdict(float))
+    histograms = {}
+    in_flight = 0
+    for snapshot in snapshots:
+        # Counters of exited workers stay in the sums so they never go backwards
+        if _alive(snapshot['pid']):
+            in_flight += snapshot['in_flight']
+        for name, series in snapshot['counters'].items():
+            for labels, value in series:
+                counters[name][tuple(labels)] += value
+        for labels, values in snapshot['histograms']:
+            merged = histograms.setdefault(tuple(labels), [0] * len(values))
+            for i, value in enumerate(values):
+                merged[i] += value
+    return counters, histograms, in_flight
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _line(name, label_names, labels, value):
+    if label_names:
+        pairs = ','.join(f'{key}="{_escape(label)}"' for key, label in zip(label_names, labels))
+        name = f'{name}{{{pairs}}}'
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return f'{name} {value}'
+
+
+def _gauges():
+    """Point-in-time values read on scrape: connection pool (of the scraped process), job queue, startup"""
+    pool = db.engine.pool
+    gauges = {}
+    # Only QueuePool reports sizes; SQLite memory databases use a static pool
+    if hasattr(pool, 'checkedout'):
+        gauges['db_pool_size'] = {(): pool.size()}
+        gauges['db_pool_checked_out'] = {(): pool.checkedout()}
+        gauges['db_pool_overflow'] = {(): max(pool.overflow(), 0)}
+    counts = dict(db.session.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+    gauges['jobs'] = {(status,): counts.get(status, 0) for status in JOB_STATUSES}
+    startup = current_app.extensions.get('startup_seconds', {})
+    gauges['app_startup_seconds'] = {(phase,): round(seconds, 6) for phase, seconds in startup.items()}
+    return gauges
+
+
+def render():
+    """Every metric in the Prometheus text exposition format"""
+    counters, histograms, in_flight = _merge(_snapshots())
+    gauges = _gauges()
+    gauges['http_requests_in_flight'] = {(): in_flight}
+    buckets = registry.buckets
+    lines = []
+    for name, (kind, help_text, label_names) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            for labels, values in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), values):
+                    cumulative += count
+                    lines.append(_line(f'{name}_bucket', label_names + ('le',), labels + (str(bound),), cumulative))
+                lines.append(_line(f'{name}_count', label_names, labels, cumulative))
+                lines.append(_line(f'{name}_sum', label_names, labels, float(values[-1])))
+        else:
+            series = counters.get(name) if kind == 'counter' else gauges.get(name)
+            for labels, value in sorted((series or {}).items()):
+                lines.append(_line(name, label_names, labels, value))
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    return current_app.response_class(render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app):
+    """Record every request and serve the totals at /metrics"""
+    global registry
+    if app.config.get('METRICS_BUCKETS'):
+        registry = Registry(app.config['METRICS_BUCKETS'])
+    app.before_request(_start)
+    app.after_request(_record_status)
+    app.teardown_request(_finish)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,103 @@
+import base64
+import json
+from flask import current_app, request
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import undefer
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def get_page_args():
+    """Read ?limit=&after=&sort= from the request; None means an unpaged list (UNPAGED_LISTS only)"""
+    # Lists are paged whether or not the client asked, unless the deployment
+    # still serves whole tables to clients that predate paging
+    asked = any(arg in request.args for arg in ('limit', 'after', 'sort'))
+    if not asked and current_app.config.get('UNPAGED_LISTS'):
+        return None
+    return {
+        'limit': request.args.get('limit'),
+        'after': request.args.get('after'),
+        'sort': request.args.get('sort')
+    }
+
+
+def encode_cursor(sort, sort_value, row_id):
+    """Build an opaque cursor pointing just past a row"""
+    raw = json.dumps([sort, sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Reverse of encode_cursor, raising ValueError on anything malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort, sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return sort, sort_value, int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def page_size(limit):
+    """Clamp a requested ?limit= to the configured page size bounds"""
+    max_size = current_app.config.get('MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+    if limit in (None, ''):
+        return min(current_app.config.get('DEFAULT_PAGE_SIZE', DEFAULT_PAGE_SIZE), max_size)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    return min(limit, max_size)
+
+
+def paginate(query, model, page, sortable=(), serialize=None):
+    """Keyset-paginate a query on (sort column, primary key)
+
+    sortable lists the non-nullable columns a client may order by with ?sort=;
+    the primary key is always the tie-breaker so the ordering is total.
+    serialize turns a row into a dict and defaults to its to_dict().
+    """
+    limit = page_size(page.get('limit'))
+    sort = page.get('sort') or 'id'
+    if sort != 'id' and sort not in sortable:
+        raise ValueError(f'Cannot sort by {sort}')
+
+    pk = model.id
+    column = getattr(model, sort)
+
+    if page.get('after'):
+        cursor_sort, sort_value, last_id = decode_cursor(page['after'])
+        if cursor_sort != sort:
+            raise ValueError('Cursor does not match sort order')
+        if sort == 'id':
+            query = query.filter(pk > last_id)
+        else:
+            query = query.filter(or_(
+                column > sort_value,
+                and_(column == sort_value, pk > last_id)
+            ))
+
+    if sort == 'id':
+        query = query.order_by(pk)
+    else:
+        # The cursor needs the sort value even when ?fields= left it out
+        query = query.order_by(column, pk).options(undefer(column))
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, sort), last.id)
+
+    serialize = serialize or (lambda row: row.to_dict())
+    return {
+        'items': [serialize(row) for row in rows],
+        'limit': limit,
+        'next': next_cursor
+    }
@@ -0,0 +1,160 @@
+import logging
+import os
+import tempfile
+from flask import current_app
+from app.utils.jobs import PermanentJobError, enqueue
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+PDF_EXTENSIONS = {'pdf'}
+
+# Longest side in pixels of each preview size served by /preview?size=
+DEFAULT_SIZES = {'small': 256, 'large': 1024}
+
+class PreviewUnavailable(PermanentJobError, ValueError):
+    """This file cannot get a preview however often it is tried: no renderer, or content it cannot decode"""
+
+
+def preview_kind(filename):
+    """'image', 'pdf' or None, from the artifact's upload name"""
+    extension = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    if extension in IMAGE_EXTENSIONS:
+        return 'image'
+    if extension in PDF_EXTENSIONS:
+        return 'pdf'
+    return None
+
+
+def preview_sizes():
+    return current_app.config.get('PREVIEW_SIZES') or DEFAULT_SIZES
+
+
+def preview_root():
+    return current_app.config.get('PREVIEW_FOLDER') or os.path.join(
+        current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'previews')
+
+
+def preview_path(digest, size):
+    """Previews depend only on the content, so they are stored by digest like the originals"""
+    return os.path.join(preview_root(), digest[:2], digest[2:4], f'{digest}-{size}.jpg')
+
+
+def _pillow():
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise PreviewUnavailable('Previews need the Pillow package installed')
+    return Image, ImageOps
+
+
+def _first_pdf_page(source, max_size, Image):
+    try:
+        import pymupdf
+    except ImportError:
+        raise PreviewUnavailable('PDF previews need the PyMuPDF package installed')
+    try:
+        with pymupdf.open(source, filetype='pdf') as document:
+            if not document.page_count:
+                raise PreviewUnavailable('PDF has no pages')
+            page = document[0]
+            # Render straight at the preview scale instead of at full resolution
+            zoom = max_size / max(page.rect.width, page.rect.height, 1)
+            pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+            return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+    except (FileNotFoundError, PreviewUnavailable):
+        raise
+    except (RuntimeError, ValueError) as e:
+        # FileDataError and friends: a damaged PDF stays damaged
+        raise PreviewUnavailable(f'Cannot read the PDF: {e}')
+
+
+def _image(source, max_size, Image, ImageOps):
+    try:
+        image = Image.open(source)
+        # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale, far cheaper than full size
+        image.draft('RGB', (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+        return image
+    except FileNotFoundError:
+        raise
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        # Not an image Pillow understands, or truncated: the content never changes
+        raise PreviewUnavailable(f'Cannot decode the image: {e}')
+
+
+def render_preview(source, target, kind, max_size):
+    """Write a JPEG of at most max_size pixels on its longest side"""
+    Image, ImageOps = _pillow()
+    if kind == 'pdf':
+        image = _first_pdf_page(source, max_size, Image)
+    else:
+        image = _image(source, max_size, Image, ImageOps)
+    image.thumbnail((max_size, max_size))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, 'JPEG', quality=80, optimize=True)
+        # Readers only ever see a finished preview
+        os.replace(partial, target)
+    except Exception:
+        os.remove(partial)
+        raise
+    return target
+
+
+def ensure_preview(source, digest, filename, size):
+    """Path of the preview, rendering it first if it does not exist yet"""
+    kind = preview_kind(filename)
+    if kind is None:
+        raise ValueError('No preview for this file type')
+    sizes = preview_sizes()
+    if size not in sizes:
+        raise ValueError(f'size must be one of: {", ".join(sizes)}')
+    target = preview_path(digest, size)
+    if not os.path.exists(target):
+        render_preview(source, target, kind, sizes[size])
+    return target
+
+
+def generate_previews(source, digest, filename):
+    """Render every preview size of an artifact (the previews.generate job)"""
+    if preview_kind(filename) is None:
+        return
+    failed = None
+    for size in preview_sizes():
+        try:
+            ensure_preview(source, digest, filename, size)
+        except PreviewUnavailable:
+            # The same for every size, and a retry would only fail again
+            raise
+        except Exception as e:
+            logger.warning('Preview %s of %s failed: %s', size, digest, e)
+            failed = failed or e
+    # Raised after trying every size so the job is retried for the ones missing
+    if failed:
+        raise failed
+
+
+def remove_previews(digest):
+    for size in preview_sizes():
+        try:
+            os.remove(preview_path(digest, size))
+        except OSError:
+            pass  # Never rendered
+
+
+def queue_previews(source, digest, filename):
+    """Queue rendering of an artifact's previews with the current transaction"""
+    if preview_kind(filename) is not None:
+        enqueue('previews.generate', {'source': source, 'digest': digest, 'filename': filename})
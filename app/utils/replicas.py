@@ -0,0 +1,67 @@
+import math
+import random
+import time
+from contextlib import contextmanager
+from flask import current_app, g, request
+from database import db, replica_keys
+from app.utils.sqlite import READ_METHODS
+
+DEFAULT_STICKY_SECONDS = 5
+DEFAULT_STICKY_COOKIE = 'read_primary_until'
+
+
+def _replicas():
+    return current_app.extensions['read_replicas']
+
+
+def _sticky():
+    """Did this client write recently enough that a replica may not have its change yet?"""
+    until = request.cookies.get(current_app.config.get('REPLICA_STICKY_COOKIE', DEFAULT_STICKY_COOKIE))
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+
+def _choose():
+    replicas = _replicas()
+    if replicas and request.method in READ_METHODS and not _sticky():
+        # One replica for the whole request, so its reads see one consistent state
+        g._read_replica = random.choice(replicas)
+
+
+def _remember_write(response):
+    if request.method in READ_METHODS or response.status_code >= 400:
+        return response
+    seconds = current_app.config.get('REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+    response.set_cookie(
+        current_app.config.get('REPLICA_STICKY_COOKIE', DEFAULT_STICKY_COOKIE),
+        str(round(time.time() + seconds, 3)), max_age=math.ceil(seconds), httponly=True, samesite='Lax',
+        secure=current_app.config.get('SESSION_COOKIE_SECURE', False),
+    )
+    return response
+
+
+def read_from_replica():
+    """Whether this request's reads go to a replica"""
+    return g.get('_read_replica') is not None
+
+
+@contextmanager
+def on_primary():
+    """Send the reads inside the block to the primary, e.g. to check a replica's answer"""
+    replica = g.pop('_read_replica', None)
+    try:
+        yield
+    finally:
+        if replica is not None:
+            g._read_replica = replica
+
+
+def init_replicas(app):
+    """Route GET reads to READ_REPLICA_URLS, except for clients that just wrote (REPLICA_STICKY_SECONDS)"""
+    with app.app_context():
+        app.extensions['read_replicas'] = [db.engines[key] for key in replica_keys(app)]
+    if app.extensions['read_replicas']:
+        app.before_request(_choose)
+        app.after_request(_remember_write)
@@ -0,0 +1,127 @@
+import logging
+import re
+from sqlalchemy import Float, Integer, null, or_, select, text
+
+# Indexed columns per table, most important first. The order doubles as the
+# relevance weighting: SQLite passes it to bm25(), PostgreSQL maps it onto
+# tsvector weights A/B/C so column-scoped searches can use the weight label.
+# The FTS tables, triggers and columns are created by migrations: changing the
+# columns, or a batch migration rebuilding one of these tables (which drops its
+# triggers), needs a revision that recreates them, like d8f3b1a6c942 does.
+SEARCH_COLUMNS = {
+    'facilities': ('name', 'capabilities', 'description'),
+    'equipment': ('name', 'capabilities', 'description'),
+    'services': ('name', 'category', 'description'),
+}
+
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+TSVECTOR_WEIGHTS = ('A', 'B', 'C')
+
+logger = logging.getLogger(__name__)
+
+# Engine URL -> whether its full-text structures exist, checked once per process
+_indexed = {}
+
+
+def _tokens(value):
+    return re.findall(r'\w+', str(value).lower())
+
+
+def _index_exists(connection, dialect, table):
+    if dialect == 'sqlite':
+        # Look for the sync trigger: rebuilding the base table (e.g. a batch
+        # migration) drops triggers but leaves the FTS table behind
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"
+        return connection.execute(text(sql), {'name': f'{table}_fts_ai'}).first() is not None
+    sql = ("SELECT 1 FROM information_schema.columns "
+           "WHERE table_name = :name AND column_name = 'search_vector'")
+    return connection.execute(text(sql), {'name': table}).first() is not None
+
+
+def search_indexed(engine):
+    """Whether the engine has the full-text structures (created by `flask db upgrade`)"""
+    key = str(engine.url)
+    if key not in _indexed:
+        dialect = engine.dialect.name
+        with engine.connect() as connection:
+            _indexed[key] = all(_index_exists(connection, dialect, table) for table in SEARCH_COLUMNS)
+        if not _indexed[key]:
+            logger.warning('No full-text index on %s, searching with LIKE; run `flask db upgrade`',
+                           engine.url.render_as_string(hide_password=True))
+    return _indexed[key]
+
+
+def _match_expression(dialect, table, terms):
+    columns = SEARCH_COLUMNS[table]
+    parts = []
+    for column, value in terms.items():
+        for token in _tokens(value):
+            if dialect == 'sqlite':
+                prefix = f'{column} : ' if column else ''
+                parts.append(f'{prefix}"{token}"*')
+            else:
+                weight = TSVECTOR_WEIGHTS[columns.index(column)] if column else ''
+                parts.append(f'{token}:*{weight}')
+    joiner = ' AND ' if dialect == 'sqlite' else ' & '
+    return joiner.join(parts)
+
+
+def _hits(query, model, terms):
+    """Subquery of (id, score) for rows matching terms, or None if the backend has no index"""
+    engine = query.session.get_bind()
+    dialect = engine.dialect.name
+    if dialect not in ('sqlite', 'postgresql') or not search_indexed(engine):
+        return None
+
+    table = model.__tablename__
+    expression = _match_expression(dialect, table, terms)
+    if dialect == 'sqlite':
+        weights = ', '.join(str(w) for w in BM25_WEIGHTS[:len(SEARCH_COLUMNS[table])])
+        # bm25() is lower-is-better, flip it so every backend ranks descending
+        sql = (f"SELECT rowid AS id, -bm25({table}_fts, {weights}) AS score "
+               f"FROM {table}_fts WHERE {table}_fts MATCH :expression")
+    else:
+        sql = (f"SELECT id, ts_rank(search_vector, to_tsquery('simple', :expression)) AS score "
+               f"FROM {table} WHERE search_vector @@ to_tsquery('simple', :expression)")
+    return text(sql).bindparams(expression=expression).columns(id=Integer, score=Float).subquery()
+
+
+def _ilike_fallback(query, model, terms):
+    columns = SEARCH_COLUMNS[model.__tablename__]
+    for column, value in terms.items():
+        if column:
+            query = query.filter(getattr(model, column).ilike(f'%{value}%'))
+        else:
+            query = query.filter(or_(*[getattr(model, c).ilike(f'%{value}%') for c in columns]))
+    return query
+
+
+def _clean(terms):
+    return {column: value for column, value in terms.items() if _tokens(value)}
+
+
+def fulltext_filter(query, model, terms):
+    """Restrict query to rows matching terms without changing its ordering
+
+    terms maps an indexed column name to the text to look for; the key None
+    searches every indexed column. Each word is matched as a prefix.
+    """
+    terms = _clean(terms)
+    if not terms:
+        return query
+    hits = _hits(query, model, terms)
+    if hits is None:
+        return _ilike_fallback(query, model, terms)
+    return query.filter(model.id.in_(select(hits.c.id)))
+
+
+def fulltext_search(query, model, terms):
+    """Like fulltext_filter, but yields (row, score) pairs ordered by relevance"""
+    terms = _clean(terms)
+    hits = _hits(query, model, terms) if terms else None
+    if hits is None:
+        query = _ilike_fallback(query, model, terms)
+        return query.add_columns(null().label('score')).order_by(model.id)
+    return (query.join(hits, model.id == hits.c.id)
+            .add_columns(hits.c.score)
+            .order_by(hits.c.score.desc(), model.id))
@@ -0,0 +1,97 @@
+import os
+import threading
+from flask import has_request_context, request
+from sqlalchemy import event
+from database import db
+
+# Applied in this order to every new SQLite connection; SQLITE_PRAGMAS
+# overrides single entries (None leaves that pragma at SQLite's default)
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,  # ms a statement waits for a lock before "database is locked"
+    'journal_mode': 'wal',  # readers keep reading while one connection writes
+    'synchronous': 'normal',  # with WAL only a power cut can lose the last commits, never corrupt
+    'foreign_keys': 'on',
+    'cache_size': -64 * 1024,  # negative: KiB of page cache per connection
+    'mmap_size': 256 * 1024 ** 2,
+    'temp_store': 'memory',
+}
+
+# Methods whose transactions may write; everything outside a request (jobs,
+# CLI commands) counts as a writer too
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# SQLITE_WRITE_QUEUE: one write transaction per process at a time, the
+# others wait here in turn instead of polling the file lock
+_writer = threading.Lock()
+
+
+def _new_writer_lock():
+    # A child forked while another thread held the lock would never see it released
+    global _writer
+    _writer = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_new_writer_lock)
+
+
+def pragmas(app):
+    """The pragmas a connection of this app gets, in order"""
+    configured = dict(DEFAULT_PRAGMAS, **(app.config.get('SQLITE_PRAGMAS') or {}))
+    return [(name, value) for name, value in configured.items() if value is not None]
+
+
+def _writes():
+    return not has_request_context() or request.method not in READ_METHODS
+
+
+def _on_connect(settings):
+    def connect(dbapi_connection, connection_record):
+        # Transactions are begun explicitly below, not by the driver before
+        # the first write, so the writers can take the lock up front
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in settings:
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+    return connect
+
+
+def _on_begin(queue, timeout):
+    def begin(conn):
+        driver = conn.connection.driver_connection
+        if driver.in_transaction:
+            return  # A memory database's single connection, already in a transaction
+        if _writes():
+            if queue and not conn.info.get('sqlite_writer'):
+                if not _writer.acquire(timeout=timeout):
+                    raise TimeoutError('Timed out waiting for the database writer queue')
+                conn.info['sqlite_writer'] = True
+            # IMMEDIATE takes the write lock now (waiting up to busy_timeout);
+            # a deferred transaction that read first could only fail on its first write
+            statement = 'BEGIN IMMEDIATE'
+        else:
+            statement = 'BEGIN'
+        # Straight to the driver: instrumentation counts the app's statements only
+        driver.execute(statement)
+    return begin
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    # Back in the pool means committed or rolled back: the next writer may go
+    if connection_record.info.pop('sqlite_writer', False):
+        _writer.release()
+
+
+def init_sqlite(app):
+    """Tune every SQLite engine of the app (SQLITE_PRAGMAS, SQLITE_WRITE_QUEUE)"""
+    settings = pragmas(app)
+    queue = app.config.get('SQLITE_WRITE_QUEUE', False)
+    timeout = dict(settings).get('busy_timeout', 5000) / 1000
+    with app.app_context():
+        engines = db.engines.values()
+        for engine in engines:
+            if engine.dialect.name != 'sqlite':
+                continue
+            event.listen(engine, 'connect', _on_connect(settings))
+            event.listen(engine, 'begin', _on_begin(queue, timeout))
+            event.listen(engine, 'checkin', _on_checkin)
@@ -0,0 +1,180 @@
+import json
+from collections import Counter
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, delete, event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+from database import db
+from app.models.stat_counter import StatCounter
+from app.utils.conditional import bump_versions
+
+# Counted groupings per table: () is the table total, ('facility_id',) the
+# rows per facility, ('program_id', 'prototype_stage') a two-level breakdown
+COUNTERS = {
+    'programs': [()],
+    'facilities': [(), ('facility_type',)],
+    'services': [(), ('facility_id',)],
+    'equipment': [(), ('facility_id',)],
+    'projects': [(), ('facility_id',), ('program_id',), ('program_id', 'prototype_stage')],
+    'participants': [(), ('institution',)],
+    'project_participants': [(), ('project_id',)],
+    'outcomes': [(), ('commercialization_status',), ('outcome_type',)],
+}
+
+
+def counter_name(table, columns):
+    return '.'.join([table, ','.join(columns)]) if columns else table
+
+
+def counter_key(values):
+    return json.dumps(list(values))
+
+
+def _stored(table, column, value):
+    """value as the database hands it back, so "2" set on an integer column counts under 2"""
+    if value is None:
+        return None
+    python_type = db.metadata.tables[table].c[column].type.python_type
+    if isinstance(value, python_type):
+        return value
+    try:
+        return python_type(value)
+    except (TypeError, ValueError):
+        return value  # Stored as given (SQLite's loose typing); rebuild() groups it the same way
+
+
+def _key(table, columns, get):
+    return counter_key(_stored(table, column, get(column)) for column in columns)
+
+
+def _row_values(get, table):
+    """(counter name, key) of every counter a row with these values adds to"""
+    return [(counter_name(table, columns), _key(table, columns, get)) for columns in COUNTERS[table]]
+
+
+def apply_deltas(session, deltas):
+    """Add each delta to its counter in the current transaction (creating counters as needed)
+
+    One executemany UPDATE in (name, key) order: writers touching the same
+    hot rows (the table totals) lock them in the same order and never deadlock.
+    """
+    changes = [{'counter_name': name, 'counter_key': key, 'delta': delta}
+               for (name, key), delta in sorted(deltas.items()) if delta]
+    if not changes:
+        return
+    now = datetime.utcnow()
+    counters = StatCounter.__table__
+    result = session.execute(
+        update(counters)
+        .where(counters.c.name == bindparam('counter_name'), counters.c.key == bindparam('counter_key'))
+        .values(value=counters.c.value + bindparam('delta'), updated_at=now),
+        changes
+    )
+    if session.get_bind().dialect.supports_sane_multi_rowcount and result.rowcount == len(changes):
+        return
+
+    # Some counters don't exist yet (or the driver can't tell how many rows matched)
+    existing = set(session.execute(
+        select(counters.c.name, counters.c.key).where(
+            counters.c.name.in_({change['counter_name'] for change in changes}),
+            counters.c.key.in_({change['counter_key'] for change in changes}))
+    ).all())
+    missing = [{'name': change['counter_name'], 'key': change['counter_key'], 'value': change['delta'],
+                'updated_at': now}
+               for change in changes if (change['counter_name'], change['counter_key']) not in existing]
+    if missing:
+        session.execute(insert(counters), missing)
+
+
+def count_rows(session, table, rows, sign):
+    """Count rows written with Core statements, which the flush listener never sees (+1 insert, -1 delete)"""
+    if table not in COUNTERS:
+        return
+    deltas = Counter()
+    for row in rows:
+        for counter in _row_values(row.get, table):
+            deltas[counter] += sign
+    apply_deltas(session, deltas)
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_changes(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        table = obj.__table__.name
+        if table in COUNTERS:
+            for counter in _row_values(lambda column: getattr(obj, column), table):
+                deltas[counter] += 1
+    for obj in session.deleted:
+        table = obj.__table__.name
+        if table in COUNTERS:
+            for counter in _row_values(lambda column: getattr(obj, column), table):
+                deltas[counter] -= 1
+    for obj in session.dirty:
+        table = obj.__table__.name
+        if table not in COUNTERS:
+            continue
+        attrs = inspect(obj).attrs
+        grouped = {column for columns in COUNTERS[table] for column in columns}
+        changed = {column for column in grouped if attrs[column].history.has_changes()}
+        if not changed:
+            continue
+
+        def before(column):
+            if column in changed:
+                previous = attrs[column].history.deleted
+                return previous[0] if previous else None
+            return getattr(obj, column)
+
+        # Only the groupings over a changed column move from one key to another
+        for columns in COUNTERS[table]:
+            if changed.intersection(columns):
+                name = counter_name(table, columns)
+                deltas[(name, _key(table, columns, before))] -= 1
+                deltas[(name, _key(table, columns, lambda column: getattr(obj, column)))] += 1
+    if deltas:
+        apply_deltas(session, deltas)
+
+
+def read_counters(*names):
+    """{counter name: {tuple of grouped values: count}} for the given counters"""
+    result = {name: {} for name in names}
+    rows = db.session.execute(
+        select(StatCounter.name, StatCounter.key, StatCounter.value)
+        .where(StatCounter.name.in_(names), StatCounter.value != 0)
+    )
+    for name, key, value in rows:
+        result[name][tuple(json.loads(key))] = value
+    return result
+
+
+def rebuild():
+    """Recompute every counter with GROUP BY queries (repair, or after writes outside the app)"""
+    db.session.execute(delete(StatCounter))
+    now = datetime.utcnow()
+    for table, groupings in COUNTERS.items():
+        source = db.metadata.tables[table]
+        for columns in groupings:
+            group = [source.c[column] for column in columns]
+            # Without columns this is one row holding the table total, even when empty
+            rows = db.session.execute(select(*group, func.count()).select_from(source).group_by(*group)).all()
+            if rows:
+                db.session.execute(insert(StatCounter), [
+                    {'name': counter_name(table, columns), 'key': counter_key(row[:-1]),
+                     'value': row[-1], 'updated_at': now}
+                    for row in rows
+                ])
+    # The reports are cached and validated by the versions of these tables
+    bump_versions(db.session, COUNTERS)
+    db.session.commit()
+
+
+stats_command = AppGroup('stats', help='Maintain the statistics counters.')
+
+
+@stats_command.command('rebuild')
+def rebuild_command():
+    """Recompute all counters from the tables."""
+    rebuild()
+    click.echo(f'Rebuilt {db.session.query(StatCounter).count()} counter(s)')
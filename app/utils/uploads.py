@@ -0,0 +1,241 @@
+import fcntl
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from database import db
+from app.models.artifact_upload import ArtifactUpload
+from app.utils.artifacts import store_file
+from app.utils.metrics import count_upload_bytes
+
+# Bytes copied per read from the request stream or the partial file
+COPY_BUFFER_SIZE = 1 << 20
+
+ARTIFACT_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx', 'zip', 'dwg', 'step', 'stl'}
+
+
+class UploadConflict(ValueError):
+    """A chunk that does not start where the upload currently ends"""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+class _HashStates:
+    """SHA-256 objects of in-progress uploads, kept by the process that wrote the chunks
+
+    Hash state cannot be stored or shared. While consecutive chunks reach the
+    same process the digest grows as they arrive; once a chunk lands on
+    another worker (or after a restart) that upload's digest is given up and
+    finish_upload reads the whole file once instead.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._states = OrderedDict()
+
+    def take(self, upload_id, offset):
+        """The digest of the first offset bytes, or None if this process doesn't have it"""
+        with self._lock:
+            state = self._states.pop(upload_id, None)
+        if offset == 0:
+            return hashlib.sha256()
+        if state is not None and state[0] == offset:
+            return state[1]
+        return None
+
+    def put(self, upload_id, offset, digest):
+        with self._lock:
+            self._states[upload_id] = (offset, digest)
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+
+    def drop(self, upload_id):
+        with self._lock:
+            self._states.pop(upload_id, None)
+
+
+_hashes = _HashStates()
+
+
+def _locked(path):
+    """Open the partial file for appending, holding an exclusive lock until it is closed
+
+    The lock spans processes, so a retried chunk waits for the first attempt
+    to finish and then sees the offset it left instead of writing over it.
+    """
+    # r+b, not ab: a file discarded meanwhile must not be created again
+    f = open(path, 'r+b')
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    f.seek(0, os.SEEK_END)
+    return f
+
+
+def _file_digest(f, size):
+    digest = hashlib.sha256()
+    f.seek(0)
+    remaining = size
+    while remaining:
+        block = f.read(min(COPY_BUFFER_SIZE, remaining))
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    return digest
+
+
+def allowed_artifact(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ARTIFACT_EXTENSIONS
+
+
+def _folder(name):
+    folder = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), name)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _normalize_checksum(value):
+    if not value:
+        return None
+    value = str(value).strip().lower()
+    if value.startswith('sha256:'):
+        value = value[len('sha256:'):]
+    if len(value) != 64 or any(c not in '0123456789abcdef' for c in value):
+        raise ValueError('checksum must be a hex SHA-256 digest')
+    return value
+
+
+def purge_stale_uploads():
+    """Drop uploads that were never finished within UPLOAD_EXPIRY_HOURS"""
+    hours = current_app.config.get('UPLOAD_EXPIRY_HOURS', 24)
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    stale = ArtifactUpload.query.filter(ArtifactUpload.updated_at < cutoff).all()
+    for upload in stale:
+        discard_upload(upload)
+    return len(stale)
+
+
+def new_upload(filename, size, checksum=None):
+    """Start an upload session with an empty partial file"""
+    if not filename or not allowed_artifact(filename):
+        raise ValueError('File type not allowed')
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise ValueError('size must be the total file size in bytes')
+    limit = current_app.config.get('MAX_ARTIFACT_SIZE', 10 * 1024 ** 3)
+    if size <= 0 or size > limit:
+        raise ValueError(f'size must be between 1 and {limit} bytes')
+
+    upload_id = uuid.uuid4().hex
+    file_path = os.path.join(_folder('partial'), f'{upload_id}.part')
+    open(file_path, 'wb').close()
+    upload = ArtifactUpload(id=upload_id, filename=filename, size=size, received=0,
+                            checksum=_normalize_checksum(checksum), file_path=file_path)
+    db.session.add(upload)
+    return upload
+
+
+def append_chunk(upload, offset, stream):
+    """Append the request body at offset, hashing it on the way to disk"""
+    if upload.status != 'uploading':
+        raise ValueError(f'Upload is {upload.status}')
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        raise ValueError('Upload-Offset header is required')
+    try:
+        f = _locked(upload.file_path)
+    except FileNotFoundError:
+        raise ValueError('Upload was discarded')
+    with f:
+        # The file on disk is the source of truth: a dropped connection may have
+        # left more bytes than the last committed offset
+        on_disk = f.tell()
+        if offset != on_disk:
+            upload.received = on_disk
+            raise UploadConflict(f'Expected offset {on_disk}', on_disk)
+
+        digest = _hashes.take(upload.id, offset)
+        written = offset
+        try:
+            while True:
+                block = stream.read(COPY_BUFFER_SIZE)
+                if not block:
+                    break
+                if written + len(block) > upload.size:
+                    raise ValueError('Chunk goes past the declared size')
+                f.write(block)
+                if digest is not None:
+                    digest.update(block)
+                written += len(block)
+        except ValueError:
+            # Keep what arrived before the overflow so the offsets stay consistent
+            f.flush()
+            f.truncate(written)
+            raise
+        finally:
+            count_upload_bytes('chunked', written - offset)
+            if digest is not None:
+                _hashes.put(upload.id, written, digest)
+            upload.received = written
+    return written
+
+
+def finish_upload(upload, checksum=None):
+    """Check size and checksum once every byte has arrived"""
+    if upload.status == 'complete':
+        return upload
+    if upload.status != 'uploading':
+        raise ValueError(f'Upload is {upload.status}')
+    try:
+        f = _locked(upload.file_path)
+    except FileNotFoundError:
+        raise ValueError('Upload was discarded')
+    with f:
+        received = f.tell()
+        upload.received = received
+        if received != upload.size:
+            raise UploadConflict(f'Upload incomplete: {received} of {upload.size} bytes', received)
+        digest = _hashes.take(upload.id, received)
+        if digest is None:
+            # The chunks were spread over several workers: hash the file once, here
+            digest = _file_digest(f, received)
+
+    expected = _normalize_checksum(checksum) or upload.checksum
+    actual = digest.hexdigest()
+    if expected and expected != actual:
+        discard_upload(upload)
+        raise ValueError('Checksum mismatch; the upload was discarded, please start again')
+    upload.sha256 = actual
+    upload.status = 'complete'
+    return upload
+
+
+def claim_upload(upload_id):
+    """Move a complete upload into the artifact store; returns (Artifact, filename)
+
+    The digest was computed by finish_upload, so the file is not read
+    again. The upload session ends here.
+    """
+    upload = db.session.get(ArtifactUpload, upload_id)
+    if not upload or upload.status != 'complete':
+        raise ValueError('Invalid upload_id: no finished upload with that id')
+    artifact = store_file(upload.file_path, upload.sha256)
+    db.session.delete(upload)
+    return artifact, upload.filename
+
+
+def discard_upload(upload):
+    """Delete an unfinished upload and its partial file"""
+    _hashes.drop(upload.id)
+    try:
+        os.remove(upload.file_path)
+    except OSError:
+        pass
+    db.session.delete(upload)
@@ -1,12 +1,73 @@
+import os
+from flask import g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask_sqlalchemy.session import Session
+from sqlalchemy import CompoundSelect, Select
+from sqlalchemy.engine import make_url
+
+
+class RoutingSession(Session):
+    """Sends plain SELECTs to the replica picked for the request (see app.utils.replicas)"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context():
+            replica = g.get('_read_replica')
+            if replica is not None and isinstance(clause, (Select, CompoundSelect)) \
+                    and clause._for_update_arg is None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
 
 # Initialize extensions
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# Connections beyond DB_POOL_SIZE a process may open for short bursts
+DEFAULT_MAX_OVERFLOW = 2
+# Seconds a request waits for a free connection before failing
+DEFAULT_POOL_TIMEOUT = 10
+
+
+def pool_options():
+    """Pool of one server process: a connection per request thread (DB_POOL_SIZE, set by gunicorn.conf.py)"""
+    size = os.environ.get('DB_POOL_SIZE')
+    if not size:
+        return {}
+    return {
+        'pool_size': int(size),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT)),
+        'pool_pre_ping': True,
+    }
+
+
+def _single_connection(uri):
+    # SQLite memory databases live in one connection (StaticPool), which takes no sizes
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def replica_keys(app):
+    """Bind keys of the configured read replicas (READ_REPLICA_URLS)"""
+    return [f'replica_{number}' for number in range(len(app.config.get('READ_REPLICA_URLS') or ()))]
+
 
 def init_db(app):
     """Initialize database with Flask app"""
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    for key, url in zip(replica_keys(app), app.config.get('READ_REPLICA_URLS') or ()):
+        binds.setdefault(key, url)
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    if not _single_connection(app.config['SQLALCHEMY_DATABASE_URI']):
+        for key, value in pool_options().items():
+            options.setdefault(key, value)
     db.init_app(app)
-    migrate.init_app(app, db)
-    return db
\ No newline at end of file
+    return db
+
+
+def init_migrations(app):
+    """Add `flask db` (Flask-Migrate); imported only here, servers have no use for Alembic"""
+    from flask_migrate import Migrate
+    # Batch mode lets Alembic alter SQLite tables by copy-and-swap
+    Migrate(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
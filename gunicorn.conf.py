@@ -0,0 +1,79 @@
+# Production server: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# A master process imports the app once (preload_app) and forks WEB_CONCURRENCY
+# workers, each serving WEB_THREADS requests at a time on threads. Every worker
+# keeps a pool of one database connection per thread. Reload gracefully with
+# `kill -HUP` (new settings) or `kill -USR2` + `kill -TERM` on the old master
+# (new code); see "Production server" in README.md.
+import glob
+import importlib.util
+import multiprocessing
+import os
+import re
+import tempfile
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+# One worker per core: on the benchmarks extra workers only add contention
+workers = int(os.environ.get('WEB_CONCURRENCY', 0)) or multiprocessing.cpu_count()
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 8))
+
+# Import the app before forking so workers share its memory copy-on-write and
+# start in milliseconds; code changes then need a new master (USR2), not HUP
+preload_app = True
+
+# Recycle workers now and then so slow leaks never add up; the jitter keeps
+# them from restarting all at once
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+
+# Requests running when a reload or shutdown starts get this long to finish
+graceful_timeout = 30
+# A worker that has not checked in for this long is killed and replaced
+timeout = 60
+keepalive = 5
+
+pidfile = os.environ.get('PIDFILE')
+accesslog = os.environ.get('ACCESS_LOG')
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+# Let X-Forwarded-* from the front proxy through
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+# Read by the app when it is loaded, so set before preloading. Jobs run in
+# `flask jobs worker`, not on threads of the web workers. The metrics folder
+# is named after BIND: give the address there rather than with --bind.
+os.environ.setdefault('DB_POOL_SIZE', str(threads))
+os.environ.setdefault('JOB_RUNNER', 'worker')
+# The memory response cache is per process: a write handled by one worker
+# would leave the others serving stale pages, so share one in Redis or go without
+_redis_missing = bool(os.environ.get('REDIS_URL')) and importlib.util.find_spec('redis') is None
+if workers > 1:
+    use_redis = os.environ.get('REDIS_URL') and not _redis_missing
+    os.environ.setdefault('RESPONSE_CACHE_BACKEND', 'redis' if use_redis else 'none')
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'ods-metrics-' + re.sub(r'[^\w.-]', '_', bind)))
+
+
+def on_starting(server):
+    if _redis_missing and os.environ.get('RESPONSE_CACHE_BACKEND') == 'none':
+        server.log.warning('REDIS_URL is set but the redis package is not installed '
+                           '(pip install -r requirements.txt); response caching is off')
+    # Counters start from zero with the server, as Prometheus expects after a restart
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+        os.remove(path)
+
+
+def post_fork(server, worker):
+    from database import db
+    app = server.app.wsgi()
+    # Connections opened while preloading belong to the master; the worker opens its own
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    from app.utils.metrics import flush
+    app = server.app.wsgi()
+    # Keep the requests of a recycled worker in the /metrics totals
+    with app.app_context():
+        flush()
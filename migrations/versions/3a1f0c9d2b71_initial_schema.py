@@ -0,0 +1,133 @@
+"""initial schema
+
+Revision ID: 3a1f0c9d2b71
+Revises: 
+Create Date: 2026-10-18 09:12:44.281905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a1f0c9d2b71'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _exists(table):
+    # Databases built by the old db.create_all() at startup already have the
+    # tables; skip them so `flask db upgrade` can adopt those databases too
+    return table in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    if not _exists('programs'):
+        op.create_table('programs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('national_alignment', sa.String(length=255), nullable=True),
+        sa.Column('focus_areas', sa.String(length=255), nullable=True),
+        sa.Column('phases', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if not _exists('facilities'):
+        op.create_table('facilities',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('location', sa.String(length=255), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('partner_org', sa.String(length=255), nullable=True),
+        sa.Column('facility_type', sa.String(length=100), nullable=True),
+        sa.Column('capabilities', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if not _exists('participants'):
+        op.create_table('participants',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('full_name', sa.String(length=255), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('affiliation', sa.String(length=100), nullable=True),
+        sa.Column('specialization', sa.String(length=100), nullable=True),
+        sa.Column('cross_skill_trained', sa.Boolean(), nullable=True),
+        sa.Column('institution', sa.String(length=100), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email')
+        )
+    if not _exists('projects'):
+        op.create_table('projects',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('program_id', sa.Integer(), nullable=False),
+        sa.Column('facility_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('nature', sa.String(length=100), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('innovation_focus', sa.String(length=255), nullable=True),
+        sa.Column('prototype_stage', sa.String(length=100), nullable=True),
+        sa.Column('testing_requirements', sa.Text(), nullable=True),
+        sa.Column('commercialization_plan', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['facility_id'], ['facilities.id'], ),
+        sa.ForeignKeyConstraint(['program_id'], ['programs.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if not _exists('services'):
+        op.create_table('services',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('facility_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('category', sa.String(length=100), nullable=True),
+        sa.Column('skill_type', sa.String(length=100), nullable=True),
+        sa.ForeignKeyConstraint(['facility_id'], ['facilities.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if not _exists('equipment'):
+        op.create_table('equipment',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('facility_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('capabilities', sa.String(length=255), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('inventory_code', sa.String(length=100), nullable=True),
+        sa.Column('usage_domain', sa.String(length=100), nullable=True),
+        sa.Column('support_phase', sa.String(length=100), nullable=True),
+        sa.ForeignKeyConstraint(['facility_id'], ['facilities.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if not _exists('project_participants'):
+        op.create_table('project_participants',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('participant_id', sa.Integer(), nullable=False),
+        sa.Column('role_on_project', sa.String(length=50), nullable=False),
+        sa.Column('skill_role', sa.String(length=50), nullable=True),
+        sa.ForeignKeyConstraint(['participant_id'], ['participants.id'], ),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if not _exists('outcomes'):
+        op.create_table('outcomes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('artifact_link', sa.String(length=255), nullable=True),
+        sa.Column('outcome_type', sa.String(length=100), nullable=True),
+        sa.Column('quality_certification', sa.String(length=255), nullable=True),
+        sa.Column('commercialization_status', sa.String(length=100), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('outcomes')
+    op.drop_table('project_participants')
+    op.drop_table('equipment')
+    op.drop_table('services')
+    op.drop_table('projects')
+    op.drop_table('participants')
+    op.drop_table('facilities')
+    op.drop_table('programs')
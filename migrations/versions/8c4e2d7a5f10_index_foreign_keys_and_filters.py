@@ -0,0 +1,82 @@
+"""index foreign keys and filter columns
+
+Revision ID: 8c4e2d7a5f10
+Revises: 3a1f0c9d2b71
+Create Date: 2026-10-18 10:03:17.550213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e2d7a5f10'
+down_revision = '3a1f0c9d2b71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('facilities', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_facilities_facility_type'), ['facility_type'], unique=False)
+
+    with op.batch_alter_table('participants', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_participants_affiliation'), ['affiliation'], unique=False)
+        batch_op.create_index(batch_op.f('ix_participants_institution'), ['institution'], unique=False)
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_projects_facility_id'), ['facility_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_projects_program_id'), ['program_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_projects_prototype_stage'), ['prototype_stage'], unique=False)
+
+    with op.batch_alter_table('services', schema=None) as batch_op:
+        batch_op.create_index('ix_services_facility_id_category', ['facility_id', 'category'], unique=False)
+        batch_op.create_index(batch_op.f('ix_services_category'), ['category'], unique=False)
+        batch_op.create_index(batch_op.f('ix_services_skill_type'), ['skill_type'], unique=False)
+
+    with op.batch_alter_table('equipment', schema=None) as batch_op:
+        batch_op.create_index('ix_equipment_facility_id_usage_domain', ['facility_id', 'usage_domain'], unique=False)
+        batch_op.create_index(batch_op.f('ix_equipment_usage_domain'), ['usage_domain'], unique=False)
+        batch_op.create_index(batch_op.f('ix_equipment_support_phase'), ['support_phase'], unique=False)
+
+    with op.batch_alter_table('project_participants', schema=None) as batch_op:
+        batch_op.create_index('ux_project_participants_project_id_participant_id', ['project_id', 'participant_id'], unique=True)
+        batch_op.create_index(batch_op.f('ix_project_participants_participant_id'), ['participant_id'], unique=False)
+
+    with op.batch_alter_table('outcomes', schema=None) as batch_op:
+        batch_op.create_index('ix_outcomes_project_id_outcome_type', ['project_id', 'outcome_type'], unique=False)
+        batch_op.create_index(batch_op.f('ix_outcomes_outcome_type'), ['outcome_type'], unique=False)
+        batch_op.create_index(batch_op.f('ix_outcomes_commercialization_status'), ['commercialization_status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('outcomes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_outcomes_commercialization_status'))
+        batch_op.drop_index(batch_op.f('ix_outcomes_outcome_type'))
+        batch_op.drop_index('ix_outcomes_project_id_outcome_type')
+
+    with op.batch_alter_table('project_participants', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_project_participants_participant_id'))
+        batch_op.drop_index('ux_project_participants_project_id_participant_id')
+
+    with op.batch_alter_table('equipment', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_equipment_support_phase'))
+        batch_op.drop_index(batch_op.f('ix_equipment_usage_domain'))
+        batch_op.drop_index('ix_equipment_facility_id_usage_domain')
+
+    with op.batch_alter_table('services', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_services_skill_type'))
+        batch_op.drop_index(batch_op.f('ix_services_category'))
+        batch_op.drop_index('ix_services_facility_id_category')
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_projects_prototype_stage'))
+        batch_op.drop_index(batch_op.f('ix_projects_program_id'))
+        batch_op.drop_index(batch_op.f('ix_projects_facility_id'))
+
+    with op.batch_alter_table('participants', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_participants_institution'))
+        batch_op.drop_index(batch_op.f('ix_participants_affiliation'))
+
+    with op.batch_alter_table('facilities', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_facilities_facility_type'))
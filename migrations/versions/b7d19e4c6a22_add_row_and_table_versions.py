@@ -0,0 +1,47 @@
+"""add updated_at columns and table_versions
+
+Revision ID: b7d19e4c6a22
+Revises: 8c4e2d7a5f10
+Create Date: 2026-10-18 11:40:02.913377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d19e4c6a22'
+down_revision = '8c4e2d7a5f10'
+branch_labels = None
+depends_on = None
+
+TABLES = ('programs', 'facilities', 'participants', 'projects', 'services',
+          'equipment', 'project_participants', 'outcomes')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f'UPDATE {table} SET updated_at = CURRENT_TIMESTAMP')
+
+    table_versions = op.create_table('table_versions',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.execute(table_versions.insert().from_select(
+        ['table_name', 'version', 'updated_at'],
+        sa.union_all(*[
+            sa.select(sa.literal(table), sa.literal(1), sa.func.current_timestamp())
+            for table in TABLES
+        ])
+    ))
+
+
+def downgrade():
+    op.drop_table('table_versions')
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,59 @@
+"""add stat counters
+
+Revision ID: c6d2e8a4b317
+Revises: a8c3e1f5b920
+Create Date: 2026-10-18 19:02:41.218530
+
+"""
+import json
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6d2e8a4b317'
+down_revision = 'a8c3e1f5b920'
+branch_labels = None
+depends_on = None
+
+# As app.utils.stats.COUNTERS when this revision was written
+COUNTERS = {
+    'programs': [()],
+    'facilities': [(), ('facility_type',)],
+    'services': [(), ('facility_id',)],
+    'equipment': [(), ('facility_id',)],
+    'projects': [(), ('facility_id',), ('program_id',), ('program_id', 'prototype_stage')],
+    'participants': [(), ('institution',)],
+    'project_participants': [(), ('project_id',)],
+    'outcomes': [(), ('commercialization_status',), ('outcome_type',)],
+}
+
+
+def upgrade():
+    stat_counters = op.create_table('stat_counters',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name', 'key')
+    )
+
+    # Counters start from the rows already there; writes keep them current afterwards
+    bind = op.get_bind()
+    now = datetime.utcnow()
+    for table, groupings in COUNTERS.items():
+        source = sa.table(table, *[sa.column(column) for columns in groupings for column in columns])
+        for columns in groupings:
+            group = [source.c[column] for column in columns]
+            name = '.'.join([table, ','.join(columns)]) if columns else table
+            rows = bind.execute(sa.select(*group, sa.func.count()).select_from(source).group_by(*group)).all()
+            if rows:
+                op.bulk_insert(stat_counters, [
+                    {'name': name, 'key': json.dumps(list(row[:-1])), 'value': row[-1], 'updated_at': now}
+                    for row in rows
+                ])
+
+
+def downgrade():
+    op.drop_table('stat_counters')
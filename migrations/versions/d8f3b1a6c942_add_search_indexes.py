@@ -0,0 +1,82 @@
+"""add full-text search indexes
+
+Revision ID: d8f3b1a6c942
+Revises: c6d2e8a4b317
+Create Date: 2026-10-18 19:45:12.604117
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f3b1a6c942'
+down_revision = 'c6d2e8a4b317'
+branch_labels = None
+depends_on = None
+
+# As app.utils.search.SEARCH_COLUMNS when this revision was written. The app
+# used to create these structures on its first search; IF NOT EXISTS adopts them.
+SEARCH_COLUMNS = {
+    'facilities': ('name', 'capabilities', 'description'),
+    'equipment': ('name', 'capabilities', 'description'),
+    'services': ('name', 'category', 'description'),
+}
+TSVECTOR_WEIGHTS = ('A', 'B', 'C')
+
+
+def _sqlite_ddl(table, columns):
+    # External-content FTS5 table kept in sync by triggers. Batch migrations
+    # that rebuild the base table drop the triggers: run these again after them.
+    fts = f'{table}_fts'
+    cols = ', '.join(columns)
+    new_values = ', '.join(f'new.{c}' for c in columns)
+    old_values = ', '.join(f'old.{c}' for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{table}', content_rowid='id', tokenize='unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _postgresql_ddl(table, columns):
+    vector = ' || '.join(
+        f"setweight(to_tsvector('simple', coalesce({c}, '')), '{w}')"
+        for c, w in zip(columns, TSVECTOR_WEIGHTS)
+    )
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)",
+    ]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table, columns in SEARCH_COLUMNS.items():
+        if dialect == 'sqlite':
+            statements = _sqlite_ddl(table, columns)
+        elif dialect == 'postgresql':
+            statements = _postgresql_ddl(table, columns)
+        else:
+            statements = []  # Other backends search with LIKE
+        for statement in statements:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCH_COLUMNS:
+        if dialect == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        elif dialect == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{table}_search_vector')
+            op.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
@@ -0,0 +1,35 @@
+"""add capability change log
+
+Revision ID: e2c7a9d4f158
+Revises: d8f3b1a6c942
+Create Date: 2026-10-18 21:10:37.552904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c7a9d4f158'
+down_revision = 'd8f3b1a6c942'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('capability_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('capability_changes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_capability_changes_changed_at'), ['changed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('capability_changes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_capability_changes_changed_at'))
+
+    op.drop_table('capability_changes')
@@ -0,0 +1,41 @@
+"""add artifact_uploads
+
+Revision ID: e5a2f7c1d864
+Revises: d41c8a9e7b03
+Create Date: 2026-10-18 15:22:48.530917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a2f7c1d864'
+down_revision = 'd41c8a9e7b03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('artifact_uploads',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('received', sa.BigInteger(), nullable=False),
+    sa.Column('checksum', sa.String(length=64), nullable=True),
+    sa.Column('sha256', sa.String(length=64), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('file_path', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('artifact_uploads', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_artifact_uploads_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('artifact_uploads', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_artifact_uploads_status'))
+
+    op.drop_table('artifact_uploads')
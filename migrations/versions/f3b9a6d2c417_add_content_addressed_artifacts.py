@@ -0,0 +1,41 @@
+"""add content-addressed artifacts
+
+Revision ID: f3b9a6d2c417
+Revises: e5a2f7c1d864
+Create Date: 2026-10-18 16:40:12.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9a6d2c417'
+down_revision = 'e5a2f7c1d864'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('artifacts',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    with op.batch_alter_table('outcomes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('artifact_sha256', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('artifact_name', sa.String(length=255), nullable=True))
+        batch_op.create_index(batch_op.f('ix_outcomes_artifact_sha256'), ['artifact_sha256'], unique=False)
+        batch_op.create_foreign_key('fk_outcomes_artifact_sha256', 'artifacts', ['artifact_sha256'], ['sha256'])
+
+
+def downgrade():
+    with op.batch_alter_table('outcomes', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_outcomes_artifact_sha256', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_outcomes_artifact_sha256'))
+        batch_op.drop_column('artifact_name')
+        batch_op.drop_column('artifact_sha256')
+
+    op.drop_table('artifacts')
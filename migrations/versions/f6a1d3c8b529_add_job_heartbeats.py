@@ -0,0 +1,26 @@
+"""add job heartbeats
+
+Revision ID: f6a1d3c8b529
+Revises: e2c7a9d4f158
+Create Date: 2026-10-18 21:48:19.306412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a1d3c8b529'
+down_revision = 'e2c7a9d4f158'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
@@ -0,0 +1,14 @@
+import pytest
+from app import create_app
+from database import db
+
+
+@pytest.fixture
+def app():
+    """Testing app on an in-memory database with every table created"""
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,28 @@
+from app import db
+from app.controllers.project_controller import ProjectController
+from app.models.facility import Facility
+from app.models.program import Program
+from app.models.project import Project
+from app.utils.importer import _upsert, read_rows
+
+
+def test_project_sheet_import(app, tmp_path):
+    program = Program(name='Hardware', description='Prototyping')
+    facility = Facility(name='Makerspace', facility_type='Lab')
+    db.session.add_all([program, facility])
+    db.session.commit()
+
+    sheet = tmp_path / 'projects.csv'
+    sheet.write_text(
+        'Program ID,Facility ID,Title,Nature,Prototype Stage\n'
+        f'{program.id},{facility.id},Solar dryer,Research,Concept\n'
+        f'{program.id},{facility.id},Water filter,,Concept\n'
+    )
+
+    created, updated, errors = _upsert(Project, ProjectController(), read_rows(str(sheet), 'csv'), 'id')
+    db.session.commit()
+
+    assert (created, updated) == (1, 0)
+    assert errors == [{'row': 3, 'error': 'Missing required field: nature'}]
+    project = Project.query.one()
+    assert (project.title, project.nature, project.prototype_stage) == ('Solar dryer', 'Research', 'Concept')